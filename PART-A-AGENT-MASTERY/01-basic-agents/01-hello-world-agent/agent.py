@@ -3,20 +3,46 @@ Hello World Agent - The simplest possible agent implementation
 Learning focus: Basic agent loop and reasoning patterns
 """
 
+import argparse
+import asyncio
 import json
 import os
+import time
 from datetime import datetime
-from typing import Dict, List, Optional
-from openai import OpenAI
-from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, field
 
-@dataclass
+import config
+from clients import get_client, without_retries
+from context import ContextBuilder
+from analyzer import InputAnalyzer, get_default_analyzer
+from batch import DEFAULT_CHUNK_SIZE, BatchAnalysis, analyze_chunks, collect_columnar
+from cache import ResponseCache, make_cache_key
+from coalesce import SingleFlight, get_default_flight, make_flight_key
+from history import HistoryStore, RingBufferHistory, SpillLog
+from personalities import Personality, PersonalityRegistry, get_default_registry
+from ratelimit import PRIORITY_BATCH, PRIORITY_INTERACTIVE, RateLimiter, estimate_tokens, get_default_limiter
+from resilience import Resilience, get_default_resilience
+from stats import ConversationStats, TopicCounter
+from sessions import SNAPSHOT_VERSION, SessionStore, decode_message, encode_message
+from summarizer import RollingSummarizer, completion_summarize_fn, extractive_summarize
+from tokens import get_tokenizer
+from tracing import SPAN_KIND_CLIENT, Tracer, TurnTrace, default_hooks
+
+if TYPE_CHECKING:
+    # Imported by clients.py only when a client is built, so offline use skips the SDK
+    from openai import AsyncOpenAI, OpenAI
+
+MISSING_API_KEY_MESSAGE = "OpenAI API key not provided. Please set OPENAI_API_KEY environment variable."
+
+@dataclass(slots=True)
 class AgentMessage:
-    """Structured message format for agent communication"""
+    """Structured message format for agent communication (slotted to keep long histories compact)"""
     content: str
     timestamp: datetime
     message_type: str  # 'user', 'agent', 'system'
     metadata: Optional[Dict] = None
+    token_count: Optional[int] = field(default=None, repr=False, compare=False)  # Memoized by ContextBuilder
 
 class HelloWorldAgent:
     """
@@ -27,108 +53,155 @@ class HelloWorldAgent:
     4. Personality/role definition
     """
     
-    def __init__(self, model="gpt-3.5-turbo", personality="friendly_assistant"):
+    def __init__(self, model="gpt-3.5-turbo", personality="friendly_assistant",
+                 history_store: Optional[HistoryStore] = None,
+                 client: Optional["OpenAI"] = None, async_client: Optional["AsyncOpenAI"] = None,
+                 response_cache: Optional[ResponseCache] = None, cache_any_temperature: bool = False,
+                 analyzer: Optional[InputAnalyzer] = None, tracer: Optional[Tracer] = None,
+                 context_builder: Optional[ContextBuilder] = None,
+                 summarizer: Optional[RollingSummarizer] = None,
+                 session_store: Optional[SessionStore] = None, session_id: str = "default",
+                 coalescer: Optional[SingleFlight] = None, resilience: Optional[Resilience] = None,
+                 rate_limiter: Optional[RateLimiter] = None, priority: int = PRIORITY_INTERACTIVE,
+                 personalities: Optional[PersonalityRegistry] = None,
+                 upstream_slots: Optional[asyncio.Semaphore] = None):
         self.model = model
         self.personality = personality
-        self.conversation_history: List[AgentMessage] = []
-        self.agent_stats = {
-            "messages_processed": 0,
-            "average_response_time": 0,
-            "topics_discussed": set()
-        }
         
-        # Initialize OpenAI client
-        api_key = os.getenv("OPENAI_API_KEY")
-        if api_key:
-            self.client = OpenAI(api_key=api_key)
-        else:
-            # For testing without API key, set client to None
-            self.client = None
+        # Bounded history; older turns optionally spill to an on-disk log
+        if history_store is None:
+            spill_log = SpillLog(config.HISTORY_SPILL_PATH) if config.HISTORY_SPILL_PATH else None
+            history_store = RingBufferHistory(config.MAX_CONVERSATION_HISTORY, spill_log=spill_log)
+        self.conversation_history: HistoryStore = history_store
+        self._reset_stats()
+        
+        # OpenAI clients are shared across agents (None without an API key)
+        self.client = client if client is not None else get_client()
+        self.async_client = async_client
+        self._turn_lock = asyncio.Lock()
+        
+        # Optional response cache; only deterministic (temperature 0) calls unless opted in
+        self.response_cache = response_cache
+        self.cache_any_temperature = cache_any_temperature
+        
+        # Identical in-flight requests (from any agent on the same client) share one upstream call
+        if coalescer is None and config.COALESCE_REQUESTS:
+            coalescer = get_default_flight()
+        self.coalescer = coalescer
+        
+        # Deadline, retries with backoff, hedging and a circuit breaker around every upstream call
+        self.resilience = resilience or get_default_resilience()
+        
+        # Shared RPM/TPM quota; lower `priority` values are admitted first (interactive before batch)
+        self.rate_limiter = rate_limiter or get_default_limiter()
+        self.priority = priority
         
-        # Agent personality and role definition
-        self.system_prompt = self._get_personality_prompt(personality)
+        # Caps concurrent upstream requests across agents (AsyncAgentPool passes its own)
+        self.upstream_slots = upstream_slots
+        
+        # Intent/topic matcher, compiled once and shared by default
+        self.analyzer = analyzer or get_default_analyzer()
+        
+        # Prompt assembly within a token budget (history packed newest-first)
+        self.context_builder = context_builder or ContextBuilder(get_tokenizer(model))
+        
+        # Older turns are summarized in the background: extractively unless LLM summaries are opted into.
+        # Those go through this agent's own sync path; pool agents answer on an async client and stay extractive
+        if summarizer is None and config.ROLLING_SUMMARY:
+            summarize_fn = extractive_summarize
+            if config.SUMMARY_LLM and self.client is not None and self.async_client is None:
+                summarize_fn = completion_summarize_fn(self._background_complete, model)
+            summarizer = RollingSummarizer(summarize_fn)
+        self.summarizer = summarizer
+        
+        # Optional persistence: every turn is logged, with a snapshot every SESSION_SNAPSHOT_EVERY turns
+        self.session_store = session_store
+        self.session_id = session_id
+        self._turns_since_snapshot = 0
+        self._store_version = 0
+        
+        # Per-turn phase spans, rolling latency percentiles and export hooks
+        self.tracer = tracer or Tracer(hooks=default_hooks())
+        
+        # Agent personality and role definition, shared through the registry (hot-reloadable)
+        self.personalities = personalities or get_default_registry()
+        self._system_prompt_override: Optional[str] = None
     
     def _get_personality_prompt(self, personality: str) -> str:
-        """Define the agent's personality and behavior"""
-        personalities = {
-            "friendly_assistant": """
-            You are a helpful, friendly AI assistant. You:
-            - Greet users warmly and remember context from the conversation
-            - Ask follow-up questions to be more helpful
-            - Admit when you don't know something
-            - Keep responses concise but informative
-            - Show genuine interest in helping the user
-            """,
-            "technical_expert": """
-            You are a technical expert AI assistant. You:
-            - Provide detailed, accurate technical information
-            - Ask clarifying questions about technical requirements
-            - Suggest best practices and alternatives
-            - Explain complex concepts clearly
-            """,
-            "creative_companion": """
-            You are a creative AI companion. You:
-            - Think outside the box and suggest creative solutions
-            - Ask thought-provoking questions
-            - Encourage exploration and experimentation
-            - Share interesting connections and ideas
-            """
-        }
-        return personalities.get(personality, personalities["friendly_assistant"])
+        """Define the agent's personality and behavior (unknown names get the default)"""
+        return self.personalities.get(personality).prompt
+    
+    @property
+    def persona(self) -> Personality:
+        """The shared personality object, looked up each time so reloads apply to running agents"""
+        return self.personalities.get(self.personality)
+    
+    @property
+    def system_prompt(self) -> str:
+        if self._system_prompt_override is not None:
+            return self._system_prompt_override
+        return self.persona.prompt
+    
+    @system_prompt.setter
+    def system_prompt(self, prompt: Optional[str]):
+        """Pin a custom prompt for this agent (None goes back to the personality's)"""
+        self._system_prompt_override = prompt
     
     def think(self, user_input: str) -> Dict:
         """
         Agent reasoning step - analyze input and plan response
         This is where the 'intelligence' happens
         """
-        start_time = datetime.now()
+        start_ns = time.perf_counter_ns()
         
-        # Simple reasoning: categorize the input
+        # Simple reasoning: categorize the input (analyzed once, shared with planning)
+        analysis = self._analyze_input(user_input)
         reasoning = {
-            "input_analysis": self._analyze_input(user_input),
+            "input_analysis": analysis,
             "context_summary": self._summarize_context(),
-            "response_strategy": self._plan_response(user_input),
+            "response_strategy": self._plan_response(user_input, analysis),
             "thinking_time": 0  # Will be calculated at the end
         }
         
-        reasoning["thinking_time"] = (datetime.now() - start_time).total_seconds()
+        reasoning["thinking_time"] = (time.perf_counter_ns() - start_ns) / 1e9
         return reasoning
     
+    def think_many(self, messages: Iterable[str], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   workers: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Batch version of `think` for offline analysis of large corpora
+        Yields one reasoning dict per message, in order, identical to `think`
+        except that thinking_time is the chunk's time divided by its size
+        """
+        context_summary = self._summarize_context()  # think() never changes history
+        labels = self.analyzer.labels
+        for chunk, (codes, topics, elapsed) in analyze_chunks(self.analyzer, messages, chunk_size, workers):
+            thinking_time = elapsed / len(chunk)
+            for text, code, message_topics in zip(chunk, codes, topics):
+                analysis = self.analyzer.make_analysis(labels[code], message_topics)
+                yield {
+                    "input_analysis": analysis,
+                    "context_summary": context_summary,
+                    "response_strategy": self._plan_response(text, analysis),
+                    "thinking_time": thinking_time
+                }
+    
+    def think_many_columnar(self, messages: Iterable[str], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                            workers: Optional[int] = None) -> BatchAnalysis:
+        """Batch analysis returned as columns (intent codes array + topics list)"""
+        return collect_columnar(self.analyzer, messages, chunk_size, workers)
+    
     def _analyze_input(self, text: str) -> Dict:
         """Analyze user input to understand intent and content"""
-        text_lower = text.lower()
-        
-        analysis = {
-            "intent": "unknown",
-            "entities": [],
-            "sentiment": "neutral",
-            "topics": []
-        }
-        
-        # Simple rule-based analysis (in production, you'd use NLP models)
-        if any(greeting in text_lower for greeting in ["hello", "hi", "hey", "good morning", "good afternoon"]):
-            analysis["intent"] = "greeting"
-        elif "?" in text:
-            analysis["intent"] = "question"
-        elif any(word in text_lower for word in ["bye", "goodbye", "see you", "farewell"]):
-            analysis["intent"] = "farewell"
-        elif any(word in text_lower for word in ["thank", "thanks", "appreciate"]):
-            analysis["intent"] = "gratitude"
-        else:
-            analysis["intent"] = "conversation"
-        
-        # Extract simple topics (keywords)
-        topics = [word for word in text_lower.split() if len(word) > 3]
-        analysis["topics"] = topics[:3]  # Keep top 3 topics
-        
-        return analysis
+        # Compiled single-pass matcher (see analyzer.py); keywords live in config
+        return self.analyzer.analyze(text)
     
     def _summarize_context(self) -> str:
         """Summarize recent conversation context"""
         if not self.conversation_history:
             return "No previous context"
         
-        recent_messages = self.conversation_history[-3:]  # Last 3 messages
+        recent_messages = self.conversation_history.recent(3)  # Last 3 messages (view, no copy)
         topics = set()
         
         for msg in recent_messages:
@@ -137,9 +210,10 @@ class HelloWorldAgent:
         
         return f"Recent topics: {', '.join(topics) if topics else 'General conversation'}"
     
-    def _plan_response(self, user_input: str) -> str:
+    def _plan_response(self, user_input: str, analysis: Optional[Dict] = None) -> str:
         """Plan the response strategy based on input analysis"""
-        analysis = self._analyze_input(user_input)
+        if analysis is None:
+            analysis = self._analyze_input(user_input)
         
         strategies = {
             "greeting": "Respond warmly and ask how I can help",
@@ -151,53 +225,340 @@ class HelloWorldAgent:
         
         return strategies.get(analysis["intent"], "Respond helpfully and naturally")
     
+    def _build_messages(self, user_input: str) -> List[Dict]:
+        """Build conversation context for the LLM (as much recent history as the token budget allows)"""
+        history, summary = self.conversation_history, ""
+        if self.summarizer is not None:
+            # Live window plus aged-out turns the summary does not cover yet
+            history = history.recent(self.summarizer.live_messages + self.summarizer.outstanding)
+            summary = self.summarizer.summary
+        system_prompt, system_tokens = self._system_prompt_and_tokens()
+        window = self.context_builder.build(system_prompt, history, user_input, summary, system_tokens)
+        self.stats.record_prompt(window.prompt_tokens, window.baseline_tokens, window.history_messages)
+        return window.messages
+    
+    def _system_prompt_and_tokens(self) -> Tuple[str, Optional[int]]:
+        """System prompt plus its precomputed token count when the registry counted it with our tokenizer"""
+        if self._system_prompt_override is not None:
+            return self._system_prompt_override, None
+        persona = self.persona
+        if self.personalities.tokenizer is self.context_builder.tokenizer:
+            return persona.prompt, persona.token_count
+        return persona.prompt, None
+    
+    def _completion_params(self, messages: List[Dict]) -> Dict:
+        """Request parameters shared by the sync and async completion paths"""
+        return {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": config.MAX_TOKENS,
+            "temperature": config.TEMPERATURE
+        }
+    
+    def _cache_key(self, params: Dict) -> Optional[str]:
+        """Cache key for this request, or None when it must not be cached"""
+        if self.response_cache is None:
+            return None
+        if params["temperature"] != 0 and not self.cache_any_temperature:
+            return None
+        return make_cache_key(params)
+    
+    def _start_trace(self, mode: str) -> TurnTrace:
+        return self.tracer.start_turn(**{
+            "gen_ai.request.model": self.model,
+            "agent.personality": self.personality,
+            "agent.mode": mode
+        })
+    
+    def _flight_key(self, client, params: Dict, cache_key: Optional[str]):
+        """Coalescing key: the same normalized request on the same client"""
+        return id(client), cache_key or make_flight_key(params)
+    
+    def _record_coalesced(self, trace: TurnTrace, coalesced: bool):
+        trace.root.attributes["agent.coalesced"] = coalesced
+        if coalesced:
+            self.stats.coalesced_responses += 1
+    
+    def _complete(self, messages: List[Dict], trace: Optional[TurnTrace] = None) -> str:
+        """Single sync LLM call (served from the response cache or a coalesced call when possible)"""
+        trace = trace or TurnTrace()
+        params = self._completion_params(messages)
+        cache_key = self._cache_key(params)
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key)
+            trace.root.attributes["agent.cache_hit"] = cached is not None
+            if cached is not None:
+                return cached
+        
+        def call():
+            if self.resilience is None:
+                return self._call_llm(params, trace)
+            return self.resilience.call(lambda timeout: self._call_llm(params, trace, timeout))
+        
+        if self.coalescer is None:
+            agent_response = call()
+        else:
+            agent_response, coalesced = self.coalescer.do(self._flight_key(self.client, params, cache_key), call)
+            self._record_coalesced(trace, coalesced)
+            if coalesced:
+                return agent_response  # The caller that made the request cached it
+        
+        if cache_key is not None:
+            self.response_cache.set(cache_key, agent_response)
+        return agent_response
+    
+    def _upstream(self, client):
+        """The client to call; the resilience layer replaces the SDK's own retries"""
+        return client if self.resilience is None else without_retries(client)
+    
+    def _background_complete(self, params: Dict) -> str:
+        """Chat completion for background work (summaries): resilience and rate limiter at batch priority, no hedging"""
+        trace = TurnTrace()
+        if self.resilience is None:
+            return self._call_llm(params, trace, priority=PRIORITY_BATCH)
+        return self.resilience.call(lambda timeout: self._call_llm(params, trace, timeout, PRIORITY_BATCH),
+                                    hedge=False)
+    
+    def _call_llm(self, params: Dict, trace: TurnTrace, timeout: Optional[float] = None,
+                  priority: Optional[int] = None) -> str:
+        """One upstream chat completion attempt, with network/parse spans"""
+        if self.rate_limiter is not None:
+            with trace.span("rate_limit"):
+                self.rate_limiter.acquire(estimate_tokens(params), self.priority if priority is None else priority,
+                                          timeout)
+        if timeout is not None:
+            params = {**params, "timeout": timeout}
+        completions = self._upstream(self.client).chat.completions
+        raw_api = getattr(completions, "with_streaming_response", None)
+        if raw_api is None:
+            # Clients without raw responses (e.g. test doubles): no first-byte split
+            with trace.span("network_request", SPAN_KIND_CLIENT):
+                response = completions.create(**params)
+            with trace.span("parse"):
+                agent_response = response.choices[0].message.content.strip()
+        else:
+            # Entering the raw response returns once headers arrive; the body is read by parse()
+            with trace.span("network_request", SPAN_KIND_CLIENT) as network:
+                with raw_api.create(**params) as raw:
+                    network.add_event("first_byte")
+                    network.end()
+                    with trace.span("parse"):
+                        agent_response = raw.parse().choices[0].message.content.strip()
+        return agent_response
+    
+    async def _acomplete(self, messages: List[Dict], trace: Optional[TurnTrace] = None) -> str:
+        """Single async LLM call (served from the response cache or a coalesced call when possible)"""
+        trace = trace or TurnTrace()
+        params = self._completion_params(messages)
+        cache_key = self._cache_key(params)
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key)
+            trace.root.attributes["agent.cache_hit"] = cached is not None
+            if cached is not None:
+                return cached
+        
+        async def call():
+            if self.resilience is None:
+                return await self._acall_llm(params, trace)
+            return await self.resilience.acall(lambda timeout: self._acall_llm(params, trace, timeout))
+        
+        if self.coalescer is None:
+            agent_response = await call()
+        else:
+            agent_response, coalesced = await self.coalescer.ado(
+                self._flight_key(self.async_client, params, cache_key), call)
+            self._record_coalesced(trace, coalesced)
+            if coalesced:
+                return agent_response
+        
+        if cache_key is not None:
+            self.response_cache.set(cache_key, agent_response)
+        return agent_response
+    
+    async def _acall_llm(self, params: Dict, trace: TurnTrace, timeout: Optional[float] = None) -> str:
+        if self.rate_limiter is not None:
+            with trace.span("rate_limit"):
+                await self.rate_limiter.aacquire(estimate_tokens(params), self.priority, timeout)
+        if timeout is not None:
+            params = {**params, "timeout": timeout}
+        if self.upstream_slots is None:
+            return await self._arequest(params, trace)
+        async with self.upstream_slots:  # Held for the request only, not while queued for the turn or quota
+            return await self._arequest(params, trace)
+    
+    async def _arequest(self, params: Dict, trace: TurnTrace) -> str:
+        completions = self._upstream(self.async_client).chat.completions
+        raw_api = getattr(completions, "with_streaming_response", None)
+        if raw_api is None:
+            with trace.span("network_request", SPAN_KIND_CLIENT):
+                response = await completions.create(**params)
+            with trace.span("parse"):
+                agent_response = response.choices[0].message.content.strip()
+        else:
+            with trace.span("network_request", SPAN_KIND_CLIENT) as network:
+                async with raw_api.create(**params) as raw:
+                    network.add_event("first_byte")
+                    network.end()
+                    with trace.span("parse"):
+                        agent_response = (await raw.parse()).choices[0].message.content.strip()
+        return agent_response
+    
     def respond(self, user_input: str) -> str:
         """
         Generate agent response using LLM
         This is where the actual response generation happens
         """
-        # Think about the input first
-        reasoning = self.think(user_input)
-        
-        # Build conversation context for LLM
-        messages = [{"role": "system", "content": self.system_prompt}]
-        
-        # Add conversation history
-        for msg in self.conversation_history[-5:]:  # Last 5 messages for context
-            role = "user" if msg.message_type == "user" else "assistant"
-            messages.append({"role": role, "content": msg.content})
-        
-        # Add current user input
-        messages.append({"role": "user", "content": user_input})
-        
+        trace = self._start_trace("sync")
         try:
-            # Check if client is available
-            if self.client is None:
-                error_response = "OpenAI API key not provided. Please set OPENAI_API_KEY environment variable."
-                self._log_interaction(user_input, error_response, reasoning, error=True)
-                return error_response
-            
-            # Generate response using LLM
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=150,
-                temperature=0.7
-            )
+            # Think about the input first
+            with trace.span("analyze"):
+                reasoning = self.think(user_input)
+            with trace.span("context_build"):
+                messages = self._build_messages(user_input)
             
-            agent_response = response.choices[0].message.content.strip()
+            error = False
+            try:
+                # Check if client is available
+                if self.client is None:
+                    agent_response = MISSING_API_KEY_MESSAGE
+                    error = True
+                else:
+                    # Generate response using LLM
+                    agent_response = self._complete(messages, trace)
+            except Exception as e:
+                agent_response = f"I apologize, but I encountered an error: {str(e)}. Please try again."
+                error = True
             
             # Log the interaction
-            self._log_interaction(user_input, agent_response, reasoning)
-            
+            with trace.span("log"):
+                self._log_interaction(user_input, agent_response, reasoning, error=error)
             return agent_response
-            
+        finally:
+            self.tracer.finish_turn(trace)
+    
+    async def arespond(self, user_input: str) -> str:
+        """
+        Async version of `respond` for serving many sessions on one event loop
+        Turns for this agent are serialized so the history stays ordered
+        """
+        async with self._turn_lock:
+            trace = self._start_trace("async")
+            try:
+                with trace.span("analyze"):
+                    reasoning = self.think(user_input)
+                with trace.span("context_build"):
+                    messages = self._build_messages(user_input)
+                
+                error = False
+                try:
+                    if self.async_client is None:
+                        agent_response = MISSING_API_KEY_MESSAGE
+                        error = True
+                    else:
+                        agent_response = await self._acomplete(messages, trace)
+                except Exception as e:
+                    agent_response = f"I apologize, but I encountered an error: {str(e)}. Please try again."
+                    error = True
+                
+                with trace.span("log"):
+                    self._log_interaction(user_input, agent_response, reasoning, error=error)
+                return agent_response
+            finally:
+                self.tracer.finish_turn(trace)
+    
+    def respond_stream(self, user_input: str) -> Iterator[str]:
+        """
+        Streaming version of `respond`: yields tokens as the backend emits them
+        History and stats are updated once the stream completes (or the caller stops early)
+        """
+        trace = self._start_trace("stream")
+        try:
+            yield from self._respond_stream(user_input, trace)
+        finally:
+            self.tracer.finish_turn(trace)
+    
+    def _respond_stream(self, user_input: str, trace: TurnTrace) -> Iterator[str]:
+        with trace.span("analyze"):
+            reasoning = self.think(user_input)
+        with trace.span("context_build"):
+            messages = self._build_messages(user_input)
+        
+        if self.client is None:
+            with trace.span("log"):
+                self._log_interaction(user_input, MISSING_API_KEY_MESSAGE, reasoning, error=True)
+            yield MISSING_API_KEY_MESSAGE
+            return
+        
+        parts: List[str] = []
+        timings = {"time_to_first_token": None, "total_time": None}
+        start = time.perf_counter()
+        
+        params = self._completion_params(messages)
+        cache_key = self._cache_key(params)
+        cached = self.response_cache.get(cache_key) if cache_key is not None else None
+        if cache_key is not None:
+            trace.root.attributes["agent.cache_hit"] = cached is not None
+        if cached is not None:
+            timings["time_to_first_token"] = timings["total_time"] = time.perf_counter() - start
+            with trace.span("log"):
+                self._log_interaction(user_input, cached, reasoning, timings=timings)
+            yield cached
+            return
+        
+        def finish():
+            timings["total_time"] = time.perf_counter() - start
+            return "".join(parts).strip()
+        
+        try:
+            # create() returns once response headers arrive; "parse" spans reading the SSE body
+            with trace.span("network_request", SPAN_KIND_CLIENT) as network:
+                stream = self._open_stream(params)
+                network.add_event("first_byte")
+            with stream, trace.span("parse"):
+                for chunk in stream:
+                    token = chunk.choices[0].delta.content if chunk.choices else None
+                    if not token:
+                        continue
+                    if timings["time_to_first_token"] is None:
+                        timings["time_to_first_token"] = time.perf_counter() - start
+                    parts.append(token)
+                    yield token
+        except GeneratorExit:
+            # Caller stopped reading; keep what was shown to the user
+            with trace.span("log"):
+                self._log_interaction(user_input, finish(), reasoning, timings=timings)
+            raise
         except Exception as e:
             error_response = f"I apologize, but I encountered an error: {str(e)}. Please try again."
-            self._log_interaction(user_input, error_response, reasoning, error=True)
-            return error_response
+            finish()
+            with trace.span("log"):
+                self._log_interaction(user_input, error_response, reasoning, error=True, timings=timings)
+            yield error_response
+            return
+        
+        agent_response = finish()
+        if cache_key is not None:
+            self.response_cache.set(cache_key, agent_response)
+        with trace.span("log"):
+            self._log_interaction(user_input, agent_response, reasoning, timings=timings)
+    
+    def _open_stream(self, params: Dict):
+        """Start a streamed completion; retried like other calls until the first byte, never hedged"""
+        completions = self._upstream(self.client).chat.completions
+        
+        def open_stream(timeout: Optional[float] = None):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(estimate_tokens(params), self.priority, timeout)
+            if timeout is None:
+                return completions.create(**params, stream=True)
+            return completions.create(**params, stream=True, timeout=timeout)
+        
+        if self.resilience is None:
+            return open_stream()
+        return self.resilience.call(open_stream, hedge=False)
     
-    def _log_interaction(self, user_input: str, agent_response: str, reasoning: Dict, error: bool = False):
+    def _log_interaction(self, user_input: str, agent_response: str, reasoning: Dict, error: bool = False,
+                         timings: Optional[Dict] = None):
         """Log the interaction for learning and improvement"""
         # Add user message
         user_msg = AgentMessage(
@@ -217,56 +578,169 @@ class HelloWorldAgent:
             timestamp=datetime.now(),
             message_type="agent",
             metadata={
-                "reasoning": reasoning,
+                "response_strategy": reasoning.get("response_strategy"),
                 "error": error,
-                "response_time": reasoning["thinking_time"]
+                "response_time": reasoning["thinking_time"],
+                **(timings or {})
             }
         )
         self.conversation_history.append(agent_msg)
+        if self.summarizer is not None:
+            self.summarizer.after_turn(self.conversation_history)
         
-        # Update stats
-        self.agent_stats["messages_processed"] += 1
-        self.agent_stats["topics_discussed"].update(reasoning["input_analysis"]["topics"])
+        # Update stats (constant time - no history rescans)
+        self._account_message(user_msg)
+        self._account_message(agent_msg)
         
-        # Calculate running average response time
-        total_time = sum(
-            msg.metadata.get("response_time", 0) 
-            for msg in self.conversation_history 
-            if msg.message_type == "agent" and msg.metadata
-        )
-        agent_messages = sum(1 for msg in self.conversation_history if msg.message_type == "agent")
-        if agent_messages > 0:
-            self.agent_stats["average_response_time"] = total_time / agent_messages
+        if self.session_store is not None:
+            self._store_version = self.session_store.append(
+                self.session_id, [encode_message(user_msg), encode_message(agent_msg)])
+            self._turns_since_snapshot += 1
+            if self._turns_since_snapshot >= config.SESSION_SNAPSHOT_EVERY:
+                self.save_session()
+    
+    def _account_message(self, message: AgentMessage):
+        """Fold one logged message into the stats (also used to replay a session log)"""
+        self.stats.record_message(message.message_type, message.timestamp)
+        metadata = message.metadata or {}
+        if message.message_type == "user":
+            self.agent_stats["topics_discussed"].update(metadata.get("topics", []))
+        elif message.message_type == "agent":
+            self.stats.record_response_time(metadata.get("response_time", 0))
+            if metadata.get("total_time") is not None:
+                self.stats.record_stream_timing(metadata.get("time_to_first_token"), metadata["total_time"])
+            self.agent_stats["messages_processed"] += 1
+            self.agent_stats["average_response_time"] = self.stats.mean_response_time
+    
+    def save_session(self):
+        """Snapshot history, stats and summary to the session store"""
+        summarizer_state = self.summarizer.to_state() if self.summarizer is not None else None
+        self.session_store.save_snapshot(self.session_id, {
+            "version": SNAPSHOT_VERSION,
+            "model": self.model,
+            "personality": self.personality,
+            "history": [encode_message(message) for message in self.conversation_history],
+            "stats": self.stats.to_state(),
+            "agent_stats": {
+                "messages_processed": self.agent_stats["messages_processed"],
+                "average_response_time": self.agent_stats["average_response_time"],
+                "topics_discussed": self.agent_stats["topics_discussed"].to_state()
+            },
+            "summarizer": summarizer_state
+        })
+        self._turns_since_snapshot = 0
+        # Snapshots may compact the log, which changes its version
+        self._store_version = self.session_store.version(self.session_id)
+    
+    def restore_session(self) -> bool:
+        """Load the latest snapshot and replay the log after it; False if the session is new"""
+        self._store_version = self.session_store.version(self.session_id)
+        data = self.session_store.load(self.session_id)
+        if data is None:
+            return False
+        snapshot, records = data
+        
+        self.conversation_history.clear()
+        self._reset_stats()
+        # Restored messages were already spilled (if at all) before the restart
+        spill_log = getattr(self.conversation_history, "spill_log", None)
+        if spill_log is not None:
+            self.conversation_history.spill_log = None
+        try:
+            if snapshot is not None:
+                self.conversation_history.extend(decode_message(r, AgentMessage) for r in snapshot["history"])
+                self.stats = ConversationStats.from_state(snapshot["stats"])
+                saved = snapshot["agent_stats"]
+                self.agent_stats = {
+                    "messages_processed": saved["messages_processed"],
+                    "average_response_time": saved["average_response_time"],
+                    "topics_discussed": TopicCounter.from_state(saved["topics_discussed"])
+                }
+            for record in records:
+                message = decode_message(record, AgentMessage)
+                self.conversation_history.append(message)
+                self._account_message(message)
+        finally:
+            if spill_log is not None:
+                self.conversation_history.spill_log = spill_log
+        
+        if self.summarizer is not None:
+            if snapshot is not None and snapshot.get("summarizer"):
+                self.summarizer.restore(snapshot["summarizer"], self.conversation_history, len(records))
+            else:
+                self.summarizer.reset()
+                self.summarizer.after_turn(self.conversation_history, len(self.conversation_history))
+        self._turns_since_snapshot = len(records) // 2
+        return True
+    
+    def session_is_stale(self) -> bool:
+        """True if another process has logged turns for this session since we last saw it"""
+        return self.session_store.version(self.session_id) != self._store_version
+    
+    @classmethod
+    def resume(cls, session_store: SessionStore, session_id: str, **kwargs) -> "HelloWorldAgent":
+        """Create an agent for `session_id`, restoring it from `session_store` if it exists"""
+        agent = cls(session_store=session_store, session_id=session_id, **kwargs)
+        agent.restore_session()
+        return agent
     
     def get_conversation_summary(self) -> Dict:
         """Get summary of the conversation for analysis"""
-        return {
-            "total_messages": len(self.conversation_history),
-            "user_messages": sum(1 for msg in self.conversation_history if msg.message_type == "user"),
-            "agent_messages": sum(1 for msg in self.conversation_history if msg.message_type == "agent"),
+        summary = {
+            "total_messages": self.stats.total_messages,
+            "user_messages": self.stats.count("user"),
+            "agent_messages": self.stats.count("agent"),
             "topics_discussed": list(self.agent_stats["topics_discussed"]),
             "average_response_time": round(self.agent_stats["average_response_time"], 2),
-            "conversation_duration": (
-                self.conversation_history[-1].timestamp - self.conversation_history[0].timestamp
-            ).total_seconds() if self.conversation_history else 0
+            "response_time_stdev": round(self.stats.response_time_stdev, 2),
+            "streamed_responses": self.stats.streamed_responses,
+            "average_time_to_first_token": round(self.stats.mean_time_to_first_token, 3),
+            "average_stream_time": round(self.stats.mean_stream_time, 3),
+            "average_prompt_tokens": round(self.stats.mean_prompt_tokens, 1),
+            "average_context_messages": round(self.stats.mean_context_messages, 1),
+            "prompt_tokens_saved": self.stats.prompt_tokens_saved,
+            "coalesced_responses": self.stats.coalesced_responses,
+            "conversation_duration": self.stats.duration,
+            "latency_percentiles": self.tracer.percentiles()
         }
+        if self.response_cache is not None:
+            cache_stats = self.response_cache.stats()
+            summary["cache_hits"] = cache_stats["hits"]
+            summary["cache_misses"] = cache_stats["misses"]
+            summary["cache_evictions"] = cache_stats["evictions"]
+        if self.summarizer is not None:
+            summary["summarized_messages"] = self.summarizer.summarized_messages
+            summary["summary_tokens"] = self.context_builder.text_tokens(self.summarizer.summary)
+        return summary
     
     def reset_conversation(self):
         """Clear conversation history and stats"""
-        self.conversation_history = []
+        self.conversation_history.clear()
+        self._reset_stats()
+        self.tracer.reset()
+        if self.summarizer is not None:
+            self.summarizer.reset()
+        if self.session_store is not None:
+            self.session_store.delete(self.session_id)
+            self._turns_since_snapshot = 0
+    
+    def _reset_stats(self):
+        """Start a fresh stats engine and the legacy `agent_stats` view"""
+        self.stats = ConversationStats()
         self.agent_stats = {
             "messages_processed": 0,
             "average_response_time": 0,
-            "topics_discussed": set()
+            "topics_discussed": TopicCounter()
         }
 
 # Convenience function for quick testing
-def chat_with_agent(personality="friendly_assistant"):
-    """Interactive chat session with the agent"""
+def chat_with_agent(personality="friendly_assistant", stream=False):
+    """Interactive chat session with the agent (stream=True prints tokens as they arrive)"""
     agent = HelloWorldAgent(personality=personality)
     
     print(f"🤖 Hello! I'm your {personality.replace('_', ' ')} agent.")
-    print("Type 'quit' to end the conversation, 'stats' to see conversation statistics.\n")
+    print("Type 'quit' to end the conversation, 'stats' to see conversation statistics, "
+          "'reload' to re-read personality prompts.\n")
     
     while True:
         user_input = input("You: ").strip()
@@ -275,6 +749,15 @@ def chat_with_agent(personality="friendly_assistant"):
             print("🤖 Goodbye! It was nice talking with you!")
             break
         
+        if user_input.lower() == 'reload':
+            try:
+                version = agent.personalities.reload()
+            except Exception as e:
+                print(f"⚠️  Personality reload failed, keeping version {agent.personalities.version}: {e}\n")
+                continue
+            print(f"🔄 Personalities reloaded (version {version})\n")
+            continue
+        
         if user_input.lower() == 'stats':
             stats = agent.get_conversation_summary()
             print(f"\n📊 Conversation Statistics:")
@@ -284,8 +767,20 @@ def chat_with_agent(personality="friendly_assistant"):
             continue
         
         if user_input:
-            response = agent.respond(user_input)
-            print(f"🤖 {response}\n")
+            if stream:
+                print("🤖 ", end="", flush=True)
+                for token in agent.respond_stream(user_input):
+                    print(token, end="", flush=True)
+                print("\n")
+            else:
+                response = agent.respond(user_input)
+                print(f"🤖 {response}\n")
 
 if __name__ == "__main__":
-    chat_with_agent()
+    parser = argparse.ArgumentParser(description="Chat with the Hello World Agent")
+    parser.add_argument("--personality", default="friendly_assistant",
+                       help="friendly_assistant, technical_expert, creative_companion or any from AGENT_PERSONALITIES")
+    parser.add_argument("--stream", action="store_true",
+                       help="Print the response token by token as it is generated")
+    args = parser.parse_args()
+    chat_with_agent(personality=args.personality, stream=args.stream)
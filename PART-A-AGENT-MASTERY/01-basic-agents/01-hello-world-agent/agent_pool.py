@@ -0,0 +1,187 @@
+"""
+Async session pool for the Hello World Agent
+Serves many concurrent conversations on one event loop with one shared client
+
+Usage:
+    async with AsyncAgentPool() as pool:
+        reply = await pool.respond("session-42", "Hello!")
+"""
+
+import asyncio
+import os
+import resource
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+import config
+from agent import HelloWorldAgent
+from clients import create_async_client
+from coalesce import SingleFlight, get_default_flight
+from ratelimit import RateLimiter, get_default_limiter
+from resilience import Resilience, get_default_resilience
+from sessions import SessionStore
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+
+def current_rss_bytes() -> int:
+    """Resident memory of this process (peak RSS where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if os.uname().sysname == "Darwin" else usage * 1024
+
+
+class AsyncAgentPool:
+    """
+    Hosts one `HelloWorldAgent` per session ID.
+
+    All sessions share a single pooled `AsyncOpenAI` client, so hundreds of
+    conversations reuse the same connections. Each agent serializes its own
+    turns, so concurrent requests for one session are answered in order.
+    At most `max_in_flight` upstream requests run at once (default: one
+    per pooled connection); extra requests queue here rather than inside
+    the HTTP pool, whose bookkeeping gets expensive with long wait queues.
+    Slots are taken only around the request itself, so turns waiting
+    behind their own session never hold one.
+
+    With a `session_store`, sessions are resumed from it on first use and
+    written back when evicted: after `idle_timeout` seconds without a turn,
+    or least-recently-used first while the process is above
+    `memory_limit_mb` or holds more than `max_sessions`. With
+    `shared_store=True` (several processes on one store) a session is
+    reloaded whenever another process has logged turns for it.
+
+    Sessions share one `SingleFlight`, so identical prompts in flight at
+    the same time (e.g. the same greeting from many new users) cost one
+    upstream call, and one `Resilience` policy (deadline, retries, hedging,
+    circuit breaker) covering the shared backend. With a `rate_limiter`
+    (or AGENT_RATE_LIMIT_RPM/TPM set) they also share one RPM/TPM quota.
+    """
+
+    def __init__(self, model: str = config.DEFAULT_MODEL, personality: str = config.DEFAULT_PERSONALITY,
+                 async_client: Optional["AsyncOpenAI"] = None, api_key: Optional[str] = None,
+                 base_url: Optional[str] = None, max_connections: int = config.ASYNC_MAX_CONNECTIONS,
+                 max_in_flight: Optional[int] = None, session_store: Optional[SessionStore] = None,
+                 idle_timeout: Optional[float] = None, memory_limit_mb: Optional[float] = None,
+                 max_sessions: Optional[int] = None, shared_store: bool = False,
+                 coalescer: Optional[SingleFlight] = None, resilience: Optional[Resilience] = None,
+                 rate_limiter: Optional[RateLimiter] = None):
+        self.model = model
+        self.personality = personality
+        self._owns_client = async_client is None
+        self.async_client = async_client or create_async_client(api_key, base_url, max_connections)
+        # Least recently used first
+        self.sessions: "OrderedDict[str, HelloWorldAgent]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        self._in_flight = asyncio.Semaphore(max_in_flight or max_connections)
+        self.session_store = session_store
+        self.idle_timeout = idle_timeout
+        self.memory_limit = memory_limit_mb * 1024 * 1024 if memory_limit_mb else None
+        self.max_sessions = max_sessions
+        self.shared_store = shared_store
+        self.evicted_sessions = 0
+        self.coalescer = coalescer or (get_default_flight() if config.COALESCE_REQUESTS else None)
+        self.resilience = resilience or get_default_resilience()
+        self.rate_limiter = rate_limiter or get_default_limiter()
+
+    def get_session(self, session_id: str, personality: Optional[str] = None) -> HelloWorldAgent:
+        """Return the agent for `session_id`, creating it on first use"""
+        agent = self.sessions.get(session_id)
+        if agent is None:
+            kwargs = dict(model=self.model, personality=personality or self.personality,
+                          async_client=self.async_client, coalescer=self.coalescer,
+                          resilience=self.resilience, rate_limiter=self.rate_limiter,
+                          upstream_slots=self._in_flight)
+            if self.session_store is not None:
+                agent = HelloWorldAgent.resume(self.session_store, session_id, **kwargs)
+            else:
+                agent = HelloWorldAgent(**kwargs)
+            self.sessions[session_id] = agent
+            self._enforce_limits(keep=session_id)
+        else:
+            self.sessions.move_to_end(session_id)
+            if self.shared_store and not agent._turn_lock.locked() and agent.session_is_stale():
+                agent.restore_session()
+        self._last_used[session_id] = time.monotonic()
+        return agent
+
+    async def respond(self, session_id: str, user_input: str) -> str:
+        """Answer one turn for a session"""
+        # The session's own turn lock queues its turns; `_in_flight` is taken only around upstream requests,
+        # so a busy session's backlog never holds slots other sessions could use
+        return await self.get_session(session_id).arespond(user_input)
+
+    def evict(self, session_id: str) -> bool:
+        """Write a session to the store and drop it from memory (not while a turn is running)"""
+        agent = self.sessions.get(session_id)
+        if agent is None or agent._turn_lock.locked():
+            return False
+        if agent.session_store is not None:
+            agent.save_session()
+        del self.sessions[session_id]
+        self._last_used.pop(session_id, None)
+        self.evicted_sessions += 1
+        return True
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Evict sessions idle for longer than `idle_timeout`; returns how many"""
+        if self.idle_timeout is None:
+            return 0
+        cutoff = (now if now is not None else time.monotonic()) - self.idle_timeout
+        idle = [sid for sid in self.sessions if self._last_used.get(sid, 0) <= cutoff]
+        return sum(self.evict(sid) for sid in idle)
+
+    def over_memory_limit(self) -> bool:
+        return self.memory_limit is not None and current_rss_bytes() > self.memory_limit
+
+    def _enforce_limits(self, keep: Optional[str] = None):
+        """Evict least recently used sessions while over `max_sessions` or the memory limit"""
+        while self.max_sessions is not None and len(self.sessions) > self.max_sessions:
+            if not self._evict_oldest(keep):
+                return
+        if self.over_memory_limit():
+            # Freed memory is not always returned to the OS, so shed a batch rather than polling RSS per session
+            for _ in range(max(len(self.sessions) // 10, 1)):
+                if not self._evict_oldest(keep):
+                    return
+
+    def _evict_oldest(self, keep: Optional[str]) -> bool:
+        for session_id in self.sessions:
+            if session_id != keep and self.evict(session_id):
+                return True
+        return False
+
+    def sweep(self) -> int:
+        """Periodic maintenance: idle eviction plus limit enforcement; returns sessions evicted"""
+        before = self.evicted_sessions
+        self.evict_idle()
+        self._enforce_limits()
+        return self.evicted_sessions - before
+
+    async def respond_many(self, turns: Iterable[Tuple[str, str]]) -> List[str]:
+        """Run (session_id, user_input) turns concurrently; replies keep input order"""
+        return await asyncio.gather(*(self.respond(session_id, text) for session_id, text in turns))
+
+    def end_session(self, session_id: str) -> Optional[HelloWorldAgent]:
+        """Forget a session and return its agent (if any)"""
+        self._last_used.pop(session_id, None)
+        return self.sessions.pop(session_id, None)
+
+    async def aclose(self):
+        """Save every session to the store, then close the shared HTTP pool if this pool created it"""
+        if self.session_store is not None:
+            for session_id in list(self.sessions):
+                self.evict(session_id)
+        if self._owns_client and self.async_client is not None:
+            await self.async_client.close()
+
+    async def __aenter__(self) -> "AsyncAgentPool":
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
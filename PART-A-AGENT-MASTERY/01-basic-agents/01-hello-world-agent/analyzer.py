@@ -0,0 +1,162 @@
+"""
+Compiled intent/topic analyzer for the Hello World Agent
+All intent keywords are found in one regex pass, however many phrases there are
+
+The keyword table is an ordered mapping of intent -> phrases; the first intent
+(in table order) with a phrase anywhere in the lowercased text wins, and
+"conversation" is the fallback. Phrases match as plain substrings.
+"""
+
+import json
+import re
+from typing import Dict, Iterable, List, Mapping, Optional
+
+import config
+
+DEFAULT_INTENT = "conversation"
+MAX_TOPICS = 3
+MIN_TOPIC_LENGTH = 4
+
+# Maximal runs of non-whitespace are exactly the tokens of str.split()
+_TOPIC_PATTERN = re.compile(r"\S{%d,}" % MIN_TOPIC_LENGTH)
+
+
+def _build_trie(phrases: Iterable[str]) -> Dict:
+    trie: Dict = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = phrase
+    return trie
+
+
+def _trie_regex(node: Dict) -> str:
+    """
+    Turn a character trie into a regex with shared prefixes.
+
+    Matching costs O(phrase length) per position instead of trying every
+    alternative, and optional suffixes are greedy so the longest phrase at
+    a position wins.
+    """
+    branches = [re.escape(ch) + _trie_regex(child) for ch, child in sorted(node.items()) if ch != ""]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        return f"(?:{body})?"
+    return body
+
+
+def load_keyword_table(path: str) -> Dict[str, List[str]]:
+    """Load an intent -> phrases table from a JSON file (key order is priority order)"""
+    with open(path, encoding="utf-8") as f:
+        table = json.load(f)
+    return {intent: [str(p) for p in phrases] for intent, phrases in table.items()}
+
+
+class InputAnalyzer:
+    """
+    Precompiled matcher for intents and topics.
+
+    Every phrase is lowercased into one trie-shaped regex wrapped in a
+    lookahead, so overlapping phrases (e.g. "hi" inside "this") are all seen
+    in a single scan. Each phrase maps to a bitmask of the intents of every
+    phrase that is a prefix of it, since those match at the same position.
+    """
+
+    def __init__(self, keyword_table: Mapping[str, Iterable[str]]):
+        self.keyword_table: Dict[str, List[str]] = {intent: list(phrases) for intent, phrases in keyword_table.items()}
+        self.intents: List[str] = list(self.keyword_table)
+        # Integer codes for columnar output: table intents first, then the fallback
+        self.labels: List[str] = self.intents + [DEFAULT_INTENT]
+        phrase_intents: Dict[str, int] = {}
+        for bit, intent in enumerate(self.intents):
+            for phrase in self.keyword_table[intent]:
+                phrase = phrase.lower()
+                if phrase:
+                    phrase_intents[phrase] = phrase_intents.get(phrase, 0) | (1 << bit)
+
+        trie = _build_trie(phrase_intents)
+        self._masks: Dict[str, int] = {}
+        self._collect_masks(trie, 0, phrase_intents)
+        self._pattern = None
+        if phrase_intents:
+            # The leading class lets the regex engine skip positions that cannot start a phrase
+            first_chars = "".join(sorted({re.escape(phrase[0]) for phrase in phrase_intents}))
+            self._pattern = re.compile(f"(?=[{first_chars}])(?=({_trie_regex(trie)}))")
+
+    def _collect_masks(self, node: Dict, inherited: int, phrase_intents: Dict[str, int]):
+        # Iterative walk: long phrases must not hit the recursion limit
+        stack = [(node, inherited)]
+        while stack:
+            node, mask = stack.pop()
+            if "" in node:
+                phrase = node[""]
+                mask |= phrase_intents[phrase]
+                self._masks[phrase] = mask
+            for ch, child in node.items():
+                if ch != "":
+                    stack.append((child, mask))
+
+    @classmethod
+    def from_config(cls) -> "InputAnalyzer":
+        """Build from config.INTENT_KEYWORDS_PATH if set, else config.INTENT_KEYWORDS"""
+        if config.INTENT_KEYWORDS_PATH:
+            return cls(load_keyword_table(config.INTENT_KEYWORDS_PATH))
+        return cls(config.INTENT_KEYWORDS)
+
+    def intent_code(self, text_lower: str) -> int:
+        """Index into `labels` of the highest-priority intent in `text_lower`"""
+        fallback = len(self.intents)
+        if self._pattern is None:
+            return fallback
+        found = 0
+        masks = self._masks
+        for match in self._pattern.finditer(text_lower):
+            found |= masks[match.group(1)]
+            if found & 1:
+                break  # Top-priority intent found; nothing can beat it
+        if not found:
+            return fallback
+        return (found & -found).bit_length() - 1  # Lowest set bit = highest priority
+
+    def detect_intent(self, text_lower: str) -> str:
+        """Highest-priority intent with a phrase in `text_lower`"""
+        return self.labels[self.intent_code(text_lower)]
+
+    @staticmethod
+    def extract_topics(text_lower: str, limit: int = MAX_TOPICS) -> List[str]:
+        """First `limit` words longer than three characters (stops scanning early)"""
+        topics = []
+        for match in _TOPIC_PATTERN.finditer(text_lower):
+            topics.append(match.group())
+            if len(topics) == limit:
+                break
+        return topics
+
+    def analyze(self, text: str) -> Dict:
+        """Analyze user input to understand intent and content"""
+        text_lower = text.lower()
+        return self.make_analysis(self.detect_intent(text_lower), self.extract_topics(text_lower))
+
+    @staticmethod
+    def make_analysis(intent: str, topics: List[str]) -> Dict:
+        """The `input_analysis` dict shape used throughout the agent"""
+        return {
+            "intent": intent,
+            "entities": [],
+            "sentiment": "neutral",
+            "topics": topics
+        }
+
+
+_default_analyzer: Optional[InputAnalyzer] = None
+
+
+def get_default_analyzer() -> InputAnalyzer:
+    """Shared analyzer built once from config"""
+    global _default_analyzer
+    if _default_analyzer is None:
+        _default_analyzer = InputAnalyzer.from_config()
+    return _default_analyzer
@@ -0,0 +1,157 @@
+"""
+Batched offline analysis for the Hello World Agent
+Classifies large message corpora in chunks, optionally across worker processes
+
+Usage:
+    agent = HelloWorldAgent()
+    for reasoning in agent.think_many(read_messages("messages.txt")):
+        ...
+    columns = agent.think_many_columnar(read_messages("messages.txt"), workers=4)
+    print(columns.intent_counts())
+"""
+
+import importlib.util
+import json
+import time
+from array import array
+from collections import deque
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from analyzer import InputAnalyzer
+
+# NumPy is only imported once columnar results are built (it roughly doubles import time)
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# (intent codes, topics, seconds spent) for one chunk
+ChunkResult = Tuple[List[int], List[List[str]], float]
+
+
+def read_messages(source: Union[str, IO[str]], field_name: Optional[str] = None) -> Iterator[str]:
+    """
+    Stream messages from a file path or open text file, one per line.
+
+    With `field_name`, each line is parsed as JSON and that field is used
+    (for JSON-lines exports of logged conversations).
+    """
+    if isinstance(source, str):
+        with open(source, encoding="utf-8") as f:
+            yield from read_messages(f, field_name)
+        return
+    for line in source:
+        line = line.rstrip("\r\n")
+        yield json.loads(line)[field_name] if field_name else line
+
+
+def chunked(messages: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Split a (possibly unbounded) iterable into lists of at most `size` items"""
+    iterator = iter(messages)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def analyze_chunk(analyzer: InputAnalyzer, chunk: List[str]) -> ChunkResult:
+    """Classify one chunk into compact columns (codes and topics)"""
+    start = time.perf_counter()
+    intent_code = analyzer.intent_code
+    extract_topics = analyzer.extract_topics
+    codes = []
+    topics = []
+    for text in chunk:
+        text_lower = text.lower()
+        codes.append(intent_code(text_lower))
+        topics.append(extract_topics(text_lower))
+    return codes, topics, time.perf_counter() - start
+
+
+# Worker-process state: the analyzer is rebuilt once per worker, not pickled per chunk
+_worker_analyzer: Optional[InputAnalyzer] = None
+
+
+def _init_worker(keyword_table: Dict[str, List[str]]):
+    global _worker_analyzer
+    _worker_analyzer = InputAnalyzer(keyword_table)
+
+
+def _analyze_chunk_in_worker(chunk: List[str]) -> ChunkResult:
+    return analyze_chunk(_worker_analyzer, chunk)
+
+
+def analyze_chunks(analyzer: InputAnalyzer, messages: Iterable[str], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   workers: Optional[int] = None) -> Iterator[Tuple[List[str], ChunkResult]]:
+    """
+    Yield (chunk, result) pairs in input order.
+
+    With `workers` > 1 chunks are spread over a process pool. Only a few
+    chunks per worker are in flight at once, so arbitrarily large streams
+    are processed in bounded memory.
+    """
+    chunks = chunked(messages, chunk_size)
+    if not workers or workers <= 1:
+        for chunk in chunks:
+            yield chunk, analyze_chunk(analyzer, chunk)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor  # Pulls in multiprocessing; only needed here
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(analyzer.keyword_table,)) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, executor.submit(_analyze_chunk_in_worker, chunk)))
+            if len(pending) >= workers * 2:
+                done_chunk, future = pending.popleft()
+                yield done_chunk, future.result()
+        while pending:
+            done_chunk, future = pending.popleft()
+            yield done_chunk, future.result()
+
+
+@dataclass
+class BatchAnalysis:
+    """Columnar analysis results: one intent code and topic list per message"""
+    labels: List[str]
+    intent_codes: "numpy.ndarray | array"
+    topics: List[List[str]] = field(default_factory=list)
+    total_time: float = 0.0
+
+    def __len__(self) -> int:
+        return len(self.intent_codes)
+
+    @property
+    def intents(self) -> List[str]:
+        return [self.labels[code] for code in self.intent_codes]
+
+    def intent_counts(self) -> Dict[str, int]:
+        if NUMPY_AVAILABLE:
+            import numpy as np
+            counts = np.bincount(self.intent_codes, minlength=len(self.labels))
+        else:
+            counts = [0] * len(self.labels)
+            for code in self.intent_codes:
+                counts[code] += 1
+        return {label: int(count) for label, count in zip(self.labels, counts)}
+
+
+def collect_columnar(analyzer: InputAnalyzer, messages: Iterable[str], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     workers: Optional[int] = None) -> BatchAnalysis:
+    """Analyze every message into a `BatchAnalysis` (intent codes as a NumPy uint8 array when available)"""
+    codes = array("B" if len(analyzer.labels) <= 256 else "H")
+    topics: List[List[str]] = []
+    total_time = 0.0
+    for _, (chunk_codes, chunk_topics, elapsed) in analyze_chunks(analyzer, messages, chunk_size, workers):
+        codes.extend(chunk_codes)
+        topics.extend(chunk_topics)
+        total_time += elapsed
+    if NUMPY_AVAILABLE:
+        import numpy as np
+        intent_codes = np.frombuffer(codes, dtype=np.uint8 if codes.typecode == "B" else np.uint16).copy()
+    else:
+        intent_codes = codes
+    return BatchAnalysis(labels=list(analyzer.labels), intent_codes=intent_codes,
+                         topics=topics, total_time=total_time)
@@ -0,0 +1,76 @@
+"""
+Throughput benchmark: sync `respond` vs async `AsyncAgentPool`
+Runs against a local stub server, so no API key or network is needed
+
+Usage:
+    python benchmarks/async_throughput.py --sessions 200 --turns 3 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from openai import OpenAI
+
+import config
+from agent import HelloWorldAgent
+from agent_pool import AsyncAgentPool
+from fake_llm import FakeLLMServer
+
+API_KEY = "benchmark-key"
+
+
+def run_sync(base_url: str, sessions: int, turns: int) -> float:
+    """One worker thread answering every session in turn"""
+    client = OpenAI(api_key=API_KEY, base_url=base_url)
+    agents = [HelloWorldAgent(client=client) for _ in range(sessions)]
+    start = time.perf_counter()
+    for turn in range(turns):
+        for agent in agents:
+            agent.respond(f"Hello, this is turn {turn}")
+    return time.perf_counter() - start
+
+
+async def run_async(base_url: str, sessions: int, turns: int, connections: int) -> float:
+    """All sessions served concurrently on one event loop"""
+    async with AsyncAgentPool(api_key=API_KEY, base_url=base_url, max_connections=connections) as pool:
+        async def session(session_id: str):
+            for turn in range(turns):
+                await pool.respond(session_id, f"Hello, this is turn {turn}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(session(f"session-{i}") for i in range(sessions)))
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sync and async agent throughput")
+    parser.add_argument("--sessions", type=int, default=200, help="Concurrent conversations")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per conversation")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub server latency (seconds)")
+    parser.add_argument("--connections", type=int, default=config.ASYNC_MAX_CONNECTIONS,
+                        help="Pooled connections for the async path")
+    parser.add_argument("--skip-sync", action="store_true", help="Only run the async path")
+    args = parser.parse_args()
+
+    total_turns = args.sessions * args.turns
+    print(f"⚡ {args.sessions} sessions x {args.turns} turns, stub latency {args.latency * 1000:.0f}ms, "
+          f"{args.connections} pooled connections")
+    print("-" * 60)
+
+    with FakeLLMServer(latency=args.latency) as server:
+        if not args.skip_sync:
+            sync_time = run_sync(server.base_url, args.sessions, args.turns)
+            print(f"sync  respond : {sync_time:8.2f}s  {total_turns / sync_time:8.1f} turns/s")
+        async_time = asyncio.run(run_async(server.base_url, args.sessions, args.turns, args.connections))
+        print(f"async pool    : {async_time:8.2f}s  {total_turns / async_time:8.1f} turns/s")
+        if not args.skip_sync:
+            print(f"speedup       : {sync_time / async_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Micro-benchmarks for the agent hot path with regression thresholds
+Times think, _analyze_input, _log_interaction, get_conversation_summary and
+respond (against an in-process stub client) across history sizes
+
+Usage:
+    python benchmarks/hot_path.py --save-baseline baseline.json
+    python benchmarks/hot_path.py --baseline baseline.json --max-regression 20
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from agent import HelloWorldAgent
+from history import RingBufferHistory
+from tracing import percentile
+
+DEFAULT_SIZES = [10, 100, 1_000, 10_000, 100_000]
+SAMPLE_MESSAGE = "Hello! Can you help me understand Python classes and objects?"
+
+
+class StubClient:
+    """Stands in for OpenAI so `respond` is timed without any network I/O"""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    @staticmethod
+    def _create(**kwargs):
+        message = SimpleNamespace(content="Stub reply")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def make_agent(history_size: int) -> HelloWorldAgent:
+    """Agent whose history (and stats) already hold `history_size` messages"""
+    agent = HelloWorldAgent(client=StubClient(), history_store=RingBufferHistory(capacity=history_size))
+    agent.summarizer = None  # Background summary calls would add noise to the samples
+    reasoning = agent.think(SAMPLE_MESSAGE)
+    for i in range(max(history_size // 2, 1)):
+        agent._log_interaction(f"{SAMPLE_MESSAGE} #{i}", "Stub reply", reasoning)
+    return agent
+
+
+def benchmark_cases(agent: HelloWorldAgent) -> Dict[str, Callable[[], object]]:
+    reasoning = agent.think(SAMPLE_MESSAGE)
+    return {
+        "think": lambda: agent.think(SAMPLE_MESSAGE),
+        "_analyze_input": lambda: agent._analyze_input(SAMPLE_MESSAGE),
+        "_log_interaction": lambda: agent._log_interaction(SAMPLE_MESSAGE, "Stub reply", reasoning),
+        "get_conversation_summary": agent.get_conversation_summary,
+        "respond": lambda: agent.respond(SAMPLE_MESSAGE),
+    }
+
+
+def calibrate(fn: Callable[[], object], target_ns: int) -> int:
+    """Calls per sample so that one sample takes roughly `target_ns`"""
+    number = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= target_ns or number >= 1_000_000:
+            return number
+        number *= 2 if elapsed == 0 else max(2, min(10, int(target_ns / max(elapsed, 1))))
+
+
+def measure(fn: Callable[[], object], repeat: int, warmup: int, target_ns: int) -> Dict:
+    """Warm up, then take `repeat` samples of ns per call"""
+    for _ in range(warmup):
+        fn()
+    number = calibrate(fn, target_ns)
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter_ns()
+            for _ in range(number):
+                fn()
+            samples.append((time.perf_counter_ns() - start) / number)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    samples.sort()
+    return {
+        "calls_per_sample": number,
+        "samples": len(samples),
+        "min_ns": samples[0],
+        "mean_ns": sum(samples) / len(samples),
+        "p50_ns": percentile(samples, 50),
+        "p90_ns": percentile(samples, 90),
+        "p99_ns": percentile(samples, 99),
+    }
+
+
+def run_suite(sizes: List[int], names: List[str], repeat: int, warmup: int, target_ns: int) -> Dict:
+    results: Dict[str, Dict] = {}
+    for size in sizes:
+        for name in names:
+            # Fresh agent per case so earlier cases do not change the history under test
+            fn = benchmark_cases(make_agent(size))[name]
+            key = f"{name}[{size}]"
+            results[key] = measure(fn, repeat, warmup, target_ns)
+            r = results[key]
+            print(f"{key:34s} p50 {r['p50_ns'] / 1000:10.2f}µs  p90 {r['p90_ns'] / 1000:10.2f}µs  "
+                  f"p99 {r['p99_ns'] / 1000:10.2f}µs  (n={r['calls_per_sample']}x{r['samples']})")
+    return results
+
+
+def compare(results: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """Names of benchmarks whose p50 regressed by more than `max_regression` percent"""
+    failures = []
+    print(f"\n📏 Comparing p50 against baseline (threshold {max_regression:.0f}%)")
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        change = (result["p50_ns"] - base["p50_ns"]) / base["p50_ns"] * 100
+        flag = "❌" if change > max_regression else "✅"
+        print(f"{flag} {key:34s} {change:+7.1f}%")
+        if change > max_regression:
+            failures.append(key)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot-path micro-benchmarks for HelloWorldAgent")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated history sizes")
+    parser.add_argument("--only", default=None,
+                        help="Comma-separated benchmark names (default: all)")
+    parser.add_argument("--repeat", type=int, default=15, help="Samples per benchmark")
+    parser.add_argument("--warmup", type=int, default=50, help="Warm-up calls before sampling")
+    parser.add_argument("--sample-ms", type=float, default=10.0, help="Target duration of one sample")
+    parser.add_argument("--baseline", help="JSON baseline to compare against")
+    parser.add_argument("--max-regression", type=float, default=20.0,
+                        help="Fail if any p50 is this many percent slower than the baseline")
+    parser.add_argument("--save-baseline", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    names = args.only.split(",") if args.only else list(benchmark_cases(make_agent(10)))
+
+    print("⚡ Agent hot-path benchmarks")
+    print("=" * 60)
+    results = run_suite(sizes, names, args.repeat, args.warmup, int(args.sample_ms * 1_000_000))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2)
+        print(f"\n📄 Baseline saved to: {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        failures = compare(results, baseline, args.max_regression)
+        if failures:
+            print(f"\n❌ {len(failures)} benchmark(s) regressed: {', '.join(failures)}")
+            sys.exit(1)
+        print("\n✅ No regressions beyond threshold")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Prompt size and latency per turn, with and without the rolling summary
+Runs a long session against a local stub server (no API key or network needed)
+
+Usage:
+    python benchmarks/rolling_summary.py --turns 60 --latency 0.02
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from openai import OpenAI
+
+import config
+from agent import HelloWorldAgent
+from context import ContextBuilder
+from fake_llm import FakeLLMServer
+from history import RingBufferHistory
+from summarizer import RollingSummarizer, llm_summarize_fn
+from tokens import get_tokenizer
+
+API_KEY = "benchmark-key"
+FILLER = ("I am planning a trip to Lisbon in May with two friends, we like food markets, "
+          "old trams and day trips to the coast, and we are on a moderate budget.")
+
+
+def run_session(base_url: str, turns: int, budget: int, summarize: bool) -> List[Dict]:
+    client = OpenAI(api_key=API_KEY, base_url=base_url)
+    agent = HelloWorldAgent(
+        client=client,
+        history_store=RingBufferHistory(capacity=None),
+        context_builder=ContextBuilder(get_tokenizer(config.DEFAULT_MODEL), token_budget=budget),
+    )
+    agent.summarizer = RollingSummarizer(llm_summarize_fn(client, agent.model)) if summarize else None
+
+    rows = []
+    for turn in range(turns):
+        before = agent.stats.prompt_tokens_total
+        start = time.perf_counter()
+        agent.respond(f"Turn {turn}: {FILLER}")
+        rows.append({
+            "turn": turn + 1,
+            "prompt_tokens": agent.stats.prompt_tokens_total - before,
+            "latency_ms": (time.perf_counter() - start) * 1000,
+        })
+    if agent.summarizer is not None:
+        agent.summarizer.flush()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-turn prompt size with and without rolling summaries")
+    parser.add_argument("--turns", type=int, default=60, help="Turns in the session")
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub server latency (seconds)")
+    parser.add_argument("--budget", type=int, default=8192,
+                        help="Context token budget (large, so the unsummarized prompt can grow)")
+    parser.add_argument("--every", type=int, default=10, help="Print every Nth turn")
+    args = parser.parse_args()
+
+    print("🧾 Rolling summary benchmark")
+    print("=" * 60)
+    with FakeLLMServer(latency=args.latency) as server:
+        before = run_session(server.base_url, args.turns, args.budget, summarize=False)
+        after = run_session(server.base_url, args.turns, args.budget, summarize=True)
+
+    print(f"{'turn':>6} {'tokens (full)':>14} {'tokens (summary)':>17} {'ms (full)':>10} {'ms (summary)':>13}")
+    for b, a in zip(before, after):
+        if b["turn"] % args.every == 0 or b["turn"] == 1:
+            print(f"{b['turn']:>6} {b['prompt_tokens']:>14} {a['prompt_tokens']:>17} "
+                  f"{b['latency_ms']:>10.1f} {a['latency_ms']:>13.1f}")
+
+    def mean(rows, key):
+        return sum(r[key] for r in rows) / len(rows)
+
+    print(f"\n📊 Mean prompt tokens: {mean(before, 'prompt_tokens'):.0f} -> {mean(after, 'prompt_tokens'):.0f}")
+    print(f"📊 Last-turn prompt tokens: {before[-1]['prompt_tokens']} -> {after[-1]['prompt_tokens']}")
+    print(f"⏱️  Mean turn latency: {mean(before, 'latency_ms'):.1f}ms -> {mean(after, 'latency_ms'):.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Load generator for the multi-tenant agent server
+Starts server.py against a local stub LLM and drives many concurrent sessions over HTTP
+
+Usage:
+    python benchmarks/server_load.py --sessions 500 --turns 4 --workers 2 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, '..'))
+
+from fake_llm import FakeLLMServer
+from tracing import percentile
+
+
+def start_server(port: int, workers: int, store: str, base_url: str, extra: List[str]) -> subprocess.Popen:
+    command = [sys.executable, os.path.join(HERE, "..", "server.py"), "--port", str(port),
+               "--workers", str(workers), "--store", store, "--base-url", base_url,
+               "--api-key", "benchmark-key", *extra]
+    return subprocess.Popen(command, stdout=subprocess.DEVNULL)
+
+
+async def wait_ready(url: str, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                if (await client.get(f"{url}/healthz")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError("Server did not start")
+            await asyncio.sleep(0.1)
+
+
+async def drive(url: str, sessions: int, turns: int, connections: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        async def session(session_id: str):
+            nonlocal errors
+            for turn in range(turns):
+                start = time.perf_counter()
+                response = await client.post(f"/sessions/{session_id}/messages",
+                                             json={"message": f"Hello, this is turn {turn}"})
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(session(f"load-{i}") for i in range(sessions)))
+        elapsed = time.perf_counter() - start
+        metrics = (await client.get("/metrics")).json()
+    latencies.sort()
+    return {"elapsed": elapsed, "latencies": latencies, "errors": errors, "metrics": metrics}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive server.py with many concurrent sessions")
+    parser.add_argument("--sessions", type=int, default=500, help="Concurrent sessions")
+    parser.add_argument("--turns", type=int, default=4, help="Turns per session")
+    parser.add_argument("--workers", type=int, default=1, help="Server processes")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub LLM latency (seconds)")
+    parser.add_argument("--connections", type=int, default=200, help="Client connections")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--memory-limit-mb", type=float, default=None, help="Passed to every worker")
+    args = parser.parse_args()
+
+    extra = ["--memory-limit-mb", str(args.memory_limit_mb)] if args.memory_limit_mb else []
+    url = f"http://127.0.0.1:{args.port}"
+    cores = min(args.workers, os.cpu_count() or 1)
+
+    print(f"🌐 {args.sessions} sessions x {args.turns} turns, {args.workers} worker(s), "
+          f"stub latency {args.latency * 1000:.0f}ms")
+    print("-" * 60)
+    with tempfile.TemporaryDirectory() as tmp, FakeLLMServer(latency=args.latency) as llm:
+        server = start_server(args.port, args.workers, os.path.join(tmp, "sessions.db"), llm.base_url, extra)
+        try:
+            asyncio.run(wait_ready(url))
+            result = asyncio.run(drive(url, args.sessions, args.turns, args.connections))
+        finally:
+            server.terminate()
+            server.wait()
+
+    latencies = result["latencies"]
+    total = len(latencies)
+    throughput = total / result["elapsed"]
+    print(f"turns/s          : {throughput:10.1f}  ({throughput / cores:.1f} per core, {cores} core(s))")
+    print(f"sessions/core    : {args.sessions / cores:10.1f}")
+    print(f"latency p50      : {percentile(latencies, 50) * 1000:10.1f}ms")
+    print(f"latency p95      : {percentile(latencies, 95) * 1000:10.1f}ms")
+    print(f"latency p99      : {percentile(latencies, 99) * 1000:10.1f}ms")
+    print(f"latency max      : {latencies[-1] * 1000:10.1f}ms")
+    print(f"errors           : {result['errors']:10d}")
+    metrics = result["metrics"]
+    print(f"worker {metrics['pid']}: {metrics['live_sessions']} live sessions, "
+          f"{metrics['evicted_sessions']} evicted, RSS {metrics['rss_bytes'] / 1e6:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Save/restore throughput for persistent sessions
+Logs a long synthetic session to each backend, then times snapshot and restore
+
+Usage:
+    python benchmarks/session_store.py --turns 10000
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import config
+from agent import HelloWorldAgent
+from sessions import MSGPACK_AVAILABLE, FileSessionStore, SessionStore, SQLiteSessionStore
+
+SAMPLE_MESSAGE = "Hello! Can you help me understand Python classes and objects?"
+
+
+def fill_session(store: SessionStore, turns: int) -> HelloWorldAgent:
+    """Log `turns` turns (no LLM call) with the default snapshot interval"""
+    agent = HelloWorldAgent(session_store=store, session_id="bench")
+    agent.summarizer = None
+    reasoning = agent.think(SAMPLE_MESSAGE)
+    for i in range(turns):
+        agent._log_interaction(f"{SAMPLE_MESSAGE} #{i}", "Sure! A class is a blueprint for objects.", reasoning)
+    return agent
+
+
+def time_restore(store: SessionStore, repeat: int) -> float:
+    """Best-of-`repeat` milliseconds to resume the session"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        agent = HelloWorldAgent(session_store=store, session_id="bench")
+        agent.summarizer = None
+        agent.restore_session()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run_backend(name: str, store: SessionStore, turns: int, repeat: int):
+    start = time.perf_counter()
+    agent = fill_session(store, turns)
+    append_time = time.perf_counter() - start
+
+    tail = agent._turns_since_snapshot
+    restore_tail_ms = time_restore(store, repeat)
+
+    start = time.perf_counter()
+    agent.save_session()
+    snapshot_ms = (time.perf_counter() - start) * 1000
+    restore_snapshot_ms = time_restore(store, repeat)
+
+    print(f"{name:8s} append {turns / append_time:10.0f} turns/s   snapshot {snapshot_ms:7.2f}ms   "
+          f"restore {restore_tail_ms:7.2f}ms ({tail} turns replayed) / {restore_snapshot_ms:7.2f}ms (snapshot only)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session store save/restore benchmark")
+    parser.add_argument("--turns", type=int, default=10_000, help="Turns in the synthetic session")
+    parser.add_argument("--repeat", type=int, default=5, help="Restores timed per case (best is reported)")
+    args = parser.parse_args()
+
+    print(f"💾 Session store benchmark ({args.turns} turns, snapshot every {config.SESSION_SNAPSHOT_EVERY}, "
+          f"{'msgpack' if MSGPACK_AVAILABLE else 'JSON'} records)")
+    print("=" * 60)
+    workdir = tempfile.mkdtemp(prefix="session-bench-")
+    try:
+        for name, store in [("file", FileSessionStore(os.path.join(workdir, "files"))),
+                            ("sqlite", SQLiteSessionStore(os.path.join(workdir, "sessions.db")))]:
+            run_backend(name, store, args.turns, args.repeat)
+            store.close()
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Cold-start time of the agent entry points
+Runs each one in a fresh interpreter and reports its import time (from
+`python -X importtime`) and the wall time of `--help`
+
+Usage:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --json startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+AGENT_DIR = os.path.dirname(HERE)
+TOOL_AGENTS_DIR = os.path.join(AGENT_DIR, "..", "..", "02-tool-using-agents")
+
+# (label, script path, whether it has an argparse CLI)
+ENTRY_POINTS = [
+    ("agent.py", os.path.join(AGENT_DIR, "agent.py"), True),
+    ("video_downloader_agent.py", os.path.join(TOOL_AGENTS_DIR, "16-video-agent", "video_downloader_agent.py"), True),
+    ("youtube_agent.py", os.path.join(TOOL_AGENTS_DIR, "21-youtube-agent", "youtube_agent.py"), True),
+    ("agno_youtube_agent.py", os.path.join(TOOL_AGENTS_DIR, "21-youtube-agent", "src", "agno_youtube_agent.py"), False),
+]
+
+
+def import_time_us(script: str) -> Optional[int]:
+    """Cumulative import time of the script's module in microseconds (None if it fails to import)"""
+    module = os.path.splitext(os.path.basename(script))[0]
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=os.path.dirname(script), capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    for line in reversed(result.stderr.splitlines()):
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1])
+    return None
+
+
+def wall_time_s(command: List[str], cwd: Optional[str] = None) -> float:
+    """Wall time of one run of `command`, interpreter start-up included"""
+    start = time.perf_counter()
+    subprocess.run(command, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def measure(runs: int) -> List[Dict]:
+    interpreter = statistics.median(wall_time_s([sys.executable, "-c", "pass"]) for _ in range(runs))
+    results = []
+    for label, script, has_cli in ENTRY_POINTS:
+        imports = [import_time_us(script) for _ in range(runs)]
+        results.append({
+            "entry_point": label,
+            "import_ms": None if None in imports else round(statistics.median(imports) / 1000, 1),
+            "help_ms": round(statistics.median(
+                wall_time_s([sys.executable, script, "--help"], os.path.dirname(script)) for _ in range(runs)
+            ) * 1000, 1) if has_cli else None,
+            "interpreter_ms": round(interpreter * 1000, 1),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report cold-start time of the agent entry points")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per measurement (median is reported)")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = measure(args.runs)
+    print(f"Python {sys.version.split()[0]}, median of {args.runs} runs "
+          f"(bare interpreter start: {results[0]['interpreter_ms']} ms)")
+    print(f"{'entry point':<28}{'import (ms)':>14}{'--help (ms)':>14}")
+    for row in results:
+        import_ms = "import error" if row["import_ms"] is None else f"{row['import_ms']:.1f}"
+        help_ms = "-" if row["help_ms"] is None else f"{row['help_ms']:.1f}"
+        print(f"{row['entry_point']:<28}{import_ms:>14}{help_ms:>14}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Response caches for the Hello World Agent
+Repeated prompts (greetings, FAQs) are answered without another LLM call
+
+Usage:
+    cache = TieredCache(LRUCache(max_entries=1024, ttl=3600), SQLiteCache("responses.db"))
+    agent = HelloWorldAgent(response_cache=cache)
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import config
+
+
+def make_cache_key(params: Dict) -> str:
+    """
+    Hash the request parameters that determine the completion.
+
+    Message text is whitespace-normalized so "Hello!" and " Hello! " share
+    an entry. The system prompt, model, max_tokens and temperature are all
+    part of the key, so personalities never share answers.
+    """
+    normalized = {
+        "model": params.get("model"),
+        "max_tokens": params.get("max_tokens"),
+        "temperature": params.get("temperature"),
+        "messages": [
+            [m.get("role"), " ".join(str(m.get("content", "")).split())]
+            for m in params.get("messages", [])
+        ],
+    }
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Base class: string keys to response strings with hit/miss/eviction counters"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: str):
+        self._set(key, value)
+
+    def _get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def _set(self, key: str, value: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class LRUCache(ResponseCache):
+    """In-memory LRU cache; entries also expire `ttl` seconds after being stored"""
+
+    def __init__(self, max_entries: int = config.RESPONSE_CACHE_MAX_ENTRIES,
+                 ttl: Optional[float] = config.RESPONSE_CACHE_TTL):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: str):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache(ResponseCache):
+    """Persistent cache in a SQLite file, shared across restarts and processes"""
+
+    def __init__(self, path: str = "response_cache.db", ttl: Optional[float] = 86400,
+                 max_entries: int = 100_000):
+        super().__init__()
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+        self._conn.commit()
+
+    def _get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self.ttl is not None and created + self.ttl <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.evictions += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return value
+
+    def _set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            if count > self.max_entries:
+                excess = count - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY accessed LIMIT ?)", (excess,)
+                )
+                self.evictions += excess
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+class TieredCache(ResponseCache):
+    """Checks each layer in order (e.g. memory, then SQLite) and backfills faster layers on a hit"""
+
+    def __init__(self, *layers: ResponseCache):
+        super().__init__()
+        self.layers = layers
+
+    def _get(self, key: str) -> Optional[str]:
+        for i, layer in enumerate(self.layers):
+            value = layer.get(key)
+            if value is not None:
+                for faster in self.layers[:i]:
+                    faster.set(key, value)
+                return value
+        return None
+
+    def _set(self, key: str, value: str):
+        for layer in self.layers:
+            layer.set(key, value)
+
+    def clear(self):
+        for layer in self.layers:
+            layer.clear()
+
+    def stats(self) -> Dict[str, int]:
+        evictions = sum(layer.evictions for layer in self.layers)
+        return {"hits": self.hits, "misses": self.misses, "evictions": evictions}
@@ -0,0 +1,77 @@
+"""
+Shared OpenAI clients for the Hello World Agent
+Agents reuse one connection-pooled client instead of building their own
+
+`openai` and `httpx` are imported when the first client is built, so
+offline use (no API key) never pays for them.
+"""
+
+import importlib.util
+import os
+from typing import TYPE_CHECKING, Dict, Optional, Tuple, Union
+
+import config
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None  # httpx needs it for HTTP/2
+
+_sync_clients: Dict[Tuple[str, Optional[str]], "OpenAI"] = {}
+_no_retry_clients: Dict[int, Tuple[object, object]] = {}
+
+
+def get_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> Optional["OpenAI"]:
+    """
+    Return the process-wide sync client for this key, or None without a key.
+
+    The client keeps its own HTTP connection pool, so sharing it across
+    agents avoids a new TCP/TLS handshake per agent.
+    """
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+    key = (api_key, base_url)
+    if key not in _sync_clients:
+        from openai import OpenAI
+        _sync_clients[key] = OpenAI(api_key=api_key, base_url=base_url)
+    return _sync_clients[key]
+
+
+def create_async_client(api_key: Optional[str] = None, base_url: Optional[str] = None,
+                        max_connections: int = config.ASYNC_MAX_CONNECTIONS,
+                        http2: bool = True) -> Optional["AsyncOpenAI"]:
+    """
+    Build an AsyncOpenAI client on a pooled (HTTP/2 when available) transport.
+
+    Async clients are bound to the event loop that first uses them, so the
+    owner (usually an `AsyncAgentPool`) is responsible for closing it.
+    """
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+    import httpx
+    from openai import AsyncOpenAI
+    http_client = httpx.AsyncClient(
+        http2=http2 and HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        ),
+    )
+    return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+
+
+def without_retries(client: Union["OpenAI", "AsyncOpenAI"]):
+    """
+    Copy of `client` with the SDK's own retries off, sharing its connection pool.
+
+    The agent's resilience layer retries instead; leaving both on would
+    multiply attempts. Test doubles without `with_options` are returned as is.
+    """
+    entry = _no_retry_clients.get(id(client))
+    if entry is None or entry[0] is not client:
+        with_options = getattr(client, "with_options", None)
+        derived = with_options(max_retries=0) if with_options is not None else client
+        entry = _no_retry_clients[id(client)] = (client, derived)
+    return entry[1]
@@ -0,0 +1,146 @@
+"""
+Request coalescing for the Hello World Agent
+Identical in-flight LLM calls share one upstream request (single-flight)
+
+The first caller for a key runs the call; callers that arrive with the
+same key before it finishes wait for it and receive the same reply (or
+the same exception). Nothing is kept once the call completes, so this
+never serves stale answers; pair it with a response cache for that.
+
+Usage:
+    flight = SingleFlight()
+    reply, coalesced = flight.do(key, lambda: call_llm(params))
+    reply, coalesced = await flight.ado(key, lambda: acall_llm(params))
+"""
+
+import asyncio
+import threading
+from operator import itemgetter
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_role_and_content = itemgetter("role", "content")
+
+
+def make_flight_key(params: Dict) -> Tuple:
+    """
+    Hashable identity of a completion request.
+
+    Cheaper than `cache.make_cache_key` (no JSON or digest): history
+    strings are reused between requests so their hashes are cached, and
+    only the newest message is whitespace-normalized.
+    """
+    messages = params.get("messages", [])
+    *earlier, last = messages or [{}]
+    return (
+        params.get("model"), params.get("max_tokens"), params.get("temperature"),
+        tuple(map(_role_and_content, earlier)),
+        last.get("role"), " ".join(str(last.get("content", "")).split()),
+    )
+
+
+class _Call:
+    """One in-flight sync call; `done` is held until the result is set (cheaper than an Event)"""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Lock()
+        self.done.acquire()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    De-duplicates concurrent calls by key, for threads (`do`) and
+    coroutines (`ado`).
+
+    `calls` counts upstream calls actually made and `coalesced` the callers
+    that shared one instead. Async calls run as a shielded task, so a
+    cancelled waiter does not cancel the call for the others; the task is
+    only cancelled once every waiter has gone.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._sync: Dict[Hashable, _Call] = {}
+        self._async: Dict[Tuple[int, Hashable], list] = {}  # -> [task, waiters]
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """Run `fn` once per key at a time; returns (result, whether another caller ran it)"""
+        with self._lock:
+            call = self._sync.get(key)
+            coalesced = call is not None
+            if coalesced:
+                self.coalesced += 1
+            else:
+                call = self._sync[key] = _Call()
+                self.calls += 1
+        if coalesced:
+            with call.done:
+                pass
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._sync[key]
+            call.done.release()
+        return call.result, False
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Async `do`: awaits `fn()` once per key at a time on the running loop"""
+        loop_key = (id(asyncio.get_running_loop()), key)
+        entry = self._async.get(loop_key)
+        coalesced = entry is not None
+        if coalesced:
+            with self._lock:
+                self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            entry = self._async[loop_key] = [task, 0]
+            task.add_done_callback(lambda _: self._async.pop(loop_key, None))
+            with self._lock:
+                self.calls += 1
+
+        task = entry[0]
+        entry[1] += 1
+        try:
+            return await asyncio.shield(task), coalesced
+        except asyncio.CancelledError:
+            if not task.done() and entry[1] == 1:
+                task.cancel()  # Last waiter gone
+            raise
+        finally:
+            entry[1] -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced}
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls = 0
+            self.coalesced = 0
+
+
+_default_flight: Optional[SingleFlight] = None
+_default_lock = threading.Lock()
+
+
+def get_default_flight() -> SingleFlight:
+    """Process-wide coalescer shared by every agent"""
+    global _default_flight
+    with _default_lock:
+        if _default_flight is None:
+            _default_flight = SingleFlight()
+        return _default_flight
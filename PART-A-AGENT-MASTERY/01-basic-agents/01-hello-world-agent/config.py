@@ -1,7 +1,7 @@
 """Configuration settings for the Hello World Agent"""
 
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 # OpenAI API Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -10,7 +10,8 @@ DEFAULT_MODEL = "gpt-3.5-turbo"
 # Agent Configuration
 DEFAULT_PERSONALITY = "friendly_assistant"
 MAX_CONVERSATION_HISTORY = 10
-DEFAULT_RESPONSE_TIMEOUT = 30
+HISTORY_SPILL_PATH = os.getenv("AGENT_HISTORY_SPILL_PATH")  # JSON-lines log for evicted turns
+DEFAULT_RESPONSE_TIMEOUT = float(os.getenv("AGENT_RESPONSE_TIMEOUT", "30"))  # Seconds per reply, retries included
 
 # Logging Configuration
 LOG_LEVEL = "INFO"
@@ -18,11 +19,76 @@ LOG_CONVERSATIONS = True
 
 # Performance Settings
 MAX_TOKENS = 150
+CONTEXT_TOKEN_BUDGET = int(os.getenv("AGENT_CONTEXT_TOKEN_BUDGET", "1024"))  # Prompt tokens per request
+ROLLING_SUMMARY = os.getenv("AGENT_ROLLING_SUMMARY", "1") != "0"  # Summarize turns older than the live window
+SUMMARY_LLM = os.getenv("AGENT_SUMMARY_LLM", "0") == "1"  # Opt in: summaries as extra (billed) LLM calls
+SUMMARY_LIVE_MESSAGES = 6  # Most recent messages always sent verbatim
+SUMMARY_BATCH_MESSAGES = 4  # Aged-out messages folded into the summary per update
+SUMMARY_MAX_TOKENS = 200
+SUMMARY_WORKERS = 4  # Background threads shared by all agents
+SESSION_SNAPSHOT_EVERY = 100  # Turns between session snapshots (restore replays at most this many)
 TEMPERATURE = 0.7
+RESPONSE_CACHE_MAX_ENTRIES = 1024  # In-memory LRU size
+RESPONSE_CACHE_TTL = 3600  # Seconds before a cached response expires
+RETRY_MAX_ATTEMPTS = 3  # Upstream attempts per reply (retryable errors only)
+RETRY_BASE_DELAY = 0.25  # Backoff cap doubles per retry; the actual wait is jittered below it
+RETRY_MAX_DELAY = 4.0
+HEDGE_PERCENTILE = 95  # Send a second request once the first is slower than this latency percentile
+HEDGE_MIN_DELAY = 0.05  # Never hedge calls whose percentile latency is below this (seconds)
+HEDGE_MIN_SAMPLES = 20  # Latencies needed before hedging starts
+HEDGE_BUDGET = 0.05  # At most this fraction of calls are hedged (so a saturated backend is not doubled)
+HEDGE_WORKERS = 32  # Threads for sync hedged requests, shared by all agents
+BREAKER_FAILURE_THRESHOLD = 5  # Consecutive failed attempts before failing fast
+BREAKER_RESET_TIMEOUT = 30  # Seconds before a probe request is let through
+RATE_LIMIT_RPM = float(os.getenv("AGENT_RATE_LIMIT_RPM", "0")) or None  # Requests/minute shared by all agents
+RATE_LIMIT_TPM = float(os.getenv("AGENT_RATE_LIMIT_TPM", "0")) or None  # Estimated tokens/minute
+RATE_LIMIT_BURST_SECONDS = 10  # Bucket size in seconds of quota (bursts above this queue)
+COALESCE_REQUESTS = os.getenv("AGENT_COALESCE_REQUESTS", "1") != "0"  # Share identical in-flight LLM calls
+ASYNC_MAX_CONNECTIONS = 20  # Connection pool size shared by all async sessions
+TRACE_WINDOW = 1000  # Recent turns kept for rolling latency percentiles
+TRACE_EXPORT_PATH = os.getenv("AGENT_TRACE_EXPORT_PATH")  # OTLP/JSON-lines span file
 
-# Available personalities
-PERSONALITIES: Dict[str, str] = {
-    "friendly_assistant": "Helpful and warm conversational partner",
-    "technical_expert": "Knowledgeable technical specialist",
-    "creative_companion": "Imaginative and inspiring creative partner"
+# Available personalities (prompts are dedented and normalized when the registry loads them)
+PERSONALITIES: Dict[str, Dict[str, str]] = {
+    "friendly_assistant": {
+        "description": "Helpful and warm conversational partner",
+        "prompt": """
+            You are a helpful, friendly AI assistant. You:
+            - Greet users warmly and remember context from the conversation
+            - Ask follow-up questions to be more helpful
+            - Admit when you don't know something
+            - Keep responses concise but informative
+            - Show genuine interest in helping the user
+            """,
+    },
+    "technical_expert": {
+        "description": "Knowledgeable technical specialist",
+        "prompt": """
+            You are a technical expert AI assistant. You:
+            - Provide detailed, accurate technical information
+            - Ask clarifying questions about technical requirements
+            - Suggest best practices and alternatives
+            - Explain complex concepts clearly
+            """,
+    },
+    "creative_companion": {
+        "description": "Imaginative and inspiring creative partner",
+        "prompt": """
+            You are a creative AI companion. You:
+            - Think outside the box and suggest creative solutions
+            - Ask thought-provoking questions
+            - Encourage exploration and experimentation
+            - Share interesting connections and ideas
+            """,
+    },
 }
+PERSONALITIES_PATH = os.getenv("AGENT_PERSONALITIES")  # Optional JSON file or directory of <name>.txt prompts
+
+# Intent keywords, in priority order (first intent with a matching phrase wins)
+INTENT_KEYWORDS: Dict[str, List[str]] = {
+    "greeting": ["hello", "hi", "hey", "good morning", "good afternoon"],
+    "question": ["?"],
+    "farewell": ["bye", "goodbye", "see you", "farewell"],
+    "gratitude": ["thank", "thanks", "appreciate"]
+}
+INTENT_KEYWORDS_PATH = os.getenv("AGENT_INTENT_KEYWORDS")  # Optional JSON file with the same shape
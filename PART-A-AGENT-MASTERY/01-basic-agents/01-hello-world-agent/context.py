@@ -0,0 +1,88 @@
+"""
+Token-budgeted prompt assembly for the Hello World Agent
+Packs conversation history newest-first until the token budget is spent
+
+Every message is tokenized at most once: its count is memoized on the
+`AgentMessage` itself (`token_count`), and other prompt text (system
+prompt, current input) goes through a small LRU cache.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, List, Optional, Sequence
+
+import config
+from tokens import MESSAGE_OVERHEAD_TOKENS, REPLY_PRIMING_TOKENS, Tokenizer
+
+# Fixed slice the agent used before budgeting; kept to report savings against
+BASELINE_HISTORY_MESSAGES = 5
+SUMMARY_HEADER = "Summary of the earlier conversation:\n"
+
+
+@dataclass
+class ContextWindow:
+    """A built prompt and what it costs"""
+    messages: List[Dict]
+    prompt_tokens: int
+    baseline_tokens: int  # Cost of the fixed last-5 slice (no summary) for the same turn
+    history_messages: int
+
+
+class ContextBuilder:
+    """
+    Assemble system prompt + summary + history + current input within `token_budget`.
+
+    The system prompt, the running summary (if any) and the current input
+    are always sent. History is added from the newest message back and
+    stops at the first message that does not fit, so the model always sees
+    a contiguous recent window.
+    """
+
+    def __init__(self, tokenizer: Tokenizer, token_budget: int = config.CONTEXT_TOKEN_BUDGET):
+        self.tokenizer = tokenizer
+        self.token_budget = token_budget
+        self._count_text = lru_cache(maxsize=256)(tokenizer.count)
+
+    def message_tokens(self, message) -> int:
+        """Content tokens of a history message, counted on first use only"""
+        if message.token_count is None:
+            message.token_count = self._count_text(message.content)
+        return message.token_count
+
+    def text_tokens(self, text: str) -> int:
+        return self._count_text(text)
+
+    def build(self, system_prompt: str, history: Sequence, user_input: str, summary: str = "",
+              system_tokens: Optional[int] = None) -> ContextWindow:
+        """`system_tokens` is the prompt's token count when already known (e.g. from the personality registry)"""
+        if system_tokens is None:
+            system_tokens = self.text_tokens(system_prompt)
+        fixed = (system_tokens + self.text_tokens(user_input)
+                 + 2 * MESSAGE_OVERHEAD_TOKENS + REPLY_PRIMING_TOKENS)
+        baseline = fixed
+        if summary:
+            summary = SUMMARY_HEADER + summary
+            fixed += self.text_tokens(summary) + MESSAGE_OVERHEAD_TOKENS
+        used = fixed
+        packed = []
+        for message in reversed(history):
+            cost = self.message_tokens(message) + MESSAGE_OVERHEAD_TOKENS
+            if used + cost > self.token_budget:
+                break
+            used += cost
+            packed.append(message)
+        packed.reverse()
+
+        baseline += sum(self.message_tokens(message) + MESSAGE_OVERHEAD_TOKENS
+                        for message in islice(reversed(history), BASELINE_HISTORY_MESSAGES))
+
+        messages = [{"role": "system", "content": system_prompt}]
+        if summary:
+            messages.append({"role": "system", "content": summary})
+        for message in packed:
+            role = "user" if message.message_type == "user" else "assistant"
+            messages.append({"role": role, "content": message.content})
+        messages.append({"role": "user", "content": user_input})
+        return ContextWindow(messages=messages, prompt_tokens=used,
+                             baseline_tokens=baseline, history_messages=len(packed))
@@ -0,0 +1,209 @@
+"""
+Local stub of the OpenAI chat completions endpoint
+Used by tests and benchmarks so no API key or network access is needed
+
+Usage:
+    with FakeLLMServer(latency=0.05) as server:
+        agent = HelloWorldAgent(client=OpenAI(api_key="test", base_url=server.base_url))
+"""
+
+import asyncio
+import json
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Union
+
+# One scripted fault: an HTTP status to fail with, extra seconds of delay, "drop" or None (normal reply)
+Fault = Union[int, float, str, None]
+
+
+class FakeLLMServer:
+    """
+    Minimal HTTP/1.1 keep-alive server answering chat completion requests.
+
+    It runs its own asyncio loop on a background thread, so thousands of
+    concurrent connections cost no extra threads. Every reply is
+    "Echo: <last user message>" after `latency` seconds, cut to `max_tokens`
+    words. Requests with `"stream": true` get server-sent events, one word
+    per chunk, spaced `token_latency` seconds apart. Received request bodies
+    are kept in `requests` for assertions.
+
+    `faults` scripts failures for the first requests, one entry each in
+    arrival order: an int status (e.g. 500, 429) is returned as an API
+    error, a float adds that many seconds of latency, "drop" closes the
+    connection without replying and None answers normally.
+    """
+
+    def __init__(self, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0,
+                 token_latency: float = 0.0, faults: Iterable[Fault] = ()):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.faults = list(faults)
+        self.host = host
+        self.port = port
+        self.requests: List[Dict] = []
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    @property
+    def request_count(self) -> int:
+        with self._lock:
+            return len(self.requests)
+
+    def record_request(self, path: str, body: Dict) -> Fault:
+        """Log the request and return the fault scripted for it"""
+        with self._lock:
+            self.requests.append({"path": path, "body": body})
+            return self.faults.pop(0) if self.faults else None
+
+    def reply_for(self, messages: List[Dict]) -> str:
+        user_messages = [m.get("content", "") for m in messages if m.get("role") == "user"]
+        return f"Echo: {user_messages[-1] if user_messages else ''}"
+
+    async def handle_request(self, method: str, path: str, body: Dict, writer: asyncio.StreamWriter):
+        """Write the response for one request (override to customise behaviour)"""
+        if method != "POST" or not path.rstrip("/").endswith("/chat/completions"):
+            self.send_json(writer, 404, {"error": {"message": f"Unknown path {path}"}})
+            return
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        reply = self.reply_for(body.get("messages", []))
+        if body.get("max_tokens"):
+            # Like the real API, stop at max_tokens (one word per token here)
+            reply = " ".join(reply.split(" ")[:body["max_tokens"]])
+        if body.get("stream"):
+            await self.send_stream(writer, body.get("model", "fake-model"), reply)
+            return
+        self.send_json(writer, 200, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake-model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(reply.split()), "total_tokens": 0},
+        })
+
+    @staticmethod
+    def send_json(writer: asyncio.StreamWriter, status: int, payload: Dict):
+        data = json.dumps(payload).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+        )
+
+    async def send_stream(self, writer: asyncio.StreamWriter, model: str, reply: str):
+        """Send `reply` as chunked server-sent events, one word per chunk"""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n"
+        )
+
+        def send_event(payload: str):
+            data = f"data: {payload}\n\n".encode("utf-8")
+            writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+
+        words = reply.split(" ")
+        for i, word in enumerate(words):
+            token = word if i == 0 else " " + word
+            send_event(json.dumps({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            }))
+            await writer.drain()
+            if self.token_latency:
+                await asyncio.sleep(self.token_latency)
+        send_event("[DONE]")
+        writer.write(b"0\r\n\r\n")
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                raw = await reader.readexactly(int(headers.get("content-length", 0)))
+                body = json.loads(raw) if raw else {}
+                fault = self.record_request(path, body)
+                if fault == "drop":
+                    break
+                if isinstance(fault, float):
+                    await asyncio.sleep(fault)
+                elif isinstance(fault, int):
+                    self.send_json(writer, fault, {"error": {"message": f"Injected fault {fault}",
+                                                             "type": "server_error"}})
+                    await writer.drain()
+                    continue
+
+                await self.handle_request(method, path, body, writer)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass  # Client went away, or the server is shutting down
+        finally:
+            writer.close()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._serve_connection, self.host, self.port, backlog=4096)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+        # Shut down: stop accepting, then cancel keep-alive connections
+        self._server.close()
+        pending = asyncio.all_tasks(self._loop)
+        for task in pending:
+            task.cancel()
+        self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        self._loop.run_until_complete(self._server.wait_closed())
+        self._loop.close()
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
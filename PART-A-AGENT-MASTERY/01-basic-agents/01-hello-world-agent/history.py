@@ -0,0 +1,177 @@
+"""
+Conversation history stores for the Hello World Agent
+Bounded in memory, with an optional on-disk log for turns that age out
+"""
+
+import json
+from abc import abstractmethod
+from collections import deque
+from collections.abc import Sequence
+from typing import Dict, Iterator, Optional
+
+
+class StaleViewError(RuntimeError):
+    """A history view's messages were evicted (or cleared) after the view was taken"""
+
+
+class HistoryView(Sequence):
+    """
+    Read-only window over a slice of a ring buffer history.
+
+    Nothing is copied: items are looked up in the underlying deque on access,
+    so taking the last few messages for a prompt costs O(1). The window is
+    pinned to the messages it covered when taken (by sequence number), so
+    later appends do not shift it; once any of those messages has been
+    evicted, access raises `StaleViewError` instead of returning newer turns.
+    """
+
+    __slots__ = ("_history", "_start", "_stop")
+
+    def __init__(self, history: "RingBufferHistory", start: int, stop: int):
+        self._history = history
+        self._start = start  # Sequence numbers (messages appended before), not deque positions
+        self._stop = stop
+
+    def _offset(self) -> int:
+        """Sequence number of the buffer's first message, after checking the view is still covered"""
+        offset = self._history.first_sequence
+        if self._start < offset and self._stop > self._start:
+            raise StaleViewError(f"history view [{self._start}, {self._stop}) was overwritten "
+                                 f"(oldest message held is {offset})")
+        return offset
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        positions = range(self._start, self._stop)[index]
+        if isinstance(index, slice):
+            if positions.step != 1:
+                offset = self._offset()
+                return [self._history._buffer[i - offset] for i in positions]
+            return HistoryView(self._history, positions.start, positions.stop)
+        return self._history._buffer[positions - self._offset()]
+
+    def __iter__(self) -> Iterator:
+        buffer = self._history._buffer
+        for i in range(self._start, self._stop):
+            yield buffer[i - self._offset()]
+
+    def __repr__(self) -> str:
+        return f"HistoryView({list(self)!r})"
+
+
+class HistoryStore(Sequence):
+    """
+    Interface for pluggable conversation history backends.
+
+    Stores behave like a read-only sequence of `AgentMessage` records plus
+    `append` / `extend` / `clear`. `recent(n)` and slicing must return cheap
+    views rather than copies.
+    """
+
+    @abstractmethod
+    def append(self, message):
+        """Add a message to the end of the history"""
+
+    @abstractmethod
+    def clear(self):
+        """Drop all in-memory messages"""
+
+    def extend(self, messages):
+        for message in messages:
+            self.append(message)
+
+    def recent(self, n: int) -> Sequence:
+        """The last `n` messages, oldest first"""
+        return self[-n:] if n > 0 else self[0:0]
+
+
+class SpillLog:
+    """Append-only JSON-lines file that receives messages evicted from memory"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self.records_written = 0
+
+    def write(self, message):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        record = {
+            "content": message.content,
+            "timestamp": message.timestamp.isoformat(),
+            "message_type": message.message_type,
+            "metadata": message.metadata,
+        }
+        self._file.write(json.dumps(record, default=str) + "\n")
+        self._file.flush()
+        self.records_written += 1
+
+    def read(self) -> Iterator[Dict]:
+        """Iterate over every spilled record, oldest first"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        except FileNotFoundError:
+            return
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class RingBufferHistory(HistoryStore):
+    """
+    Fixed-capacity conversation history built on `collections.deque`.
+
+    When the buffer is full the oldest message is dropped, or written to
+    `spill_log` first if one is configured. `capacity=None` means unbounded.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, spill_log: Optional[SpillLog] = None):
+        if capacity is not None and capacity <= 0:
+            raise ValueError("capacity must be a positive integer or None")
+        self.capacity = capacity
+        self.spill_log = spill_log
+        self._buffer: deque = deque(maxlen=capacity)
+        self.evicted = 0
+        self.appended = 0  # Messages ever appended; views use it as a sequence number
+
+    def append(self, message):
+        buffer = self._buffer
+        if self.capacity is not None and len(buffer) == self.capacity:
+            if self.spill_log is not None:
+                self.spill_log.write(buffer[0])
+            self.evicted += 1
+        buffer.append(message)
+        self.appended += 1
+
+    def clear(self):
+        self._buffer.clear()
+
+    @property
+    def first_sequence(self) -> int:
+        """Sequence number of the oldest message still held"""
+        return self.appended - len(self._buffer)
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            positions = range(len(self._buffer))[index]
+            if positions.step != 1:
+                return [self._buffer[i] for i in positions]
+            first = self.first_sequence
+            return HistoryView(self, first + positions.start, first + positions.stop)
+        return self._buffer[index]
+
+    def __iter__(self) -> Iterator:
+        return iter(self._buffer)
+
+    def __repr__(self) -> str:
+        return f"RingBufferHistory(capacity={self.capacity}, messages={len(self._buffer)})"
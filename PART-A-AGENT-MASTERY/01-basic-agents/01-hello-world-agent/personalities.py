@@ -0,0 +1,177 @@
+"""
+Personality registry for the Hello World Agent
+System prompts are normalized and token-counted once, then shared by every agent
+
+The table comes from config.PERSONALITIES, extended or overridden by
+AGENT_PERSONALITIES: a JSON file with the same shape, or a directory of
+`<name>.txt` / `<name>.md` prompt files. `reload()` swaps in a freshly
+loaded table; agents look their prompt up on every turn, so running
+sessions pick up edited prompts without a restart.
+
+Usage:
+    registry = get_default_registry()
+    prompt = registry.get("technical_expert").prompt
+    registry.reload_if_changed()
+"""
+
+import json
+import os
+import re
+import textwrap
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+
+import config
+from tokens import Tokenizer, get_tokenizer
+
+PROMPT_SUFFIXES = (".txt", ".md")
+
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+@dataclass(frozen=True)
+class Personality:
+    """One immutable personality; every agent using it holds this same object"""
+    name: str
+    description: str
+    prompt: str
+    token_count: int
+
+
+def normalize_prompt(text: str) -> str:
+    """Dedent, strip trailing spaces, collapse runs of blank lines and trim the ends"""
+    lines = textwrap.dedent(text.expandtabs(4)).splitlines()
+    return _BLANK_LINES.sub("\n\n", "\n".join(line.rstrip() for line in lines)).strip()
+
+
+def load_personality_files(path: str) -> Dict[str, Dict[str, str]]:
+    """
+    Load personalities from a JSON file (name -> {"description", "prompt"},
+    or name -> prompt) or from a directory of prompt files named after
+    their personality.
+    """
+    if os.path.isdir(path):
+        table = {}
+        for filename in sorted(os.listdir(path)):
+            name, suffix = os.path.splitext(filename)
+            if suffix in PROMPT_SUFFIXES:
+                with open(os.path.join(path, filename), encoding="utf-8") as f:
+                    table[name] = {"prompt": f.read()}
+        return table
+    with open(path, encoding="utf-8") as f:
+        table = json.load(f)
+    return {name: entry if isinstance(entry, dict) else {"prompt": entry} for name, entry in table.items()}
+
+
+def _source_signature(path: Optional[str]) -> Tuple:
+    """Modification times of every file `path` loads from (empty when unset or missing)"""
+    if not path:
+        return ()
+    try:
+        if os.path.isdir(path):
+            entries = sorted(os.scandir(path), key=lambda entry: entry.name)
+            return tuple((entry.name, entry.stat().st_mtime_ns) for entry in entries
+                         if entry.name.endswith(PROMPT_SUFFIXES))
+        return (os.stat(path).st_mtime_ns,)
+    except OSError:
+        return ()
+
+
+class PersonalityRegistry:
+    """
+    Name -> `Personality` table built once and swapped atomically on reload.
+
+    Unknown names fall back to `default`, as the agent always has. Token
+    counts use `tokenizer` (the default model's), so agents on that model
+    can skip counting their system prompt.
+    """
+
+    def __init__(self, table: Mapping[str, Union[str, Mapping[str, str]]],
+                 path: Optional[str] = None, default: str = config.DEFAULT_PERSONALITY,
+                 tokenizer: Optional[Tokenizer] = None):
+        self.base_table = dict(table)
+        self.path = path
+        self.default = default
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.version = 0
+        self._lock = threading.Lock()
+        self._personalities: Dict[str, Personality] = {}
+        self._signature: Tuple = ()
+        self.reload()
+
+    @classmethod
+    def from_config(cls) -> "PersonalityRegistry":
+        """Build from config.PERSONALITIES plus config.PERSONALITIES_PATH if set"""
+        return cls(config.PERSONALITIES, config.PERSONALITIES_PATH)
+
+    def _compile(self, name: str, entry: Union[str, Mapping[str, str]]) -> Personality:
+        if isinstance(entry, str):
+            entry = {"prompt": entry}
+        prompt = normalize_prompt(entry["prompt"])
+        return Personality(name, entry.get("description", ""), prompt, self.tokenizer.count(prompt))
+
+    def reload(self) -> int:
+        """
+        Re-read the sources and swap in the new table; returns the new version.
+
+        If the sources are broken (bad JSON, no default personality) this
+        raises and the previous table stays; `reload_if_changed` does not
+        retry until the files change again.
+        """
+        with self._lock:
+            signature = _source_signature(self.path)
+            try:
+                personalities = self._load_table()
+            except Exception:
+                self._signature = signature
+                raise
+            self._personalities = personalities
+            self._signature = signature
+            self.version += 1
+            return self.version
+
+    def _load_table(self) -> Dict[str, Personality]:
+        table = dict(self.base_table)
+        if self.path:
+            table.update(load_personality_files(self.path))
+        previous = self._personalities
+        personalities = {}
+        for name, entry in table.items():
+            personality = self._compile(name, entry)
+            # Unchanged prompts keep their object, so agents keep sharing it
+            personalities[name] = personality if previous.get(name) != personality else previous[name]
+        if self.default not in personalities:
+            raise KeyError(f"Default personality {self.default!r} is not defined")
+        return personalities
+
+    def reload_if_changed(self) -> bool:
+        """Reload when a personality file was added, removed or modified (one stat per file)"""
+        if not self.path or _source_signature(self.path) == self._signature:
+            return False
+        self.reload()
+        return True
+
+    def get(self, name: str) -> Personality:
+        personalities = self._personalities
+        personality = personalities.get(name)
+        return personality if personality is not None else personalities[self.default]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._personalities
+
+    def names(self) -> List[str]:
+        return list(self._personalities)
+
+
+_default_registry: Optional[PersonalityRegistry] = None
+_default_lock = threading.Lock()
+
+
+def get_default_registry() -> PersonalityRegistry:
+    """Process-wide registry built once from config"""
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = PersonalityRegistry.from_config()
+        return _default_registry
@@ -0,0 +1,269 @@
+"""
+Client-side rate limiting for the Hello World Agent
+Shared requests-per-minute and tokens-per-minute buckets with a priority queue
+
+Every upstream request takes one request and its estimated tokens from
+the buckets before it is sent, so bursts queue here instead of turning
+into 429 storms. Waiters are served strictly by priority (interactive
+turns before batch jobs), then in arrival order. Sync and async callers
+share one queue.
+
+Usage:
+    limiter = RateLimiter(requests_per_minute=500, tokens_per_minute=90_000)
+    agent = HelloWorldAgent(rate_limiter=limiter)
+    batch_agent = HelloWorldAgent(rate_limiter=limiter, priority=PRIORITY_BATCH)
+"""
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import config
+from tracing import percentile
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(params: Dict) -> int:
+    """
+    Tokens a request counts against the quota: prompt estimate plus `max_tokens`.
+
+    Providers charge rate limits on a similar character-based estimate
+    before the request runs, so this stays cheap instead of tokenizing.
+    """
+    messages = params.get("messages", [])
+    chars = sum(len(str(m.get("content", ""))) for m in messages)
+    prompt = chars // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS * len(messages)
+    return prompt + (params.get("max_tokens") or 0)
+
+
+class QueueTimeout(TimeoutError):
+    """The request could not be admitted by the rate limiter before its timeout"""
+
+
+class TokenBucket:
+    """Refills at `per_minute / 60` per second up to `burst_seconds` worth of capacity"""
+
+    def __init__(self, per_minute: float, burst_seconds: float, now: float):
+        self.rate = per_minute / 60
+        self.capacity = max(self.rate * burst_seconds, 1.0)
+        self.level = self.capacity
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (0 if it can be now)"""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        # Requests larger than the bucket go through when it is full, leaving it in debt
+        needed = min(amount, self.capacity)
+        return 0.0 if self.level >= needed else (needed - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= amount
+
+
+class _Waiter:
+    """A queued acquire; woken when it may be at the head of the queue"""
+
+    __slots__ = ("priority", "seq", "tokens", "event", "loop")
+
+    def __init__(self, priority: int, seq: int, tokens: int, loop: Optional[asyncio.AbstractEventLoop]):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.loop = loop
+        self.event = asyncio.Event() if loop is not None else threading.Event()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self.event.set)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and/or tokens-per-minute limits shared by many agents.
+
+    Only the waiter at the head of the priority queue may take from the
+    buckets; it sleeps exactly until they hold enough, and hands over to
+    the next waiter once admitted. `stats()` reports the queue depth and
+    rolling wait times.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None,
+                 burst_seconds: float = config.RATE_LIMIT_BURST_SECONDS,
+                 clock: Callable[[], float] = time.monotonic, window: int = config.TRACE_WINDOW):
+        now = clock()
+        self.clock = clock
+        self.requests = TokenBucket(requests_per_minute, burst_seconds, now) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, burst_seconds, now) if tokens_per_minute else None
+        self._lock = threading.Lock()
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._waits = deque(maxlen=window)
+        self.admitted = 0
+        self.queued = 0
+        self.timeouts = 0
+        self.max_queue_depth = 0
+
+    def _delay(self, tokens: int, now: float) -> float:
+        delay = 0.0
+        if self.requests is not None:
+            delay = self.requests.delay(1, now)
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.delay(tokens, now))
+        return delay
+
+    def _take(self, tokens: int):
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None:
+            self.tokens.take(tokens)
+        self.admitted += 1
+
+    def _try_fast(self, tokens: int) -> bool:
+        """Admit immediately when nobody is queued and the buckets allow it (lock held)"""
+        if self._queue or self._delay(tokens, self.clock()) > 0:
+            return False
+        self._take(tokens)
+        self._waits.append(0.0)
+        return True
+
+    def _enqueue(self, waiter: _Waiter):
+        heapq.heappush(self._queue, waiter)
+        self.queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+
+    def _grant(self, waiter: _Waiter) -> Optional[float]:
+        """0 if `waiter` was admitted, seconds to sleep if it is at the head, None otherwise (lock held)"""
+        if self._queue[0] is not waiter:
+            return None
+        delay = self._delay(waiter.tokens, self.clock())
+        if delay > 0:
+            return delay
+        self._take(waiter.tokens)
+        heapq.heappop(self._queue)
+        if self._queue:
+            self._queue[0].wake()
+        return 0.0
+
+    def _abandon(self, waiter: _Waiter):
+        """Drop a waiter that timed out or was cancelled (lock held)"""
+        if waiter in self._queue:
+            was_head = self._queue[0] is waiter
+            self._queue.remove(waiter)
+            heapq.heapify(self._queue)
+            if was_head and self._queue:
+                self._queue[0].wake()
+
+    def _sleep_time(self, delay: Optional[float], deadline: Optional[float]) -> Optional[float]:
+        if deadline is None:
+            return delay
+        remaining = deadline - self.clock()
+        if remaining <= 0:
+            raise QueueTimeout("Rate limit queue wait exceeded the request timeout")
+        return remaining if delay is None else min(delay, remaining)
+
+    def acquire(self, tokens: int = 0, priority: int = PRIORITY_INTERACTIVE,
+                timeout: Optional[float] = None) -> float:
+        """Block until one request and `tokens` are available; returns seconds waited"""
+        with self._lock:
+            if self._try_fast(tokens):
+                return 0.0
+            waiter = _Waiter(priority, next(self._seq), tokens, None)
+            self._enqueue(waiter)
+        start = self.clock()
+        deadline = start + timeout if timeout is not None else None
+        try:
+            while True:
+                with self._lock:
+                    delay = self._grant(waiter)
+                if delay == 0:
+                    break
+                waiter.event.wait(self._sleep_time(delay, deadline))
+                waiter.event.clear()
+        except BaseException as e:
+            with self._lock:
+                self.timeouts += isinstance(e, QueueTimeout)
+                self._abandon(waiter)
+            raise
+        return self._record_wait(start)
+
+    async def aacquire(self, tokens: int = 0, priority: int = PRIORITY_INTERACTIVE,
+                       timeout: Optional[float] = None) -> float:
+        """Async `acquire`: waits on the event loop instead of blocking a thread"""
+        with self._lock:
+            if self._try_fast(tokens):
+                return 0.0
+            waiter = _Waiter(priority, next(self._seq), tokens, asyncio.get_running_loop())
+            self._enqueue(waiter)
+        start = self.clock()
+        deadline = start + timeout if timeout is not None else None
+        try:
+            while True:
+                with self._lock:
+                    delay = self._grant(waiter)
+                if delay == 0:
+                    break
+                sleep = self._sleep_time(delay, deadline)
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), sleep)
+                except asyncio.TimeoutError:
+                    pass  # Slept until the buckets refill
+                waiter.event.clear()
+        except BaseException as e:
+            with self._lock:
+                self.timeouts += isinstance(e, QueueTimeout)
+                self._abandon(waiter)
+            raise
+        return self._record_wait(start)
+
+    def _record_wait(self, start: float) -> float:
+        waited = self.clock() - start
+        self._waits.append(waited)
+        return waited
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def stats(self) -> Dict:
+        waits = sorted(self._waits)
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "timeouts": self.timeouts,
+            "wait_p50_ms": round(percentile(waits, 50) * 1000, 3),
+            "wait_p95_ms": round(percentile(waits, 95) * 1000, 3),
+            "wait_max_ms": round(waits[-1] * 1000, 3) if waits else 0.0,
+        }
+
+
+_default_limiter: Optional[RateLimiter] = None
+_default_lock = threading.Lock()
+
+
+def get_default_limiter() -> Optional[RateLimiter]:
+    """Process-wide limiter from AGENT_RATE_LIMIT_RPM / AGENT_RATE_LIMIT_TPM (None if neither is set)"""
+    global _default_limiter
+    if not (config.RATE_LIMIT_RPM or config.RATE_LIMIT_TPM):
+        return None
+    with _default_lock:
+        if _default_limiter is None:
+            _default_limiter = RateLimiter(config.RATE_LIMIT_RPM, config.RATE_LIMIT_TPM)
+        return _default_limiter
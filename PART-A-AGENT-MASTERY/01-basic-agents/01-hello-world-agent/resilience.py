@@ -0,0 +1,386 @@
+"""
+Resilient LLM calls for the Hello World Agent
+Deadlines, jittered exponential backoff, hedged requests and a circuit breaker
+
+Every call gets one overall deadline (config.DEFAULT_RESPONSE_TIMEOUT);
+each attempt is given whatever is left of it as its request timeout.
+Retryable failures (timeouts, connection errors, 408/409/429/5xx) are
+retried with full-jitter backoff. Once enough latencies are known, a
+second (hedged) request is sent if the first has not answered by the
+rolling p95, and whichever finishes first wins.
+
+Usage:
+    resilience = Resilience()
+    reply = resilience.call(lambda timeout: call_llm(params, timeout=timeout))
+    reply = await resilience.acall(lambda timeout: acall_llm(params, timeout=timeout))
+"""
+
+import asyncio
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+import config
+from ratelimit import QueueTimeout
+from tracing import percentile
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 429})
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=config.HEDGE_WORKERS, thread_name_prefix="hedge")
+        return _executor
+
+
+class DeadlineExceeded(TimeoutError):
+    """No attempt succeeded before the call's overall deadline"""
+
+
+class CircuitOpenError(RuntimeError):
+    """The backend is considered unhealthy; the call was not attempted"""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"LLM backend unavailable, retrying in {max(retry_in, 0):.0f}s")
+        self.retry_in = retry_in
+
+
+def _openai():
+    """The `openai` module if something already imported it (its errors cannot exist otherwise)"""
+    return sys.modules.get("openai")
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, connection failures, throttling and server errors"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    openai = _openai()
+    if openai is None:
+        return False
+    if isinstance(error, openai.APIConnectionError):
+        return True  # openai.APITimeoutError is an APIConnectionError
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the server asked us to wait (Retry-After), if any"""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive failures.
+
+    While open every call fails fast with `CircuitOpenError`. After
+    `reset_timeout` seconds one probe call is let through (half-open); its
+    success closes the circuit, its failure opens it again. A probe that
+    ends without an outcome (cancelled) is released so another can run.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = config.BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = config.BREAKER_RESET_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.short_circuits = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> bool:
+        """Raise `CircuitOpenError` unless a call may go ahead now; True if it is the half-open probe"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.reset_timeout - self.clock()
+                if remaining > 0:
+                    self.short_circuits += 1
+                    raise CircuitOpenError(remaining)
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                self.short_circuits += 1
+                raise CircuitOpenError(0)
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def release_probe(self):
+        """The probe ended without saying anything about the backend; let the next call probe"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opened += 1
+                self.state = self.OPEN
+                self._opened_at = self.clock()
+                self._probing = False
+
+    def reset(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+
+class Resilience:
+    """
+    Wraps a call `fn(timeout)` with a deadline, retries, hedging and a
+    circuit breaker. Share one instance per backend so the breaker and
+    the latency window see all of its traffic.
+
+    Hedging needs `hedge_min_samples` successful latencies, is skipped
+    when the p95 is below `hedge_min_delay` (a thread hop would cost more
+    than it could save) and is limited to `hedge_budget` of all calls, so
+    a slow, overloaded backend does not get twice the traffic. Pass
+    `hedge_percentile=None` to disable it.
+    """
+
+    def __init__(self, timeout: float = config.DEFAULT_RESPONSE_TIMEOUT,
+                 max_attempts: int = config.RETRY_MAX_ATTEMPTS,
+                 base_delay: float = config.RETRY_BASE_DELAY,
+                 max_delay: float = config.RETRY_MAX_DELAY,
+                 hedge_percentile: Optional[float] = config.HEDGE_PERCENTILE,
+                 hedge_min_delay: float = config.HEDGE_MIN_DELAY,
+                 hedge_min_samples: int = config.HEDGE_MIN_SAMPLES,
+                 hedge_budget: float = config.HEDGE_BUDGET,
+                 breaker: Optional[CircuitBreaker] = None,
+                 window: int = config.TRACE_WINDOW):
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_budget = hedge_budget
+        self.breaker = breaker or CircuitBreaker()
+        self._latencies = deque(maxlen=window)
+        self._hedge_delay: Optional[float] = None
+        self._stale_samples = 0
+        self.calls = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def backoff(self, retry: int) -> float:
+        """Full-jitter exponential backoff before retry number `retry` (0-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None when hedging is off, not warranted or over budget"""
+        if self.hedge_percentile is None or len(self._latencies) < self.hedge_min_samples:
+            return None
+        if self.hedges >= max(self.calls * self.hedge_budget, 1):
+            return None
+        if self._hedge_delay is None or self._stale_samples >= self.hedge_min_samples:
+            self._hedge_delay = percentile(sorted(self._latencies), self.hedge_percentile)
+            self._stale_samples = 0
+        return self._hedge_delay if self._hedge_delay >= self.hedge_min_delay else None
+
+    def _record_latency(self, seconds: float):
+        self._latencies.append(seconds)
+        self._stale_samples += 1
+
+    def _retry_delay(self, error: BaseException, retry: int, deadline: float,
+                     probe: bool = False) -> Optional[float]:
+        """Backoff before the next attempt, or None if `error` should be raised now"""
+        if isinstance(error, QueueTimeout):
+            if probe:
+                self.breaker.release_probe()  # Waiting for local quota says nothing about the backend
+            return None
+        openai = _openai()
+        if isinstance(error, TimeoutError) or (openai and isinstance(error, openai.APITimeoutError)):
+            self.timeouts += 1
+        if not is_retryable(error):
+            self.breaker.record_success()  # The backend answered; the request itself was bad
+            return None
+        self.breaker.record_failure()
+        if retry + 1 >= self.max_attempts:
+            return None
+        delay = max(self.backoff(retry), retry_after(error) or 0.0)
+        if time.monotonic() + delay >= deadline:
+            return None
+        self.retries += 1
+        return delay
+
+    def call(self, fn: Callable[[float], T], hedge: bool = True) -> T:
+        """Run `fn(timeout)` until it succeeds, the deadline passes or retries run out"""
+        self.calls += 1
+        deadline = time.monotonic() + self.timeout
+        retry = 0
+        while True:
+            probe = self.breaker.before_call()
+            start = time.monotonic()
+            try:
+                result = self._attempt(fn, deadline - start, hedge)
+            except BaseException as e:
+                if not isinstance(e, Exception):
+                    if probe:
+                        self.breaker.release_probe()  # Cancelled or interrupted: no verdict on the backend
+                    raise
+                delay = self._retry_delay(e, retry, deadline, probe)
+                if delay is None:
+                    if time.monotonic() >= deadline and not isinstance(e, DeadlineExceeded):
+                        raise DeadlineExceeded(f"No reply within {self.timeout:g}s") from e
+                    raise
+                time.sleep(delay)
+                retry += 1
+                continue
+            self.breaker.record_success()
+            if hedge:
+                self._record_latency(time.monotonic() - start)
+            return result
+
+    def _attempt(self, fn: Callable[[float], T], remaining: float, hedge: bool) -> T:
+        delay = self.hedge_delay() if hedge else None
+        if delay is None or delay >= remaining:
+            return fn(remaining)
+
+        executor = _get_executor()
+        primary = executor.submit(fn, remaining)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        # Slower than the p95 so far: race a second request (the loser runs out on its own timeout)
+        self.hedges += 1
+        hedge = executor.submit(fn, remaining - delay)
+        pending, error = {primary, hedge}, None
+        end = time.monotonic() + remaining - delay
+        while pending:
+            done, pending = wait(pending, timeout=max(end - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded(f"No reply within {self.timeout:g}s")
+            for future in done:
+                if future.exception() is None:
+                    self.hedge_wins += future is hedge
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def acall(self, fn: Callable[[float], Awaitable[T]], hedge: bool = True) -> T:
+        """Async `call`: `fn(timeout)` returns an awaitable"""
+        self.calls += 1
+        deadline = time.monotonic() + self.timeout
+        retry = 0
+        while True:
+            probe = self.breaker.before_call()
+            start = time.monotonic()
+            try:
+                result = await self._aattempt(fn, deadline - start, hedge)
+            except BaseException as e:
+                if not isinstance(e, Exception):
+                    if probe:
+                        self.breaker.release_probe()  # Cancelled or interrupted: no verdict on the backend
+                    raise
+                delay = self._retry_delay(e, retry, deadline, probe)
+                if delay is None:
+                    if time.monotonic() >= deadline and not isinstance(e, DeadlineExceeded):
+                        raise DeadlineExceeded(f"No reply within {self.timeout:g}s") from e
+                    raise
+                await asyncio.sleep(delay)
+                retry += 1
+                continue
+            self.breaker.record_success()
+            if hedge:
+                self._record_latency(time.monotonic() - start)
+            return result
+
+    async def _aattempt(self, fn: Callable[[float], Awaitable[T]], remaining: float, hedge: bool) -> T:
+        delay = self.hedge_delay() if hedge else None
+        if delay is None or delay >= remaining:
+            try:
+                return await asyncio.wait_for(fn(remaining), remaining)
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"No reply within {self.timeout:g}s") from None
+
+        primary = asyncio.ensure_future(fn(remaining))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return primary.result()
+
+            self.hedges += 1
+            hedge = asyncio.ensure_future(fn(remaining - delay))
+            tasks.append(hedge)
+            pending, error = set(tasks), None
+            end = time.monotonic() + remaining - delay
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=max(end - time.monotonic(), 0),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise DeadlineExceeded(f"No reply within {self.timeout:g}s")
+                for task in done:
+                    if task.exception() is None:
+                        self.hedge_wins += task is hedge
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()  # The losing request
+
+    def stats(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "breaker_state": self.breaker.state,
+            "breaker_opened": self.breaker.opened,
+            "short_circuits": self.breaker.short_circuits,
+        }
+
+
+_default_resilience: Optional[Resilience] = None
+_default_lock = threading.Lock()
+
+
+def get_default_resilience() -> Resilience:
+    """Process-wide policy (one breaker and latency window) shared by every agent"""
+    global _default_resilience
+    with _default_lock:
+        if _default_resilience is None:
+            _default_resilience = Resilience()
+        return _default_resilience
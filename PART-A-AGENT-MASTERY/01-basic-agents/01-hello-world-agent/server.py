@@ -0,0 +1,394 @@
+"""
+Multi-tenant HTTP/WebSocket server for the Hello World Agent
+Hosts many sessions in one process on an `AsyncAgentPool`, keyed by session ID
+
+Endpoints:
+    POST   /sessions/<id>/messages   {"message": "..."} -> {"session_id": ..., "reply": ...}
+    GET    /sessions/<id>/ws         WebSocket: send {"message": ...} (or plain text), receive {"reply": ...}
+    GET    /sessions/<id>            Conversation summary
+    DELETE /sessions/<id>            Evict the session (saved to the store if configured)
+    GET    /metrics                  Live/evicted sessions, requests, RSS
+    GET    /healthz
+
+Usage:
+    python server.py --port 8080 --store sessions.db --idle-timeout 300 --memory-limit-mb 512
+    python server.py --port 8080 --store sessions.db --workers 4   # processes share the port and store
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import multiprocessing
+import os
+import signal
+import struct
+import sys
+import time
+from typing import Dict, Optional, Tuple
+
+import config
+from agent_pool import AsyncAgentPool, current_rss_bytes
+from personalities import get_default_registry
+from sessions import FileSessionStore, SessionStore, SQLiteSessionStore
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_CONTINUATION, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+MAX_BODY_BYTES = 1024 * 1024
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+def encode_frame(opcode: int, payload: bytes, mask: bool = False) -> bytes:
+    """One final WebSocket frame (clients must mask, servers must not)"""
+    length = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, mask_bit | length)
+    elif length < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, mask_bit | 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, mask_bit | 127, length)
+    if not mask:
+        return header + payload
+    key = os.urandom(4)
+    return header + key + _apply_mask(payload, key)
+
+
+def _apply_mask(payload: bytes, key: bytes) -> bytes:
+    if not payload:
+        return payload
+    repeated = (key * (len(payload) // 4 + 1))[:len(payload)]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")).to_bytes(len(payload), "big")
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[bool, int, bytes]:
+    """(fin, opcode, unmasked payload) of the next WebSocket frame"""
+    b1, b2 = await reader.readexactly(2)
+    length = b2 & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", await reader.readexactly(8))
+    if length > MAX_BODY_BYTES:
+        raise ValueError("WebSocket frame too large")
+    key = await reader.readexactly(4) if b2 & 0x80 else None
+    payload = await reader.readexactly(length)
+    return bool(b1 & 0x80), b1 & 0x0F, _apply_mask(payload, key) if key else payload
+
+
+async def read_message(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> Optional[str]:
+    """Next complete text message (answering pings); None once the peer closes"""
+    parts = []
+    while True:
+        fin, opcode, payload = await read_frame(reader)
+        if opcode == OP_CLOSE:
+            writer.write(encode_frame(OP_CLOSE, payload[:2]))
+            return None
+        if opcode == OP_PING:
+            writer.write(encode_frame(OP_PONG, payload))
+            continue
+        if opcode == OP_PONG:
+            continue
+        parts.append(payload)
+        if fin:
+            return b"".join(parts).decode("utf-8")
+
+
+def reload_personalities(changed_only: bool = True) -> bool:
+    """Reload personality prompts; a broken file is reported and the previous table kept"""
+    registry = get_default_registry()
+    try:
+        if changed_only:
+            return registry.reload_if_changed()
+        registry.reload()
+        return True
+    except Exception as e:
+        print(f"⚠️  Personality reload failed, keeping version {registry.version}: {e}", file=sys.stderr, flush=True)
+        return False
+
+
+class AgentServer:
+    """
+    asyncio HTTP/1.1 (keep-alive) and WebSocket front end for an `AsyncAgentPool`.
+
+    A background task calls `pool.sweep()` every `sweep_interval` seconds
+    to evict idle sessions and enforce the memory ceiling, and reloads
+    personality prompts whose files changed. With
+    `reuse_port=True` several processes can listen on the same port.
+    """
+
+    def __init__(self, pool: AsyncAgentPool, host: str = "127.0.0.1", port: int = 8080,
+                 sweep_interval: float = 1.0, reuse_port: bool = False):
+        self.pool = pool
+        self.host = host
+        self.port = port
+        self.sweep_interval = sweep_interval
+        self.reuse_port = reuse_port
+        self.requests = 0
+        self.errors = 0
+        self.started = time.time()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._sweeper: Optional[asyncio.Task] = None
+
+    async def start(self) -> "AgentServer":
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port,
+                                                  reuse_port=self.reuse_port or None, backlog=4096)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._sweeper = asyncio.create_task(self._sweep_forever())
+        return self
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.pool.aclose()
+
+    async def _sweep_forever(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                self.pool.sweep()
+            except Exception as e:  # e.g. disk full or a locked store while saving evicted sessions
+                print(f"⚠️  Session sweep failed, retrying in {self.sweep_interval:g}s: {e}",
+                      file=sys.stderr, flush=True)
+            reload_personalities()
+
+    def metrics(self) -> Dict:
+        metrics = {
+            "pid": os.getpid(),
+            "live_sessions": len(self.pool.sessions),
+            "evicted_sessions": self.pool.evicted_sessions,
+            "requests": self.requests,
+            "errors": self.errors,
+            "rss_bytes": current_rss_bytes(),
+            "uptime": round(time.time() - self.started, 1),
+        }
+        if self.pool.coalescer is not None:
+            flight = self.pool.coalescer.stats()
+            metrics["llm_calls"] = flight["calls"]
+            metrics["coalesced_calls"] = flight["coalesced"]
+        resilience = self.pool.resilience.stats()
+        metrics["llm_retries"] = resilience["retries"]
+        metrics["llm_hedges"] = resilience["hedges"]
+        metrics["breaker_state"] = resilience["breaker_state"]
+        if self.pool.rate_limiter is not None:
+            limiter = self.pool.rate_limiter.stats()
+            metrics["rate_limit_queue_depth"] = limiter["queue_depth"]
+            metrics["rate_limit_wait_p95_ms"] = limiter["wait_p95_ms"]
+        return metrics
+
+    @staticmethod
+    def send_json(writer: asyncio.StreamWriter, status: int, payload: Dict):
+        data = json.dumps(payload).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'Error')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+        )
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_BYTES:
+                    self.send_json(writer, 413, {"error": "Request body too large"})
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                self.requests += 1
+                path = target.split("?", 1)[0].rstrip("/")
+                if headers.get("upgrade", "").lower() == "websocket" and path.endswith("/ws"):
+                    await self._serve_websocket(path, headers, reader, writer)
+                    break
+                await self.handle_request(method, path, body, writer)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError, ValueError):
+            pass  # Client went away, sent garbage, or the server is shutting down
+        finally:
+            writer.close()
+
+    async def handle_request(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter):
+        """Route one plain HTTP request"""
+        if path == "/healthz":
+            self.send_json(writer, 200, {"status": "ok"})
+            return
+        if path == "/metrics":
+            self.send_json(writer, 200, self.metrics())
+            return
+
+        parts = path.strip("/").split("/")
+        if len(parts) < 2 or parts[0] != "sessions" or not parts[1]:
+            self.send_json(writer, 404, {"error": f"Unknown path {path}"})
+            return
+        session_id = parts[1]
+
+        if len(parts) == 3 and parts[2] == "messages":
+            if method != "POST":
+                self.send_json(writer, 405, {"error": "Use POST"})
+                return
+            try:
+                message = json.loads(body)["message"]
+            except (ValueError, KeyError, TypeError):
+                self.send_json(writer, 400, {"error": 'Body must be JSON {"message": "..."}'})
+                return
+            try:
+                reply = await self.pool.respond(session_id, str(message))
+            except Exception as e:
+                self.errors += 1
+                self.send_json(writer, 500, {"error": str(e)})
+                return
+            self.send_json(writer, 200, {"session_id": session_id, "reply": reply})
+            return
+
+        if len(parts) == 2 and method == "GET":
+            known = session_id in self.pool.sessions or (
+                self.pool.session_store is not None and self.pool.session_store.version(session_id) > 0)
+            if not known:
+                self.send_json(writer, 404, {"error": f"Unknown session {session_id}"})
+                return
+            self.send_json(writer, 200, self.pool.get_session(session_id).get_conversation_summary())
+            return
+        if len(parts) == 2 and method == "DELETE":
+            self.send_json(writer, 200, {"evicted": self.pool.evict(session_id)})
+            return
+        if len(parts) == 2:
+            self.send_json(writer, 405, {"error": f"Unsupported method {method}"})
+            return
+        self.send_json(writer, 404, {"error": f"Unknown path {path}"})
+
+    async def _serve_websocket(self, path: str, headers: Dict[str, str],
+                               reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        session_id = path.strip("/").split("/")[1]
+        key = headers.get("sec-websocket-key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode("latin-1")).digest()).decode()
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode("latin-1")
+        )
+        await writer.drain()
+
+        while True:
+            text = await read_message(reader, writer)
+            if text is None:
+                await writer.drain()
+                return
+            try:
+                message = json.loads(text)["message"] if text.lstrip().startswith("{") else text
+                reply = {"session_id": session_id, "reply": await self.pool.respond(session_id, str(message))}
+            except (ValueError, KeyError, TypeError):
+                reply = {"error": 'Send text or JSON {"message": "..."}'}
+            except Exception as e:
+                self.errors += 1
+                reply = {"error": str(e)}
+            self.requests += 1
+            writer.write(encode_frame(OP_TEXT, json.dumps(reply).encode("utf-8")))
+            await writer.drain()
+
+
+def open_store(path: Optional[str]) -> Optional[SessionStore]:
+    """SQLite for *.db / *.sqlite paths, a session directory otherwise"""
+    if not path:
+        return None
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        return SQLiteSessionStore(path)
+    return FileSessionStore(path)
+
+
+async def serve(args: argparse.Namespace, reuse_port: bool = False):
+    pool = AsyncAgentPool(
+        model=args.model,
+        personality=args.personality,
+        api_key=args.api_key,
+        base_url=args.base_url,
+        max_connections=args.connections,
+        session_store=open_store(args.store),
+        idle_timeout=args.idle_timeout,
+        memory_limit_mb=args.memory_limit_mb,
+        max_sessions=args.max_sessions,
+        shared_store=args.workers > 1,
+    )
+    server = await AgentServer(pool, args.host, args.port, reuse_port=reuse_port).start()
+    print(f"🌐 Worker {os.getpid()} serving http://{args.host}:{server.port} "
+          f"(store: {args.store or 'none'})", flush=True)
+    serving = asyncio.ensure_future(server.serve_forever())
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGTERM, serving.cancel)  # Save sessions on stop
+    loop.add_signal_handler(signal.SIGHUP, reload_personalities, False)  # Re-read personality prompts now
+    try:
+        await serving
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await server.close()
+
+
+def _run_worker(args: argparse.Namespace):
+    try:
+        asyncio.run(serve(args, reuse_port=True))
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve many Hello World Agent sessions over HTTP/WebSocket")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes sharing the port (SO_REUSEPORT); needs --store")
+    parser.add_argument("--store", help="Session store: a .db file (SQLite) or a directory")
+    parser.add_argument("--idle-timeout", type=float, default=300.0,
+                        help="Seconds before an idle session is evicted")
+    parser.add_argument("--memory-limit-mb", type=float, default=None,
+                        help="Per-worker RSS ceiling; least recently used sessions are evicted above it")
+    parser.add_argument("--max-sessions", type=int, default=None, help="Per-worker live session cap")
+    parser.add_argument("--model", default=config.DEFAULT_MODEL)
+    parser.add_argument("--personality", default=config.DEFAULT_PERSONALITY)
+    parser.add_argument("--base-url", default=None, help="OpenAI-compatible API base URL")
+    parser.add_argument("--api-key", default=None, help="Defaults to OPENAI_API_KEY")
+    parser.add_argument("--connections", type=int, default=config.ASYNC_MAX_CONNECTIONS,
+                        help="Upstream connections per worker")
+    args = parser.parse_args()
+
+    if args.workers > 1 and not args.store:
+        parser.error("--workers > 1 needs a shared --store")
+    try:
+        if args.workers == 1:
+            asyncio.run(serve(args))
+            return
+        workers = [multiprocessing.Process(target=_run_worker, args=(args,)) for _ in range(args.workers)]
+        for worker in workers:
+            worker.start()
+        # Stopping the parent stops the workers too instead of orphaning them
+        signal.signal(signal.SIGTERM, lambda *_: [worker.terminate() for worker in workers])
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        print("\n👋 Server stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,416 @@
+"""
+Persistent sessions for the Hello World Agent
+Append-only binary message logs plus periodic snapshots, so restarts resume conversations
+
+Records are msgpack-encoded when msgpack is installed (JSON otherwise).
+Restoring loads the latest snapshot and replays only the records logged
+after it, so even very long sessions resume in milliseconds.
+
+Usage:
+    store = SQLiteSessionStore("sessions.db")
+    agent = HelloWorldAgent.resume(store, "alice")
+"""
+
+import json
+import os
+import sqlite3
+import struct
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import fcntl
+except ImportError:  # Windows: logs are only locked within one process
+    fcntl = None
+
+SNAPSHOT_VERSION = 1
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_DATETIME_EXT = 1
+_FRAME_HEADER = struct.Struct("<I")
+_EPOCH_PROBE_BYTES = 64  # An epoch marker frame always fits
+_EPOCH_SHIFT = 40  # Versions pack the log epoch above its size (logs stay under 1 TiB)
+
+# (snapshot state or None, records logged after the snapshot)
+SessionData = Tuple[Optional[Dict], List]
+
+
+def _to_micros(value: datetime) -> int:
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _from_micros(micros: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=micros)
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(_DATETIME_EXT, struct.pack("<q", _to_micros(obj)))
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+
+def _msgpack_ext_hook(code: int, data: bytes):
+    if code == _DATETIME_EXT:
+        return _from_micros(struct.unpack("<q", data)[0])
+    return msgpack.ExtType(code, data)
+
+
+def _json_default(obj):
+    if isinstance(obj, datetime):
+        return {"__dt__": _to_micros(obj)}
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+
+def _json_object_hook(obj: Dict):
+    if len(obj) == 1 and "__dt__" in obj:
+        return _from_micros(obj["__dt__"])
+    return obj
+
+
+def pack(obj) -> bytes:
+    """Encode plain data (datetimes included) in the store's binary format"""
+    if MSGPACK_AVAILABLE:
+        return msgpack.packb(obj, default=_msgpack_default, use_bin_type=True)
+    return json.dumps(obj, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+
+def unpack(data: bytes):
+    if MSGPACK_AVAILABLE:
+        return msgpack.unpackb(data, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False)
+    return json.loads(data, object_hook=_json_object_hook)
+
+
+def encode_message(message) -> List:
+    """Compact positional record for an `AgentMessage`"""
+    return [message.content, message.timestamp, message.message_type, message.metadata, message.token_count]
+
+
+def decode_message(record: List, message_cls):
+    content, timestamp, message_type, metadata, token_count = record
+    return message_cls(content=content, timestamp=timestamp, message_type=message_type,
+                       metadata=metadata, token_count=token_count)
+
+
+def _frame(data: bytes) -> bytes:
+    return _FRAME_HEADER.pack(len(data)) + data
+
+
+def _read_frames(data: bytes, position: int = 0) -> Tuple[List[bytes], int]:
+    """Payloads of the complete frames from `position` on, and the offset where the last one ends"""
+    payloads = []
+    header_size, end = _FRAME_HEADER.size, len(data)
+    while position + header_size <= end:
+        (size,) = _FRAME_HEADER.unpack_from(data, position)
+        if position + header_size + size > end:
+            break  # Torn final record
+        payloads.append(data[position + header_size:position + header_size + size])
+        position += header_size + size
+    return payloads, position
+
+
+def _epoch_marker(epoch: int) -> bytes:
+    return _frame(pack({"log_epoch": epoch}))
+
+
+def _log_epoch(data: bytes) -> Tuple[int, int]:
+    """(epoch, offset of the first record) from the start of a log; logs without a marker are epoch 0"""
+    payloads, end = _read_frames(data[:_EPOCH_PROBE_BYTES])
+    if payloads:
+        marker = unpack(payloads[0])
+        if isinstance(marker, dict) and "log_epoch" in marker:
+            return marker["log_epoch"], _FRAME_HEADER.size + len(payloads[0])
+    return 0, 0
+
+
+def _log_version(log) -> int:
+    """Log epoch and size in one number, so compaction never repeats an earlier version"""
+    epoch = _log_epoch(os.pread(log.fileno(), _EPOCH_PROBE_BYTES, 0))[0]
+    return (epoch << _EPOCH_SHIFT) | os.fstat(log.fileno()).st_size
+
+
+@contextmanager
+def _file_lock(log):
+    """Exclusive advisory lock on an open log (no-op without `fcntl`)"""
+    if fcntl is None:
+        yield
+        return
+    fcntl.flock(log.fileno(), fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(log.fileno(), fcntl.LOCK_UN)
+
+
+class SessionStore(ABC):
+    """
+    Interface for session persistence backends.
+
+    `append` adds message records to a session's log; `save_snapshot`
+    stores a full agent state that covers everything logged so far;
+    `load` returns the latest snapshot plus the records appended after it.
+    `version` changes whenever a session's log grows, so processes sharing
+    a store can tell when their in-memory copy is stale.
+    """
+
+    @abstractmethod
+    def append(self, session_id: str, records: Iterable[List]) -> int:
+        """Append encoded message records to the session log; returns the new version"""
+
+    @abstractmethod
+    def version(self, session_id: str) -> int:
+        """Current log version of a session (0 if nothing is logged)"""
+
+    @abstractmethod
+    def save_snapshot(self, session_id: str, state: Dict):
+        """Store `state` as covering every record appended so far"""
+
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[SessionData]:
+        """(snapshot, later records), or None for an unknown session"""
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        """Forget a session entirely"""
+
+    @abstractmethod
+    def sessions(self) -> List[str]:
+        """IDs of every stored session"""
+
+    def close(self):
+        pass
+
+
+class FileSessionStore(SessionStore):
+    """
+    One directory per store: `<id>.log` holds length-prefixed records and
+    `<id>.snap` the latest snapshot with the log offset it covers.
+
+    Snapshots are written to a temporary file and renamed into place, then
+    the log is compacted: it restarts with a marker frame carrying the new
+    snapshot's epoch, so a crash between the two steps leaves an old-epoch
+    log that the snapshot already covers. A torn record at the end of a log
+    (crash mid-write) is ignored on load and cut off before the next append.
+    Appends and compaction take an advisory lock on the log where `fcntl`
+    is available, so several processes can share a directory.
+    """
+
+    def __init__(self, directory: str = "sessions"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._logs: Dict[str, object] = {}
+
+    def _path(self, session_id: str, suffix: str) -> str:
+        if not session_id or os.sep in session_id or session_id.startswith("."):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        return os.path.join(self.directory, session_id + suffix)
+
+    def _log(self, session_id: str):
+        log = self._logs.get(session_id)
+        if log is None:
+            log = self._logs[session_id] = open(self._path(session_id, ".log"), "a+b")
+            with _file_lock(log):
+                self._repair(session_id, log)
+        return log
+
+    def _snapshot_epoch(self, session_id: str) -> int:
+        try:
+            with open(self._path(session_id, ".snap"), "rb") as f:
+                return unpack(f.read()).get("log_epoch", 0)
+        except FileNotFoundError:
+            return 0
+
+    def _repair(self, session_id: str, log):
+        """Cut a torn tail, or restart a log that predates the snapshot (crash before compaction)"""
+        log.seek(0)
+        data = log.read()
+        epoch, start = _log_epoch(data)
+        snapshot_epoch = self._snapshot_epoch(session_id)
+        if epoch < snapshot_epoch:
+            log.truncate(0)
+            log.write(_epoch_marker(snapshot_epoch))
+        else:
+            end = _read_frames(data, start)[1]
+            if end < len(data):
+                log.truncate(end)
+        log.flush()
+
+    def append(self, session_id: str, records: Iterable[List]):
+        frames = b"".join(_frame(data) for data in map(pack, records))
+        with self._lock:
+            log = self._log(session_id)
+            with _file_lock(log):
+                log.write(frames)
+                log.flush()
+                return _log_version(log)
+
+    def version(self, session_id: str) -> int:
+        try:
+            with open(self._path(session_id, ".log"), "rb") as f:
+                return _log_version(f)
+        except FileNotFoundError:
+            return 0
+
+    def save_snapshot(self, session_id: str, state: Dict):
+        with self._lock:
+            log = self._log(session_id)
+            with _file_lock(log):
+                epoch = _log_epoch(os.pread(log.fileno(), _EPOCH_PROBE_BYTES, 0))[0] + 1
+                marker = _epoch_marker(epoch)
+                path = self._path(session_id, ".snap")
+                with open(path + ".tmp", "wb") as f:
+                    f.write(pack({"log_epoch": epoch, "log_offset": len(marker), "state": state}))
+                os.replace(path + ".tmp", path)
+                # Every record so far is in the snapshot (appends wait on the lock)
+                log.truncate(0)
+                log.write(marker)
+                log.flush()
+
+    def load(self, session_id: str) -> Optional[SessionData]:
+        snapshot, offset, snapshot_epoch = None, 0, 0
+        try:
+            with open(self._path(session_id, ".snap"), "rb") as f:
+                saved = unpack(f.read())
+            snapshot, offset = saved["state"], saved["log_offset"]
+            snapshot_epoch = saved.get("log_epoch", 0)
+        except FileNotFoundError:
+            pass
+        try:
+            with open(self._path(session_id, ".log"), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            if snapshot is None:
+                return None
+            data = b""
+
+        epoch, start = _log_epoch(data)
+        if snapshot is None:
+            offset = start
+        elif epoch < snapshot_epoch:
+            offset = len(data)  # Compaction was interrupted; the snapshot covers this log
+        payloads, end = _read_frames(data, offset)
+        if end < len(data) or epoch < snapshot_epoch:
+            with self._lock:
+                log = self._log(session_id)
+                with _file_lock(log):
+                    self._repair(session_id, log)
+        return snapshot, [unpack(payload) for payload in payloads]
+
+    def delete(self, session_id: str):
+        with self._lock:
+            log = self._logs.pop(session_id, None)
+            if log is not None:
+                log.close()
+            for suffix in (".log", ".snap"):
+                try:
+                    os.remove(self._path(session_id, suffix))
+                except FileNotFoundError:
+                    pass
+
+    def sessions(self) -> List[str]:
+        names = {os.path.splitext(name)[0] for name in os.listdir(self.directory)
+                 if name.endswith((".log", ".snap"))}
+        return sorted(names)
+
+    def close(self):
+        with self._lock:
+            for log in self._logs.values():
+                log.close()
+            self._logs.clear()
+
+
+class SQLiteSessionStore(SessionStore):
+    """All sessions in one SQLite file (WAL mode, safe to share between processes)"""
+
+    def __init__(self, path: str = "sessions.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "session_id TEXT NOT NULL, seq INTEGER NOT NULL, record BLOB NOT NULL, "
+            "PRIMARY KEY (session_id, seq)) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            "session_id TEXT PRIMARY KEY, seq INTEGER NOT NULL, state BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _last_seq(self, session_id: str) -> int:
+        (seq,) = self._conn.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM messages WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return seq
+
+    def append(self, session_id: str, records: Iterable[List]):
+        blobs = [pack(record) for record in records]
+        with self._lock:
+            # Read MAX(seq) under the write lock, so workers sharing the file never pick the same seq
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                seq = self._last_seq(session_id)
+                self._conn.executemany(
+                    "INSERT INTO messages (session_id, seq, record) VALUES (?, ?, ?)",
+                    [(session_id, seq + i + 1, blob) for i, blob in enumerate(blobs)],
+                )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+            return seq + len(blobs)
+
+    def version(self, session_id: str) -> int:
+        with self._lock:
+            return self._last_seq(session_id)
+
+    def save_snapshot(self, session_id: str, state: Dict):
+        blob = pack(state)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots (session_id, seq, state) VALUES (?, ?, ?)",
+                (session_id, self._last_seq(session_id), blob),
+            )
+            self._conn.commit()
+
+    def load(self, session_id: str) -> Optional[SessionData]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT seq, state FROM snapshots WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            seq = row[0] if row else 0
+            rows = self._conn.execute(
+                "SELECT record FROM messages WHERE session_id = ? AND seq > ? ORDER BY seq",
+                (session_id, seq),
+            ).fetchall()
+        if row is None and not rows:
+            return None
+        return (unpack(row[1]) if row else None), [unpack(record) for (record,) in rows]
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM snapshots WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def sessions(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id FROM messages UNION SELECT session_id FROM snapshots ORDER BY 1"
+            ).fetchall()
+        return [session_id for (session_id,) in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
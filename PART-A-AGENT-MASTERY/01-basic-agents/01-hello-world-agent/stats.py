@@ -0,0 +1,209 @@
+"""
+Running statistics for the Hello World Agent
+Every update is O(1) so long sessions never rescan the conversation history
+"""
+
+import math
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional
+
+DEFAULT_MAX_TOPICS = 1000
+
+
+class TopicCounter:
+    """
+    Bounded, set-like topic counter.
+
+    Behaves like the old `topics_discussed` set (update / iterate / len / in)
+    but also keeps per-topic counts. When more than `max_topics` distinct
+    topics are seen, the least recently mentioned topic is evicted.
+    """
+
+    def __init__(self, max_topics: int = DEFAULT_MAX_TOPICS):
+        self.max_topics = max_topics
+        self._counts: "OrderedDict[str, int]" = OrderedDict()
+        self.evicted = 0
+
+    def add(self, topic: str):
+        """Count a single topic, evicting the stalest one if full"""
+        counts = self._counts
+        if topic in counts:
+            counts[topic] += 1
+            counts.move_to_end(topic)
+            return
+        counts[topic] = 1
+        if len(counts) > self.max_topics:
+            counts.popitem(last=False)
+            self.evicted += 1
+
+    def update(self, topics: Iterable[str]):
+        """Count every topic in `topics`"""
+        for topic in topics:
+            self.add(topic)
+
+    def count(self, topic: str) -> int:
+        return self._counts.get(topic, 0)
+
+    def most_common(self, n: Optional[int] = None):
+        """Return (topic, count) pairs, most frequent first"""
+        ranked = sorted(self._counts.items(), key=lambda item: item[1], reverse=True)
+        return ranked if n is None else ranked[:n]
+
+    def clear(self):
+        self._counts.clear()
+        self.evicted = 0
+
+    def to_state(self) -> Dict:
+        """Plain-data snapshot (topics in recency order, oldest first)"""
+        return {"max_topics": self.max_topics, "counts": list(self._counts.items()), "evicted": self.evicted}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "TopicCounter":
+        counter = cls(state["max_topics"])
+        counter._counts.update((topic, count) for topic, count in state["counts"])
+        counter.evicted = state["evicted"]
+        return counter
+
+    def __contains__(self, topic) -> bool:
+        return topic in self._counts
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._counts)
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __repr__(self) -> str:
+        return f"TopicCounter({dict(self._counts)!r})"
+
+
+class ConversationStats:
+    """
+    Constant-time conversation statistics.
+
+    - Message counts by type ('user', 'agent', 'system')
+    - Running mean and variance of response times (Welford's algorithm)
+    - First/last message timestamps for the conversation duration
+    - Time-to-first-token and total time for streamed responses
+    - Prompt tokens sent, and tokens saved against the fixed last-5 context
+    - Replies shared from another caller's identical in-flight request
+
+    The mean is reported as `total / count` rather than Welford's running
+    mean so it stays bit-identical to summing the history in order.
+    """
+
+    def __init__(self):
+        self.message_counts: Dict[str, int] = {}
+        self.response_count = 0
+        self.response_time_total = 0.0
+        self._welford_mean = 0.0
+        self._welford_m2 = 0.0
+        self.first_timestamp: Optional[datetime] = None
+        self.last_timestamp: Optional[datetime] = None
+        self.streamed_responses = 0
+        self._ttft_count = 0
+        self._ttft_total = 0.0
+        self._stream_time_total = 0.0
+        self.prompts_built = 0
+        self.prompt_tokens_total = 0
+        self.baseline_prompt_tokens_total = 0
+        self.context_messages_total = 0
+        self.coalesced_responses = 0
+
+    def to_state(self) -> Dict:
+        """Plain-data snapshot of every counter (timestamps stay datetimes)"""
+        state = dict(vars(self))
+        state["message_counts"] = dict(self.message_counts)
+        return state
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "ConversationStats":
+        stats = cls()
+        for name, value in state.items():
+            if hasattr(stats, name):  # Ignore fields from other versions
+                setattr(stats, name, value)
+        stats.message_counts = dict(stats.message_counts)
+        return stats
+
+    def record_message(self, message_type: str, timestamp: datetime):
+        """Count a message of the given type"""
+        self.message_counts[message_type] = self.message_counts.get(message_type, 0) + 1
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+        self.last_timestamp = timestamp
+
+    def record_response_time(self, seconds: float):
+        """Add one response time sample"""
+        self.response_count += 1
+        self.response_time_total += seconds
+        delta = seconds - self._welford_mean
+        self._welford_mean += delta / self.response_count
+        self._welford_m2 += delta * (seconds - self._welford_mean)
+
+    def record_stream_timing(self, time_to_first_token: Optional[float], total_time: float):
+        """Add one streamed response (TTFT is None if no token arrived)"""
+        self.streamed_responses += 1
+        self._stream_time_total += total_time
+        if time_to_first_token is not None:
+            self._ttft_count += 1
+            self._ttft_total += time_to_first_token
+
+    def record_prompt(self, prompt_tokens: int, baseline_tokens: int, history_messages: int):
+        """Add one built prompt (baseline = what the fixed last-5 slice would have cost)"""
+        self.prompts_built += 1
+        self.prompt_tokens_total += prompt_tokens
+        self.baseline_prompt_tokens_total += baseline_tokens
+        self.context_messages_total += history_messages
+
+    @property
+    def total_messages(self) -> int:
+        return sum(self.message_counts.values())
+
+    def count(self, message_type: str) -> int:
+        return self.message_counts.get(message_type, 0)
+
+    @property
+    def mean_response_time(self) -> float:
+        if self.response_count == 0:
+            return 0
+        return self.response_time_total / self.response_count
+
+    @property
+    def response_time_variance(self) -> float:
+        """Sample variance of response times (0 with fewer than two samples)"""
+        if self.response_count < 2:
+            return 0.0
+        return self._welford_m2 / (self.response_count - 1)
+
+    @property
+    def response_time_stdev(self) -> float:
+        return math.sqrt(self.response_time_variance)
+
+    @property
+    def mean_time_to_first_token(self) -> float:
+        return self._ttft_total / self._ttft_count if self._ttft_count else 0.0
+
+    @property
+    def mean_stream_time(self) -> float:
+        return self._stream_time_total / self.streamed_responses if self.streamed_responses else 0.0
+
+    @property
+    def mean_prompt_tokens(self) -> float:
+        return self.prompt_tokens_total / self.prompts_built if self.prompts_built else 0.0
+
+    @property
+    def mean_context_messages(self) -> float:
+        return self.context_messages_total / self.prompts_built if self.prompts_built else 0.0
+
+    @property
+    def prompt_tokens_saved(self) -> int:
+        """Tokens saved against the fixed last-5 slice (negative when more context fit)"""
+        return self.baseline_prompt_tokens_total - self.prompt_tokens_total
+
+    @property
+    def duration(self) -> float:
+        """Seconds between the first and last recorded message"""
+        if self.first_timestamp is None:
+            return 0
+        return (self.last_timestamp - self.first_timestamp).total_seconds()
@@ -0,0 +1,192 @@
+"""
+Rolling conversation summary for the Hello World Agent
+Turns that age out of the live window are folded into a running summary
+
+Summaries are updated on a shared background thread pool, never on the
+reply path. Messages that have aged out but are not folded in yet stay in
+the prompt (`outstanding`), so nothing drops out of context in between.
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+
+import config
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an assistant. "
+    "Merge the new turns into the summary. Keep names, facts, preferences, decisions and "
+    "open questions; drop greetings and filler. Reply with the updated summary only, "
+    "in at most {max_words} words."
+)
+
+# (previous summary, newly aged-out messages) -> updated summary
+SummarizeFn = Callable[[str, List], str]
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=config.SUMMARY_WORKERS,
+                                           thread_name_prefix="summarizer")
+        return _executor
+
+
+def _role(message) -> str:
+    return "User" if message.message_type == "user" else "Assistant"
+
+
+def completion_summarize_fn(complete: Callable[[Dict], str], model: str,
+                            max_tokens: int = config.SUMMARY_MAX_TOKENS) -> SummarizeFn:
+    """Summarize with chat completion params passed to `complete` (e.g. an agent's rate-limited request path)"""
+    system_prompt = SUMMARY_SYSTEM_PROMPT.format(max_words=max_tokens * 3 // 4)
+
+    def summarize(summary: str, messages: List) -> str:
+        turns = "\n".join(f"{_role(m)}: {m.content}" for m in messages)
+        return complete({
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": f"Summary so far:\n{summary or '(empty)'}\n\nNew turns:\n{turns}"},
+            ],
+            "max_tokens": max_tokens,
+            "temperature": 0,
+        })
+
+    return summarize
+
+
+def llm_summarize_fn(client, model: str, max_tokens: int = config.SUMMARY_MAX_TOKENS) -> SummarizeFn:
+    """Summarize with a chat completion on `client` (a sync OpenAI client), bypassing any agent policy"""
+    def complete(params: Dict) -> str:
+        return client.chat.completions.create(**params).choices[0].message.content.strip()
+
+    return completion_summarize_fn(complete, model, max_tokens)
+
+
+def extractive_summarize(summary: str, messages: List, max_lines: int = 8, max_words: int = 12) -> str:
+    """No-LLM fallback: one short line per user message, newest `max_lines` kept"""
+    lines = summary.splitlines() if summary else []
+    for message in messages:
+        if message.message_type != "user":
+            continue
+        words = message.content.split()
+        text = " ".join(words[:max_words]) + (" ..." if len(words) > max_words else "")
+        topics = (message.metadata or {}).get("topics")
+        lines.append(f"- User ({', '.join(topics)}): {text}" if topics else f"- User: {text}")
+    return "\n".join(lines[-max_lines:])
+
+
+class RollingSummarizer:
+    """
+    Keeps the last `live_messages` messages verbatim and a summary of the rest.
+
+    Aged-out messages are queued and folded in batches of at least
+    `batch_messages`; at most one update per summarizer runs at a time.
+    """
+
+    def __init__(self, summarize_fn: SummarizeFn = extractive_summarize,
+                 live_messages: int = config.SUMMARY_LIVE_MESSAGES,
+                 batch_messages: int = config.SUMMARY_BATCH_MESSAGES):
+        self.summarize_fn = summarize_fn
+        self.live_messages = live_messages
+        self.batch_messages = batch_messages
+        self.summary = ""
+        self.summarized_messages = 0
+        self.updates = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._live = 0
+        self._pending: List = []
+        self._in_flight = 0
+        self._running = False
+        self._future: Optional[Future] = None
+        self._generation = 0
+
+    @property
+    def outstanding(self) -> int:
+        """Aged-out messages not yet in the summary (still sent verbatim)"""
+        with self._lock:
+            return len(self._pending) + self._in_flight
+
+    def after_turn(self, history: Sequence, new_messages: int = 2):
+        """Call after messages are appended; queues whatever left the live window"""
+        self._live += new_messages
+        if self._live <= self.live_messages:
+            return
+        # Messages the history already evicted are simply gone
+        window = history.recent(self._live)
+        aged = list(window[:max(len(window) - self.live_messages, 0)])
+        self._live = self.live_messages
+        self._enqueue(aged)
+
+    def _enqueue(self, messages: List, force: bool = False):
+        with self._lock:
+            self._pending.extend(messages)
+            if self._running or not self._pending or (len(self._pending) < self.batch_messages and not force):
+                return
+            self._running = True
+            generation = self._generation
+        self._future = _get_executor().submit(self._drain, generation)
+
+    def _drain(self, generation: int):
+        while True:
+            with self._lock:
+                if generation != self._generation or not self._pending:
+                    self._running = False
+                    return
+                batch, self._pending = self._pending, []
+                self._in_flight = len(batch)
+                summary = self.summary
+            try:
+                summary = self.summarize_fn(summary, batch)
+                failed = False
+            except Exception:
+                failed = True  # Keep the old summary; these turns are not retried
+            with self._lock:
+                self._in_flight = 0
+                if generation != self._generation:
+                    self._running = False
+                    return
+                if failed:
+                    self.failures += 1
+                else:
+                    self.summary = summary
+                    self.summarized_messages += len(batch)
+                    self.updates += 1
+
+    def flush(self, timeout: Optional[float] = None):
+        """Fold every queued message in now and wait for the summary to settle"""
+        self._enqueue([], force=True)
+        future = self._future
+        if future is not None:
+            future.result(timeout)
+
+    def to_state(self) -> Dict:
+        """Summary plus how many trailing history messages it does not cover"""
+        with self._lock:
+            unsummarized = self._live + len(self._pending) + self._in_flight
+            return {"summary": self.summary, "summarized_messages": self.summarized_messages,
+                    "unsummarized": unsummarized}
+
+    def restore(self, state: Dict, history: Sequence, new_messages: int = 0):
+        """Resume from `to_state` output; `new_messages` were appended to history since"""
+        self.reset()
+        self.summary = state["summary"]
+        self.summarized_messages = state["summarized_messages"]
+        self._live = state["unsummarized"]
+        self.after_turn(history, new_messages)
+
+    def reset(self):
+        with self._lock:
+            self._generation += 1
+            self.summary = ""
+            self.summarized_messages = 0
+            self._live = 0
+            self._pending = []
+            self._in_flight = 0
+            self._running = False
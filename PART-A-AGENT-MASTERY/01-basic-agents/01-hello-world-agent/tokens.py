@@ -0,0 +1,61 @@
+"""
+Local token counting for the Hello World Agent
+Counts prompt tokens without an API call (tiktoken when available)
+
+Without tiktoken, or when its encoding files cannot be loaded, counts fall
+back to a word/punctuation estimate that stays within a few percent of
+cl100k_base on English chat text.
+"""
+
+import importlib.util
+import re
+from typing import Dict
+
+import config
+
+# tiktoken is imported by the first Tokenizer, not at module load
+TIKTOKEN_AVAILABLE = importlib.util.find_spec("tiktoken") is not None
+
+# Chat-format framing per message and for priming the reply (OpenAI cookbook values)
+MESSAGE_OVERHEAD_TOKENS = 3
+REPLY_PRIMING_TOKENS = 3
+
+_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]+")
+
+
+class Tokenizer:
+    """Token counter for one model"""
+
+    def __init__(self, model: str = config.DEFAULT_MODEL):
+        self.model = model
+        self.encoding = None
+        if TIKTOKEN_AVAILABLE:
+            import tiktoken
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                # Not an OpenAI model (e.g. llama3): cl100k_base is a close enough estimate
+                try:
+                    self.encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception:
+                    self.encoding = None  # Offline, as below
+            except Exception:
+                # Encoding files missing and not downloadable (offline)
+                self.encoding = None
+        self.name = self.encoding.name if self.encoding is not None else "approximate"
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return sum((len(piece) + 3) // 4 for piece in _PIECE_PATTERN.findall(text))
+
+
+_tokenizers: Dict[str, Tokenizer] = {}
+
+
+def get_tokenizer(model: str = config.DEFAULT_MODEL) -> Tokenizer:
+    """Shared tokenizer per model (encodings are loaded once)"""
+    tokenizer = _tokenizers.get(model)
+    if tokenizer is None:
+        tokenizer = _tokenizers[model] = Tokenizer(model)
+    return tokenizer
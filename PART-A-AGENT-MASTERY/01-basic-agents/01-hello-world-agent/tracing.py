@@ -0,0 +1,230 @@
+"""
+Per-turn latency tracing for the Hello World Agent
+Each turn is split into phase spans timed with perf_counter_ns
+
+Phases: analyze, context_build, network_request (send until first byte),
+parse (body download + decoding), log. Hooks receive every finished turn;
+`JsonLinesExporter` writes OpenTelemetry (OTLP/JSON) compatible lines.
+
+Usage:
+    tracer = Tracer(hooks=[JsonLinesExporter("traces.jsonl")])
+    agent = HelloWorldAgent(tracer=tracer)
+"""
+
+import json
+import math
+import random
+import threading
+import time
+import warnings
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+import config
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+def _new_id(n_bytes: int) -> str:
+    # Same scheme as the OpenTelemetry SDK: non-zero random bits, hex encoded
+    return f"{random.getrandbits(n_bytes * 8) or 1:0{n_bytes * 2}x}"
+
+
+class Span:
+    """One timed phase of a turn (perf_counter_ns timestamps)"""
+
+    __slots__ = ("name", "start_ns", "end_ns", "attributes", "events", "kind")
+
+    def __init__(self, name: str, kind: int = SPAN_KIND_INTERNAL):
+        self.name = name
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, object] = {}
+        self.events: List[tuple] = []  # (name, perf_counter_ns)
+        self.kind = kind
+
+    def add_event(self, name: str):
+        self.events.append((name, time.perf_counter_ns()))
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.perf_counter_ns()
+
+    @property
+    def duration_ns(self) -> int:
+        return (self.end_ns or time.perf_counter_ns()) - self.start_ns
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if isinstance(exc, Exception):  # Not GeneratorExit/cancellation
+            self.attributes["error"] = True
+            self.attributes["exception.type"] = exc_type.__name__
+        self.end()
+
+
+class TurnTrace:
+    """
+    All spans of one agent turn, under a root `agent.turn` span.
+
+    Trace and span IDs are only generated on export, so untraced turns
+    (no hooks) pay just for the timestamps.
+    """
+
+    def __init__(self, attributes: Optional[Dict[str, object]] = None):
+        self.epoch_start_ns = time.time_ns()
+        self.root = Span("agent.turn")
+        self.root.attributes.update(attributes or {})
+        self.spans: List[Span] = []
+
+    def span(self, name: str, kind: int = SPAN_KIND_INTERNAL) -> Span:
+        """Start a child span (use as a context manager or call `end()`)"""
+        span = Span(name, kind)
+        self.spans.append(span)
+        return span
+
+    def phase_durations_ns(self) -> Dict[str, int]:
+        durations = {span.name: span.duration_ns for span in self.spans if span.end_ns is not None}
+        durations["turn"] = self.root.duration_ns
+        return durations
+
+    def first_byte_ns(self) -> Optional[int]:
+        """Turn start to first response byte, if one was recorded"""
+        for span in self.spans:
+            for name, at in span.events:
+                if name == "first_byte":
+                    return at - self.root.start_ns
+        return None
+
+    def to_otlp(self, service_name: str = "hello-world-agent") -> Dict:
+        """OTLP/JSON `ExportTraceServiceRequest` for this turn"""
+        offset = self.epoch_start_ns - self.root.start_ns
+        trace_id = _new_id(16)
+
+        def encode(span: Span, span_id: str, parent_id: str) -> Dict:
+            return {
+                "traceId": trace_id,
+                "spanId": span_id,
+                "parentSpanId": parent_id,
+                "name": span.name,
+                "kind": span.kind,
+                "startTimeUnixNano": str(span.start_ns + offset),
+                "endTimeUnixNano": str((span.end_ns or span.start_ns) + offset),
+                "attributes": [_otlp_attribute(k, v) for k, v in span.attributes.items()],
+                "events": [{"name": name, "timeUnixNano": str(at + offset)} for name, at in span.events],
+                "status": {"code": STATUS_ERROR if span.attributes.get("error") else STATUS_OK},
+            }
+
+        root_id = _new_id(8)
+        spans = [encode(self.root, root_id, "")] + [encode(s, _new_id(8), root_id) for s in self.spans]
+        return {"resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", service_name)]},
+            "scopeSpans": [{"scope": {"name": "hello_world_agent.tracing"}, "spans": spans}],
+        }]}
+
+
+def _otlp_attribute(key: str, value: object) -> Dict:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+class JsonLinesExporter:
+    """Hook that appends each finished turn as one OTLP/JSON line"""
+
+    def __init__(self, path: str, service_name: str = "hello-world-agent"):
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __call__(self, trace: TurnTrace):
+        line = json.dumps(trace.to_otlp(self.service_name), separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def percentile(sorted_values: List[int], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class Tracer:
+    """
+    Creates turn traces, runs hooks and keeps rolling per-phase latencies.
+
+    The last `window` durations of each phase are kept in bounded deques, so
+    percentiles cost nothing per turn and are only sorted when requested.
+    """
+
+    def __init__(self, hooks: Optional[List[Callable[[TurnTrace], None]]] = None,
+                 window: int = config.TRACE_WINDOW):
+        self.hooks: List[Callable[[TurnTrace], None]] = list(hooks or [])
+        self.window = window
+        self._latencies: Dict[str, Deque[int]] = {}
+
+    def add_hook(self, hook: Callable[[TurnTrace], None]):
+        self.hooks.append(hook)
+
+    def start_turn(self, **attributes) -> TurnTrace:
+        return TurnTrace(attributes)
+
+    def finish_turn(self, trace: TurnTrace):
+        trace.root.end()
+        durations = trace.phase_durations_ns()
+        first_byte = trace.first_byte_ns()
+        if first_byte is not None:
+            durations["first_byte"] = first_byte
+        for name, duration in durations.items():
+            window = self._latencies.get(name)
+            if window is None:
+                window = self._latencies[name] = deque(maxlen=self.window)
+            window.append(duration)
+        for hook in self.hooks:
+            try:
+                hook(trace)
+            except Exception as e:  # A broken hook must never break a turn
+                warnings.warn(f"Tracing hook {hook!r} failed: {e}")
+
+    def percentiles(self) -> Dict[str, Dict[str, float]]:
+        """Rolling p50/p95/p99 per phase, in milliseconds"""
+        report = {}
+        for name, window in self._latencies.items():
+            values = sorted(window)
+            report[name] = {
+                f"p{p}_ms": round(percentile(values, p) / 1e6, 3) for p in (50, 95, 99)
+            }
+        return report
+
+    def reset(self):
+        self._latencies.clear()
+
+
+_default_exporter: Optional[JsonLinesExporter] = None
+
+
+def default_hooks() -> List[Callable[[TurnTrace], None]]:
+    """The shared exporter for config.TRACE_EXPORT_PATH, if one is configured"""
+    global _default_exporter
+    if not config.TRACE_EXPORT_PATH:
+        return []
+    if _default_exporter is None:
+        _default_exporter = JsonLinesExporter(config.TRACE_EXPORT_PATH)
+    return [_default_exporter]
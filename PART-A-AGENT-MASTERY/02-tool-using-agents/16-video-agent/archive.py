@@ -0,0 +1,58 @@
+"""
+Download archive for the Video Downloader Agent
+Remembers every finished video by "<extractor> <video id>" so re-runs skip it
+
+The file uses yt-dlp's `--download-archive` format (one ID per line), so
+the same archive works from the yt-dlp command line. It is read once into
+a set; yt-dlp checks it before extracting whenever the ID can be derived
+from the URL (YouTube, most sites) and after extraction otherwise.
+
+Usage:
+    agent = VideoDownloaderAgent(archive_path="downloads/archive.txt")
+"""
+
+import os
+import threading
+from typing import Iterator, Set
+
+
+class DownloadArchive:
+    """
+    Set-like archive shared by every download in the process.
+
+    yt-dlp accepts any object with `in` and `add()` as its
+    `download_archive`; `add()` also appends the ID to the file, so an
+    interrupted batch keeps everything that finished. Lookups are O(1)
+    however large the archive grows.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._ids: Set[str] = set()
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self._ids.update(line.strip() for line in f if line.strip())
+        except FileNotFoundError:
+            pass
+
+    def __contains__(self, archive_id: str) -> bool:
+        return archive_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._ids)
+
+    def add(self, archive_id: str):
+        """Record a finished download (appended and flushed right away)"""
+        with self._lock:
+            if archive_id in self._ids:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(archive_id + "\n")
+            self._ids.add(archive_id)
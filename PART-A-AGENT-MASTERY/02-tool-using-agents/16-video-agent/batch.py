@@ -0,0 +1,192 @@
+"""
+Concurrent batch downloads for the Video Downloader Agent
+Downloads many URLs on a bounded worker pool with a per-host concurrency limit
+
+URLs are queued per host and handed to workers in input order, skipping
+hosts that are already at their limit, so one slow site cannot hold up
+the rest of the batch. Results are yielded as each download finishes.
+
+Usage:
+    for result in agent.download_many(read_urls("urls.txt"), workers=8, per_host=2):
+        print(result["status"], result["url"])
+"""
+
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import IO, Callable, Deque, Dict, Iterable, Iterator, Optional, Set, Tuple, Union
+from urllib.parse import urlsplit
+
+DEFAULT_WORKERS = 4
+DEFAULT_PER_HOST = 2
+PROGRESS_INTERVAL = 0.2  # Seconds between progress line redraws
+
+
+def read_urls(source: Union[str, IO[str]]) -> Iterator[str]:
+    """URLs from a file path ("-" for stdin) or open file, one per line; blank lines and # comments are skipped"""
+    if isinstance(source, str):
+        if source == "-":
+            yield from read_urls(sys.stdin)
+            return
+        with open(source, encoding="utf-8") as f:
+            yield from read_urls(f)
+            return
+    for line in source:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
+def host_key(url: str) -> str:
+    """Host a URL counts against for the per-host limit ("www." and "m." variants share one)"""
+    host = (urlsplit(url).hostname or "").lower()
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            return host[len(prefix):]
+    return host
+
+
+class BatchProgress:
+    """
+    Thread-safe aggregate progress for a batch, fed by yt-dlp progress hooks.
+
+    `render()` returns one status line; `maybe_print()` redraws it on
+    `stream` at most every PROGRESS_INTERVAL seconds.
+    """
+
+    def __init__(self, total: int, stream: Optional[IO[str]] = None):
+        self.total = total
+        self.stream = stream
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0  # Already in the download archive
+        self.active = 0
+        self.started = time.monotonic()
+        self._bytes: Dict[Tuple[str, str], int] = {}  # (url, file) -> bytes downloaded so far
+        self._lock = threading.Lock()
+        self._last_print = 0.0
+
+    @property
+    def done(self) -> int:
+        return self.succeeded + self.failed + self.skipped
+
+    @property
+    def downloaded_bytes(self) -> int:
+        return sum(self._bytes.values())
+
+    def hook_for(self, url: str) -> Callable[[Dict], None]:
+        """yt-dlp progress hook attributing bytes to `url`"""
+        def hook(status: Dict):
+            downloaded = status.get("downloaded_bytes")
+            if downloaded is not None:
+                with self._lock:
+                    self._bytes[(url, status.get("filename", ""))] = downloaded
+                self.maybe_print()
+        return hook
+
+    def start_job(self):
+        with self._lock:
+            self.active += 1
+        self.maybe_print()
+
+    def finish_job(self, result: Dict):
+        with self._lock:
+            self.active -= 1
+            if result.get("status") == "success":
+                self.succeeded += 1
+            elif result.get("status") == "skipped":
+                self.skipped += 1
+            else:
+                self.failed += 1
+        self.maybe_print(force=True)
+
+    def render(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        mb = self.downloaded_bytes / 1e6
+        skipped = f", {self.skipped} skipped" if self.skipped else ""
+        return (f"⏳ {self.done}/{self.total} done ({self.failed} failed{skipped}), {self.active} active, "
+                f"{mb:.1f} MB at {mb / elapsed:.1f} MB/s")
+
+    def maybe_print(self, force: bool = False):
+        if self.stream is None:
+            return
+        now = time.monotonic()
+        if force or now - self._last_print >= PROGRESS_INTERVAL:
+            self._last_print = now
+            end = "\n" if self.done == self.total else ""
+            print(f"\r{self.render()}", end=end, file=self.stream, flush=True)
+
+
+class BatchDownloader:
+    """
+    Runs `download_fn(url, progress_hook)` for many URLs on `workers`
+    threads, with at most `per_host` downloads per host at a time.
+
+    `run()` yields each result dict as soon as its download finishes
+    (completion order, not input order), tagged with its input `index`
+    and wall-clock `elapsed` seconds.
+    """
+
+    def __init__(self, download_fn: Callable[[str, Callable[[Dict], None]], Dict],
+                 workers: int = DEFAULT_WORKERS, per_host: int = DEFAULT_PER_HOST,
+                 progress_stream: Optional[IO[str]] = None):
+        if workers < 1 or per_host < 1:
+            raise ValueError("workers and per_host must be at least 1")
+        self.download_fn = download_fn
+        self.workers = workers
+        self.per_host = per_host
+        self.progress_stream = progress_stream
+        self.progress: Optional[BatchProgress] = None
+
+    def _run_one(self, index: int, url: str) -> Dict:
+        self.progress.start_job()
+        start = time.monotonic()
+        try:
+            result = self.download_fn(url, self.progress.hook_for(url))
+        except Exception as e:  # download_fn should not raise, but one bad URL must not end the batch
+            result = {"status": "error", "error": str(e), "url": url}
+        result = {**result, "index": index, "elapsed": round(time.monotonic() - start, 3)}
+        self.progress.finish_job(result)
+        return result
+
+    def run(self, urls: Iterable[str]) -> Iterator[Dict]:
+        queues: "OrderedDict[str, Deque[Tuple[int, str]]]" = OrderedDict()
+        total = 0
+        for index, url in enumerate(urls):
+            queues.setdefault(host_key(url), deque()).append((index, url))
+            total += 1
+        self.progress = BatchProgress(total, self.progress_stream)
+
+        active_per_host: Dict[str, int] = {}
+        running: Dict[Future, str] = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="download") as executor:
+            while queues or running:
+                # Fill free workers from hosts below their limit, oldest URL first
+                while len(running) < self.workers:
+                    ready = [(queue[0][0], host) for host, queue in queues.items()
+                             if active_per_host.get(host, 0) < self.per_host]
+                    if not ready:
+                        break
+                    _, host = min(ready)
+                    index, url = queues[host].popleft()
+                    if not queues[host]:
+                        del queues[host]
+                    active_per_host[host] = active_per_host.get(host, 0) + 1
+                    running[executor.submit(self._run_one, index, url)] = host
+
+                finished: Set[Future] = wait(running, return_when=FIRST_COMPLETED).done
+                for future in finished:
+                    host = running.pop(future)
+                    active_per_host[host] -= 1
+                    yield future.result()
+
+
+def write_jsonl(results: Iterable[Dict], stream: IO[str]) -> Iterator[Dict]:
+    """Write each result as one JSON line (flushed, so partial batches are usable) and pass it on"""
+    for result in results:
+        stream.write(json.dumps(result, ensure_ascii=False) + "\n")
+        stream.flush()
+        yield result
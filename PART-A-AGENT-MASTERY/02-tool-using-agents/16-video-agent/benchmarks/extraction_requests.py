@@ -0,0 +1,99 @@
+"""
+HTTP requests per video: extract-then-download (before) vs one extraction (after)
+Counts every request yt-dlp makes while downloading each URL both ways
+
+Runs against generated clips on a local fixture server by default; pass
+real URLs with --url to see the saving on sites whose extraction costs
+several round trips (e.g. YouTube: webpage, player JS, API calls).
+
+Usage:
+    python benchmarks/extraction_requests.py --videos 5
+    python benchmarks/extraction_requests.py --url "https://www.youtube.com/watch?v=VIDEO_ID"
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from yt_dlp import YoutubeDL
+
+from fixture_server import FixtureMediaServer, make_media
+from video_downloader_agent import VideoDownloaderAgent
+
+_request_count = 0
+_original_urlopen = YoutubeDL.urlopen
+
+
+def _counting_urlopen(self, req):
+    global _request_count
+    _request_count += 1
+    return _original_urlopen(self, req)
+
+
+YoutubeDL.urlopen = _counting_urlopen  # Every extractor and downloader request goes through here
+
+
+def download_twice_extracted(url: str, output_dir: str):
+    """The previous flow: extract_info for the title, then download() extracts everything again"""
+    with YoutubeDL(VideoDownloaderAgent.ytdlp_options(output_dir=output_dir, verbose=False)) as yt:
+        yt.extract_info(url, download=False)
+        yt.download([url])
+
+
+def download_once_extracted(url: str, output_dir: str):
+    result = VideoDownloaderAgent().download_video(url, output_dir=output_dir, verbose=False)
+    if result["status"] != "success":
+        raise RuntimeError(result["error"])
+
+
+def measure(download: Callable[[str, str], None], urls: List[str]) -> Dict:
+    global _request_count
+    requests, seconds = [], []
+    for url in urls:
+        output_dir = tempfile.mkdtemp(prefix="extraction-bench-")
+        try:
+            _request_count = 0
+            start = time.perf_counter()
+            download(url, output_dir)
+            seconds.append(time.perf_counter() - start)
+            requests.append(_request_count)
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+    return {"requests_per_video": statistics.mean(requests), "seconds_per_video": statistics.mean(seconds)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count requests per video before/after single extraction")
+    parser.add_argument("--url", action="append", help="Real video URL (repeatable); default: local fixtures")
+    parser.add_argument("--videos", type=int, default=5, help="Local fixture clips")
+    parser.add_argument("--size", type=int, default=1_000_000, help="Bytes per fixture clip")
+    args = parser.parse_args()
+
+    server = None
+    urls = args.url
+    if not urls:
+        server = FixtureMediaServer({f"clip{i}.mp4": make_media(args.size, seed=i) for i in range(args.videos)})
+        server.start()
+        urls = [server.url(name) for name in server.files]
+    try:
+        before = measure(download_twice_extracted, urls)
+        after = measure(download_once_extracted, urls)
+    finally:
+        if server is not None:
+            server.stop()
+
+    print(f"{len(urls)} video(s){' from the local fixture server' if server else ''}")
+    print(f"{'':<28}{'requests/video':>16}{'seconds/video':>16}")
+    for label, row in (("before (extract twice)", before), ("after (extract once)", after)):
+        print(f"{label:<28}{row['requests_per_video']:>16.1f}{row['seconds_per_video']:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
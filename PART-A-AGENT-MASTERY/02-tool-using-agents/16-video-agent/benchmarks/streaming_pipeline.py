@@ -0,0 +1,169 @@
+"""
+Disk reads for post-download processing: after the download (before) vs streamed (after)
+Downloads a locally generated multi-GB file and hashes it both ways
+
+"Before" downloads, then reads the file back once per stage, like
+running `sha256sum` and ffmpeg on the finished file. "After" feeds the
+stages from the progress hooks while the file downloads. Bytes read
+from storage come from /proc/self/io (Linux). The fixture server runs
+in a separate process, so only the downloader's reads are counted.
+
+The finished file is evicted from the page cache before the "before"
+pass (disable with --warm): that is what happens to files larger than
+free memory, and it is when the second pass actually hits the disk.
+
+Usage:
+    python benchmarks/streaming_pipeline.py --size 2G
+    python benchmarks/streaming_pipeline.py --size 4G --remux mkv
+"""
+
+import argparse
+import mmap
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fixture_server import FixtureMediaServer, make_media
+from pipeline import RemuxStage, Sha256Stage, SizeCheckStage, Stage
+from video_downloader_agent import VideoDownloaderAgent
+
+GENERATE_CHUNK = 64 * 1024 * 1024
+READ_SIZE = 1024 * 1024
+
+
+def parse_size(text: str) -> int:
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    if text[-1:].upper() in units:
+        return int(float(text[:-1]) * units[text[-1:].upper()])
+    return int(text)
+
+
+def generate_media(path: str, size: int):
+    with open(path, "wb") as f:
+        for seed, offset in enumerate(range(0, size, GENERATE_CHUNK)):
+            f.write(make_media(min(GENERATE_CHUNK, size - offset), seed=seed))
+
+
+def serve(path: str, ports: multiprocessing.Queue):
+    """Fixture server process serving `path` from an mmap (no copy in memory)"""
+    with open(path, "rb") as f:
+        media = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    server = FixtureMediaServer({"media.mp4": media}).start()
+    ports.put(server.port)
+    while True:
+        time.sleep(3600)
+
+
+def storage_read_bytes() -> int:
+    """Bytes this process has caused to be read from storage (page cache hits excluded)"""
+    with open("/proc/self/io") as f:
+        counters = dict(line.split(": ") for line in f.read().splitlines())
+    return int(counters["read_bytes"])
+
+
+def evict(path: str):
+    """Drop a file from the page cache, as if it had been pushed out by newer data"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def read_back(path: str, stages: List[Stage]) -> Dict:
+    """One read pass over the finished file per stage, as separate tools would do"""
+    results = {}
+    for stage in stages:
+        stage.open(path, {})
+        with open(path, "rb") as f:
+            while chunk := f.read(READ_SIZE):
+                stage.feed(chunk)
+        results.update(stage.close(os.path.getsize(path)))
+    return results
+
+
+def run(label: str, url: str, stage_factory: Callable[[], List[Stage]], streamed: bool, connections: int,
+        warm: bool) -> Dict:
+    output_dir = tempfile.mkdtemp(prefix="pipeline-bench-")
+    agent = VideoDownloaderAgent(connections=connections)
+    try:
+        reads_before = storage_read_bytes()
+        start = time.perf_counter()
+        result = agent.download_video(url, output_dir=output_dir, verbose=False,
+                                      pipeline=stage_factory if streamed else None)
+        if result["status"] != "success":
+            raise RuntimeError(result["error"])
+        downloaded = time.perf_counter()
+        if streamed:
+            outputs = next(iter(result["pipeline"].values()))
+            reread = outputs["bytes_after_download"]
+        else:
+            if not warm:
+                evict(result["filepath"])
+                reads_before = storage_read_bytes()  # Count only the read-back, not eviction bookkeeping
+            outputs = read_back(result["filepath"], stage_factory())
+            reread = os.path.getsize(result["filepath"]) * len(stage_factory())
+        finished = time.perf_counter()
+        return {
+            "label": label,
+            "sha256": outputs.get("sha256"),
+            "total_seconds": finished - start,
+            "post_seconds": finished - downloaded,
+            "reread_bytes": reread,
+            "storage_read_bytes": storage_read_bytes() - reads_before,
+        }
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Disk I/O of post-download processing, read-back vs streamed")
+    parser.add_argument("--size", default="2G", help="Test media size (e.g. 512M, 2G, 4G)")
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--remux", metavar="CONTAINER", help="Add an ffmpeg remux stage (needs ffmpeg)")
+    parser.add_argument("--warm", action="store_true", help="Keep the file in the page cache before reading back")
+    args = parser.parse_args()
+    size = parse_size(args.size)
+
+    def stage_factory() -> List[Stage]:
+        stages = [Sha256Stage(), SizeCheckStage()]
+        if args.remux:
+            stages.append(RemuxStage(args.remux))
+        return stages
+
+    work_dir = tempfile.mkdtemp(prefix="pipeline-media-")
+    media_path = os.path.join(work_dir, "media.mp4")
+    print(f"Generating {size / 1e9:.2f} GB of test media...")
+    generate_media(media_path, size)
+    ports = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(media_path, ports), daemon=True)
+    server.start()
+    try:
+        url = f"http://127.0.0.1:{ports.get(timeout=30)}/media.mp4"
+        rows = [run("before (read back)", url, stage_factory, False, args.connections, args.warm),
+                run("after (streamed)", url, stage_factory, True, args.connections, args.warm)]
+    finally:
+        server.terminate()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    assert rows[0]["sha256"] == rows[1]["sha256"], "both modes must hash the same bytes"
+    print(f"{size / 1e9:.2f} GB, stages: {', '.join(stage.name for stage in stage_factory())}"
+          f"{'' if args.warm else ' (file evicted from page cache before read-back)'}")
+    print(f"{'':<22}{'total s':>10}{'post s':>10}{'re-read MB':>13}{'disk read MB':>15}")
+    for row in rows:
+        print(f"{row['label']:<22}{row['total_seconds']:>10.2f}{row['post_seconds']:>10.2f}"
+              f"{row['reread_bytes'] / 1e6:>13.1f}{row['storage_read_bytes'] / 1e6:>15.1f}")
+    saved = rows[0]["storage_read_bytes"] - rows[1]["storage_read_bytes"]
+    print(f"Disk reads saved: {saved / 1e6:.1f} MB; post-download time saved: "
+          f"{rows[0]['post_seconds'] - rows[1]['post_seconds']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
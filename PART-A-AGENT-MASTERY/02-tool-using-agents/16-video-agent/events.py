@@ -0,0 +1,447 @@
+"""
+Structured progress events for the Video Downloader Agent
+Typed events for every download, as callbacks, an async iterator, or exported to a file
+
+Each `download_video` call publishes to the agent's `EventBus`:
+`DownloadStarted`, extraction start and end (again if cached links had
+to be re-extracted), progress (with fragment counts for fragmented
+downloads), retries, each post-processing step, and a final
+`DownloadCompleted` with bytes, speed, retries and the time spent per
+phase. Subscribers run on
+the thread that emitted the event (download workers, fragment threads);
+events are only built when someone is subscribed.
+
+Exporters are subscribers that write to a local file: `JsonLinesExporter`
+appends one JSON object per event, `PrometheusExporter` keeps a
+Prometheus text-format file (node_exporter's textfile collector) of
+fleet counters and gauges up to date.
+
+Usage:
+    agent.events.subscribe(print)
+    agent.events.subscribe(PrometheusExporter("metrics/video_agent.prom"))
+
+    async with agent.events.stream() as events:
+        download = asyncio.create_task(asyncio.to_thread(agent.download_video, url, verbose=False))
+        async for event in events:
+            if isinstance(event, DownloadCompleted):
+                break
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Callable, ClassVar, Dict, List, Optional
+
+PROGRESS_WRITE_INTERVAL = 1.0  # Seconds between metrics file rewrites while only progress changes
+METRIC_PREFIX = "video_agent"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Event:
+    """Base of all events: the URL being downloaded and when the event happened (Unix time)"""
+    kind: ClassVar[str] = "event"
+    url: str
+    timestamp: float = field(default_factory=time.time, kw_only=True)
+
+    def to_dict(self) -> Dict:
+        return {"event": self.kind, **asdict(self)}
+
+
+@dataclass(frozen=True)
+class DownloadStarted(Event):
+    """Once per download, before any extraction; `DownloadCompleted` always follows"""
+    kind: ClassVar[str] = "download_started"
+
+
+@dataclass(frozen=True)
+class ExtractStarted(Event):
+    kind: ClassVar[str] = "extract_started"
+
+
+@dataclass(frozen=True)
+class ExtractFinished(Event):
+    kind: ClassVar[str] = "extract_finished"
+    title: Optional[str]
+    video_id: Optional[str]
+    cached: bool  # Served from the metadata cache
+    seconds: float
+
+
+@dataclass(frozen=True)
+class DownloadProgress(Event):
+    kind: ClassVar[str] = "download_progress"
+    filename: str
+    downloaded_bytes: int
+    total_bytes: Optional[int]
+    speed: Optional[float]  # Bytes per second
+    eta: Optional[float]
+    fragment_index: Optional[int]  # Fragments finished (fragmented downloads only)
+    fragment_count: Optional[int]
+
+
+@dataclass(frozen=True)
+class Retry(Event):
+    kind: ClassVar[str] = "retry"
+    error: str
+    attempt: int
+    retries: Optional[int]  # Allowed retries; None when unlimited
+    fragment_index: Optional[int]
+    downloader: str
+
+
+@dataclass(frozen=True)
+class PostprocessStarted(Event):
+    kind: ClassVar[str] = "postprocess_started"
+    postprocessor: str  # yt-dlp post-processor name, or "pipeline" for the streaming stages
+
+
+@dataclass(frozen=True)
+class PostprocessFinished(Event):
+    kind: ClassVar[str] = "postprocess_finished"
+    postprocessor: str
+    seconds: float
+
+
+@dataclass(frozen=True)
+class DownloadCompleted(Event):
+    kind: ClassVar[str] = "download_completed"
+    status: str  # success, skipped or error
+    title: Optional[str]
+    filepath: Optional[str]
+    downloaded_bytes: int
+    speed: Optional[float]  # Average over the download phase
+    elapsed: float
+    retries: int
+    timings: Dict[str, float]  # Seconds per phase: extract, download, postprocess
+    error: Optional[str] = None
+
+
+class EventBus:
+    """
+    Fans events out to subscribers.
+
+    `subscribe()` takes any callable and returns it (usable as a
+    decorator); `stream()` returns an async iterator for asyncio code.
+    A subscriber that raises (say, an exporter on a full disk) misses
+    that event and nothing else: the download and the other subscribers
+    carry on. `dropped` counts such events; each failing subscriber is
+    logged once.
+    """
+
+    def __init__(self):
+        self.dropped = 0
+        self._subscribers: List[Callable[[Event], None]] = []
+        self._failed = set()  # Subscribers already logged as failing
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self, callback: Callable[[Event], None]) -> Callable[[Event], None]:
+        with self._lock:
+            self._subscribers = [*self._subscribers, callback]
+        return callback
+
+    def unsubscribe(self, callback: Callable[[Event], None]):
+        with self._lock:
+            self._subscribers = [subscriber for subscriber in self._subscribers if subscriber is not callback]
+
+    def emit(self, event: Event):
+        for subscriber in self._subscribers:  # Copy-on-write list: safe to iterate without the lock
+            try:
+                subscriber(event)
+            except Exception:
+                with self._lock:
+                    self.dropped += 1
+                    first = subscriber not in self._failed
+                    self._failed.add(subscriber)
+                if first:
+                    logger.exception("Event subscriber %r failed on %s; its events are dropped",
+                                     subscriber, event.kind)
+
+    def stream(self, maxsize: int = 0) -> "EventStream":
+        """Async iterator over events emitted from now on; call from a running event loop"""
+        import asyncio  # Only asyncio callers pay for the import (keeps --help fast)
+
+        return EventStream(self, asyncio.get_running_loop(), maxsize)
+
+
+class EventStream:
+    """
+    Async iterator of a bus's events, handed over from download threads to an event loop.
+
+    Iteration ends after `close()` (also on leaving `async with`). With a
+    `maxsize`, events arriving while the queue is full are dropped rather
+    than blocking the download; `dropped` counts them.
+    """
+
+    _CLOSED = object()
+
+    def __init__(self, bus: EventBus, loop: "asyncio.AbstractEventLoop", maxsize: int = 0):
+        import asyncio
+
+        self.bus = bus
+        self.dropped = 0
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize)
+        bus.subscribe(self._push)
+
+    def _push(self, event):
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            self.bus.unsubscribe(self._push)  # Event loop closed
+
+    def _put(self, event):
+        if self._queue.full():
+            if event is not self._CLOSED:
+                self.dropped += 1
+                return
+            self._queue.get_nowait()  # Make room for the end marker
+            self.dropped += 1
+        self._queue.put_nowait(event)
+
+    def close(self):
+        self.bus.unsubscribe(self._push)
+        self._push(self._CLOSED)
+
+    def __aiter__(self) -> "EventStream":
+        return self
+
+    async def __anext__(self) -> Event:
+        event = await self._queue.get()
+        if event is self._CLOSED:
+            raise StopAsyncIteration
+        return event
+
+    async def __aenter__(self) -> "EventStream":
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+
+class DownloadMonitor:
+    """
+    One download's yt-dlp hooks turned into events, plus its timings.
+
+    `download_video` registers `progress_hook`, `postprocessor_hook` and
+    `retry_hook`, times its phases with `phase()`, and passes its result
+    through `complete()`, which adds bytes, speed and timings and emits
+    `DownloadCompleted` (once, even if called again on an error path).
+    Creating it emits `DownloadStarted`.
+    """
+
+    def __init__(self, bus: EventBus, url: str):
+        self.bus = bus
+        self.url = url
+        self.timings: Dict[str, float] = {}
+        self.retries = 0
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._files: Dict[str, int] = {}  # Bytes of each finished file
+        self._postprocessors: Dict[str, float] = {}  # Start time of running post-processors
+        self._postprocess_in_download = 0.0  # yt-dlp post-processing inside the download phase
+        self._completed = False
+        self._emit(DownloadStarted)
+
+    def _emit(self, event_type, **fields):
+        if self.bus.active:
+            self.bus.emit(event_type(url=self.url, **fields))
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def extract_started(self):
+        self._emit(ExtractStarted)
+
+    def extract_finished(self, info: Optional[Dict], cached: bool):
+        info = info or {}
+        self._emit(ExtractFinished, title=info.get("title"), video_id=info.get("id"), cached=cached,
+                   seconds=self.timings.get("extract", 0.0))
+
+    @contextmanager
+    def postprocessing(self, name: str):
+        """Time post-processing done outside yt-dlp (e.g. waiting for pipeline stages)"""
+        self._emit(PostprocessStarted, postprocessor=name)
+        start = time.perf_counter()
+        try:
+            with self.phase("postprocess"):
+                yield
+        finally:
+            self._emit(PostprocessFinished, postprocessor=name, seconds=time.perf_counter() - start)
+
+    def progress_hook(self, status: Dict):
+        filename = status.get("filename")
+        if status.get("status") == "finished" and filename:
+            self._files[filename] = status.get("total_bytes") or status.get("downloaded_bytes") or 0
+        elif status.get("status") == "downloading" and self.bus.active:
+            self._emit(DownloadProgress, filename=filename, downloaded_bytes=status.get("downloaded_bytes") or 0,
+                       total_bytes=status.get("total_bytes") or status.get("total_bytes_estimate"),
+                       speed=status.get("speed"), eta=status.get("eta"),
+                       fragment_index=status.get("fragment_index"), fragment_count=status.get("fragment_count"))
+
+    def postprocessor_hook(self, status: Dict):
+        name = status.get("postprocessor") or "postprocessor"
+        if status.get("status") == "started":
+            self._postprocessors[name] = time.perf_counter()
+            self._emit(PostprocessStarted, postprocessor=name)
+        elif status.get("status") == "finished":
+            seconds = time.perf_counter() - self._postprocessors.pop(name, time.perf_counter())
+            self._postprocess_in_download += seconds
+            self._emit(PostprocessFinished, postprocessor=name, seconds=seconds)
+
+    def retry_hook(self, retry: Dict):
+        with self._lock:
+            self.retries += 1
+        self._emit(Retry, error=retry["error"], attempt=retry["attempt"], retries=retry["retries"],
+                   fragment_index=retry["fragment_index"], downloader=retry["downloader"])
+
+    def complete(self, result: Dict) -> Dict:
+        """Add `downloaded_bytes`, `speed`, `elapsed` and `timings` to a result and emit `DownloadCompleted`"""
+        elapsed = round(time.perf_counter() - self._start, 3)
+        download = max(self.timings.get("download", 0.0) - self._postprocess_in_download, 0.0)
+        timings = {"extract": round(self.timings.get("extract", 0.0), 3),
+                   "download": round(download, 3),
+                   "postprocess": round(self.timings.get("postprocess", 0.0) + self._postprocess_in_download, 3)}
+        downloaded = sum(self._files.values())
+        speed = round(downloaded / download) if downloaded and download > 0 else None
+        result.setdefault("retries", self.retries)
+        result.update({"downloaded_bytes": downloaded, "speed": speed, "elapsed": elapsed, "timings": timings})
+        if self._completed:
+            return result
+        self._completed = True
+        self._emit(DownloadCompleted, status=result["status"], title=result.get("title"),
+                   filepath=result.get("filepath"), downloaded_bytes=downloaded, speed=speed, elapsed=elapsed,
+                   retries=result["retries"], timings=timings, error=result.get("error"))
+        return result
+
+
+class JsonLinesExporter:
+    """Subscriber appending each event to a file as one JSON object per line"""
+
+    def __init__(self, path: str, progress: bool = True):
+        """`progress=False` leaves out `DownloadProgress` events (the bulk of the stream)"""
+        self.path = path
+        self.progress = progress
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __call__(self, event: Event):
+        if not self.progress and isinstance(event, DownloadProgress):
+            return
+        line = json.dumps(event.to_dict(), ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class PrometheusExporter:
+    """
+    Subscriber keeping fleet metrics in a Prometheus text-format file.
+
+    The file is rewritten atomically (write, then rename) on every event
+    except progress, which rewrites it at most once per
+    `PROGRESS_WRITE_INTERVAL`; point node_exporter's textfile collector at
+    its directory.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._downloads = Counter()  # By status
+        self._extractions = Counter()  # By cached/extracted
+        self._phase_seconds = Counter()
+        self._bytes = 0
+        self._retries = 0
+        self._active = Counter()  # Downloads in flight, by URL
+        self._speeds: Dict[str, float] = {}  # Latest speed of each download in flight
+        self._written = 0.0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.write()
+
+    def __call__(self, event: Event):
+        with self._lock:
+            if isinstance(event, DownloadStarted):
+                self._active[event.url] += 1
+            elif isinstance(event, ExtractFinished):
+                self._extractions["true" if event.cached else "false"] += 1
+            elif isinstance(event, DownloadProgress):
+                self._speeds[event.url] = event.speed or 0.0
+                if time.monotonic() - self._written < PROGRESS_WRITE_INTERVAL:
+                    return
+            elif isinstance(event, Retry):
+                self._retries += 1
+            elif isinstance(event, DownloadCompleted):
+                self._downloads[event.status] += 1
+                self._bytes += event.downloaded_bytes
+                self._phase_seconds.update(event.timings)
+                self._active[event.url] -= 1
+                if self._active[event.url] <= 0:
+                    del self._active[event.url]
+                    self._speeds.pop(event.url, None)
+        self.write()
+
+    def render(self) -> str:
+        p = METRIC_PREFIX
+        lines = [
+            f"# HELP {p}_downloads_total Finished downloads by status.",
+            f"# TYPE {p}_downloads_total counter",
+            *(f'{p}_downloads_total{{status="{status}"}} {count}'
+              for status, count in sorted(self._downloads.items())),
+            f"# HELP {p}_extractions_total Metadata extractions, by whether the cache served them.",
+            f"# TYPE {p}_extractions_total counter",
+            *(f'{p}_extractions_total{{cached="{cached}"}} {count}'
+              for cached, count in sorted(self._extractions.items())),
+            f"# HELP {p}_downloaded_bytes_total Bytes of finished downloads.",
+            f"# TYPE {p}_downloaded_bytes_total counter",
+            f"{p}_downloaded_bytes_total {self._bytes}",
+            f"# HELP {p}_retries_total Download retries (HTTP requests and fragments).",
+            f"# TYPE {p}_retries_total counter",
+            f"{p}_retries_total {self._retries}",
+            f"# HELP {p}_phase_seconds_total Time spent per download phase.",
+            f"# TYPE {p}_phase_seconds_total counter",
+            *(f'{p}_phase_seconds_total{{phase="{phase}"}} {seconds:.3f}'
+              for phase, seconds in sorted(self._phase_seconds.items())),
+            f"# HELP {p}_active_downloads Downloads in progress.",
+            f"# TYPE {p}_active_downloads gauge",
+            f"{p}_active_downloads {sum(self._active.values())}",
+            f"# HELP {p}_download_speed_bytes Current total download speed in bytes per second.",
+            f"# TYPE {p}_download_speed_bytes gauge",
+            f"{p}_download_speed_bytes {sum(self._speeds.values()):.0f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write(self):
+        with self._lock:
+            text = self.render()
+            temp = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(temp, self.path)
+            self._written = time.monotonic()
+
+    def close(self):
+        self.write()
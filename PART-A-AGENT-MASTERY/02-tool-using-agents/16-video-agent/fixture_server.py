@@ -0,0 +1,186 @@
+"""
+Local media server for testing the Video Downloader Agent
+Serves in-memory fixture files over HTTP with Range support and optional throttling
+
+yt-dlp treats a direct media URL like any other video (generic extractor),
+so batch, resume and caching behaviour can be tested without YouTube or
+network access.
+
+Usage:
+    with FixtureMediaServer({"clip.mp4": make_media(1_000_000)}) as server:
+        agent.download_video(server.url("clip.mp4"))
+"""
+
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+CHUNK_SIZE = 64 * 1024
+CONTENT_TYPES = {".mp4": "video/mp4", ".webm": "video/webm", ".m4a": "audio/mp4", ".mp3": "audio/mpeg"}
+
+_RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+def make_media(size: int, seed: int = 0) -> bytes:
+    """Deterministic pseudo-random bytes standing in for a media file"""
+    return random.Random(seed).randbytes(size)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "FixtureMedia/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Keep test output clean
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def _respond(self, send_body: bool):
+        fixture: "FixtureMediaServer" = self.server.fixture
+        name = self.path.split("?", 1)[0].lstrip("/")
+        range_header = self.headers.get("Range")
+        fixture.record(self.command, name, range_header, self.headers.get("Host", ""))
+        data = fixture.files.get(name)
+        if data is None:
+            self.send_error(404)
+            return
+        if range_header and fixture.take_failure(name):
+            self.send_error(503)
+            return
+
+        start, end, status = 0, len(data) - 1, 200
+        match = _RANGE_PATTERN.match(range_header or "")
+        if match and fixture.ranges and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), end) if match.group(2) else end
+            else:
+                start = max(len(data) - int(match.group(2)), 0)  # Suffix range: last N bytes
+            if start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = 206
+
+        self.send_response(status)
+        suffix = name[name.rfind("."):] if "." in name else ""
+        self.send_header("Content-Type", CONTENT_TYPES.get(suffix, "application/octet-stream"))
+        self.send_header("Content-Length", str(end - start + 1))
+        if fixture.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        self.end_headers()
+        if send_body:
+            self._send_body(memoryview(data)[start:end + 1], fixture.rate)
+
+    def _send_body(self, body: memoryview, rate: Optional[float]):
+        try:
+            for offset in range(0, len(body), CHUNK_SIZE):
+                chunk = body[offset:offset + CHUNK_SIZE]
+                self.wfile.write(chunk)
+                if rate:
+                    time.sleep(len(chunk) / rate)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client went away mid-transfer (cancelled or killed download)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)  # Clients hanging up is expected
+
+
+class FixtureMediaServer:
+    """
+    Threaded HTTP/1.1 server for fixture media on a background thread.
+
+    `rate` throttles each response to that many bytes per second, so
+    transfers last long enough to observe concurrency or interrupt them.
+    Every request is logged in `requests` (method, path, Range header,
+    Host header) for assertions; set `ranges=False` to emulate a server
+    without byte-range support. `failures[name] = n` answers the next n
+    range requests for a file with 503, to exercise retries.
+    """
+
+    def __init__(self, files: Optional[Dict[str, bytes]] = None, host: str = "127.0.0.1", port: int = 0,
+                 rate: Optional[float] = None, ranges: bool = True):
+        self.files: Dict[str, bytes] = dict(files or {})
+        self.host = host
+        self.rate = rate
+        self.ranges = ranges
+        self.requests: List[Dict] = []
+        self.failures: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._httpd = _Server((host, port), _Handler)
+        self._httpd.fixture = self
+        self.port = self._httpd.server_address[1]
+        self._thread: Optional[threading.Thread] = None
+
+    def url(self, name: str, host: Optional[str] = None) -> str:
+        """URL of a fixture; pass host="localhost" to reach the same server under another host name"""
+        return f"http://{host or self.host}:{self.port}/{name}"
+
+    def record(self, method: str, path: str, range_header: Optional[str], host: str):
+        with self._lock:
+            self.requests.append({"method": method, "path": path, "range": range_header, "host": host})
+
+    def take_failure(self, name: str) -> bool:
+        with self._lock:
+            if self.failures.get(name, 0) <= 0:
+                return False
+            self.failures[name] -= 1
+            return True
+
+    def requests_for(self, name: str) -> List[Dict]:
+        with self._lock:
+            return [request for request in self.requests if request["path"] == name]
+
+    def start(self) -> "FixtureMediaServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fixture-media", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FixtureMediaServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve generated fixture media for manual testing")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--files", type=int, default=5, help="Number of fixture clips")
+    parser.add_argument("--size", type=int, default=2_000_000, help="Bytes per clip")
+    parser.add_argument("--rate", type=float, help="Bytes per second per response")
+    args = parser.parse_args()
+
+    server = FixtureMediaServer({f"clip{i}.mp4": make_media(args.size, seed=i) for i in range(args.files)},
+                                port=args.port, rate=args.rate)
+    for name in server.files:
+        print(server.url(name))
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
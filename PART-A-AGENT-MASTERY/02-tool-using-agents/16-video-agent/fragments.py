@@ -0,0 +1,459 @@
+"""
+Resumable, range-parallel downloads for the Video Downloader Agent
+Fetches plain HTTP(S) media as byte-range fragments over several connections
+
+Fragments are written in place into the `.part` file, and a small JSON
+sidecar (`<file>.part.fragments`) records how many bytes of each are on
+disk, so an interrupted download, even a killed process, resumes with
+only the missing ranges. A `.part` left by yt-dlp's own downloader
+counts as a finished prefix. Servers without range support and
+non-HTTP protocols (HLS, DASH, ...) go to yt-dlp's regular downloaders,
+which still resume `.part` files sequentially.
+
+Usage:
+    with RangeYoutubeDL(opts, connections=4) as yt:
+        yt.process_ie_result(info, download=True)
+"""
+
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, Mapping, Optional, Sequence, Tuple, TypeVar
+
+from yt_dlp import YoutubeDL
+from yt_dlp.downloader import get_suitable_downloader
+from yt_dlp.downloader.common import FileDownloader
+from yt_dlp.downloader.http import HttpFD
+from yt_dlp.networking import Request
+from yt_dlp.networking.exceptions import HTTPError, TransportError
+from yt_dlp.utils import NO_DEFAULT
+
+T = TypeVar("T")
+
+DEFAULT_FRAGMENT_SIZE = 1024 * 1024  # When the file size is unknown before the first response
+MIN_FRAGMENT_SIZE = 256 * 1024
+MAX_FRAGMENT_SIZE = 10 * 1024 * 1024  # YouTube throttles ranges larger than ~10 MB
+FRAGMENTS_PER_CONNECTION = 4  # Smaller fragments even out slow connections; larger ones cut request overhead
+READ_SIZE = 64 * 1024
+SAVE_INTERVAL = 0.5  # Seconds between sidecar writes while fragments are in flight
+PROGRESS_INTERVAL = 0.25  # Seconds between progress hook calls
+SIDECAR_SUFFIX = ".fragments"
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Up to `retries` retries with full-jitter exponential backoff"""
+    retries: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+    @classmethod
+    def from_options(cls, params: Mapping, key: str) -> "RetryPolicy":
+        """Policy from a yt-dlp retry option (`fragment_retries`, `extractor_retries`, ...)"""
+        retries = params.get(key)
+        if retries is None:
+            return cls()
+        return cls(retries=int(min(retries, 1_000_000)))  # yt-dlp spells "infinite" as float("inf")
+
+    def delay(self, retry: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Dropped connections, short reads, timeouts, throttling and server errors"""
+    if isinstance(error, HTTPError):
+        return error.status in RETRYABLE_STATUS_CODES
+    return isinstance(error, (TransportError, ConnectionError, TimeoutError))
+
+
+def fragment_size_for(expected_size: Optional[int], connections: int, chunk_size: Optional[int] = None) -> int:
+    """Fragment size: `http_chunk_size` if set, else ~FRAGMENTS_PER_CONNECTION fragments per connection"""
+    if chunk_size:
+        return int(chunk_size)
+    if not expected_size:
+        return DEFAULT_FRAGMENT_SIZE
+    return max(MIN_FRAGMENT_SIZE, min(MAX_FRAGMENT_SIZE, expected_size // (connections * FRAGMENTS_PER_CONNECTION)))
+
+
+class FragmentState:
+    """
+    Bytes written per fragment of one `.part` file, persisted in its sidecar.
+
+    Data is always written before progress is recorded, so after a crash
+    the sidecar never claims bytes that are not on disk.
+    """
+
+    def __init__(self, part_path: str, size: int, fragment_size: int, written: Optional[Dict[int, int]] = None):
+        self.part_path = part_path
+        self.size = size
+        self.fragment_size = fragment_size
+        self.written: Dict[int, int] = dict(written or {})
+        self.count = -(-size // fragment_size)
+        self._lock = threading.Lock()
+        self._saved_at = 0.0
+
+    @property
+    def sidecar_path(self) -> str:
+        return self.part_path + SIDECAR_SUFFIX
+
+    @classmethod
+    def load(cls, part_path: str) -> Optional["FragmentState"]:
+        """The saved state, unless the `.part` it describes is gone or was replaced (wrong size)"""
+        try:
+            with open(part_path + SIDECAR_SUFFIX, encoding="utf-8") as f:
+                data = json.load(f)
+            written = {int(index): int(done) for index, done in data["written"].items()}
+            state = cls(part_path, int(data["size"]), int(data["fragment_size"]), written)
+            if os.path.getsize(part_path) != state.size:
+                return None  # The download preallocates the full size before writing anything
+            return state
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @classmethod
+    def from_prefix(cls, part_path: str, size: int, fragment_size: int, prefix: int) -> "FragmentState":
+        """State for a `.part` whose first `prefix` bytes are valid (written sequentially)"""
+        state = cls(part_path, size, fragment_size)
+        for index in range(state.count):
+            start, end = state.span(index)
+            state.written[index] = max(0, min(prefix - start, end - start + 1))
+        return state
+
+    def span(self, index: int) -> Tuple[int, int]:
+        """Inclusive byte range of a fragment"""
+        start = index * self.fragment_size
+        return start, min(start + self.fragment_size, self.size) - 1
+
+    def remaining(self, index: int) -> Tuple[int, int]:
+        """Inclusive byte range still to fetch for a fragment (empty when start > end)"""
+        start, end = self.span(index)
+        return start + self.written.get(index, 0), end
+
+    def is_done(self, index: int) -> bool:
+        start, end = self.remaining(index)
+        return start > end
+
+    @property
+    def downloaded_bytes(self) -> int:
+        return sum(self.written.values())
+
+    @property
+    def contiguous_bytes(self) -> int:
+        """Length of the prefix of the file that is fully on disk"""
+        total = 0
+        for index in range(self.count):
+            start, end = self.span(index)
+            written = self.written.get(index, 0)
+            total += written
+            if written < end - start + 1:
+                break
+        return total
+
+    def record(self, index: int, written: int, force: bool = False):
+        """Note `written` bytes of a fragment on disk; saved at most every SAVE_INTERVAL unless forced"""
+        with self._lock:
+            self.written[index] = written
+            now = time.monotonic()
+            if force or now - self._saved_at >= SAVE_INTERVAL:
+                self._saved_at = now
+                self._save()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        data = {"size": self.size, "fragment_size": self.fragment_size,
+                "written": {str(index): done for index, done in self.written.items() if done}}
+        tmp_path = self.sidecar_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.sidecar_path)
+
+    def remove(self):
+        try:
+            os.remove(self.sidecar_path)
+        except FileNotFoundError:
+            pass
+
+
+class RangeFragmentFD(FileDownloader):
+    """
+    yt-dlp file downloader fetching byte-range fragments on `connections` threads.
+
+    The first range request doubles as the probe: it returns the total
+    size (Content-Range) and fragment data, so small files cost no extra
+    request. When resuming, it must report the size in the sidecar, or
+    the `.part` is discarded and the download starts over.
+    `fragment_retries` drives the per-fragment retry policy and
+    `extractor_retries` the probe's.
+    """
+
+    FD_NAME = "rangefragments"
+
+    def __init__(self, ydl, params, connections: int):
+        super().__init__(ydl, params)
+        self.connections = connections
+        self.fragment_retry = RetryPolicy.from_options(params, "fragment_retries")
+        self.probe_retry = RetryPolicy.from_options(params, "extractor_retries")
+        self.retries = 0
+        self._lock = threading.Lock()
+        self._abort = threading.Event()
+
+    def _request(self, info_dict: Dict, start: int, end: int):
+        headers = dict(info_dict.get("http_headers") or {})
+        headers["Range"] = f"bytes={start}-{end}"
+        return self.ydl.urlopen(Request(info_dict["url"], headers=headers))
+
+    def _with_retries(self, policy: RetryPolicy, fn: Callable[[], T], frag_index=None) -> T:
+        for retry in itertools.count():
+            try:
+                return fn()
+            except Exception as e:
+                if self._abort.is_set() or not is_retryable(e) or retry >= policy.retries:
+                    raise
+                with self._lock:
+                    self.retries += 1
+                self.report_retry(e, retry + 1, policy.retries, frag_index=frag_index)
+                time.sleep(policy.delay(retry))
+
+    def _fallback(self, filename: str, info_dict: Dict):
+        """Sequential download with yt-dlp's HTTP downloader (resumes its own `.part`)"""
+        fd = HttpFD(self.ydl, self.params)
+        fd.report_retry = self.report_retry  # Retries still reach RangeYoutubeDL's retry hooks
+        for hook in self._progress_hooks:
+            fd.add_progress_hook(hook)
+        return fd.real_download(filename, info_dict)
+
+    def _probe(self, info_dict: Dict, start: int, end: int) -> Optional[Tuple[object, int]]:
+        """(open 206 response, total size from Content-Range), or None without range support"""
+        def probe():
+            response = self._request(info_dict, start, end)
+            content_range = response.headers.get("Content-Range", "")
+            total = content_range.rpartition("/")[2]
+            if response.status != 206 or not total.isdigit():
+                response.close()
+                return None
+            return response, int(total)
+
+        try:
+            return self._with_retries(self.probe_retry, probe)
+        except HTTPError:
+            return None  # e.g. 416 for a finished prefix: the regular downloader handles it
+
+    def _open_state(self, tmpfilename: str, info_dict: Dict):
+        """Existing fragment state, or a new one from the first range response (None: no range support)"""
+        state = FragmentState.load(tmpfilename)
+        if state is not None:
+            pending = [index for index in range(state.count) if not state.is_done(index)]
+            if not pending:
+                return state, None
+            probed = self._probe(info_dict, *state.remaining(pending[0]))
+            if probed is not None and probed[1] == state.size:
+                return state, (pending[0], probed[0])
+            # The remote file changed size (or lost range support): the bytes on disk are not its bytes
+            if probed is not None:
+                probed[0].close()
+            state.remove()
+            os.remove(tmpfilename)
+        expected = info_dict.get("filesize") or info_dict.get("filesize_approx")
+        fragment_size = fragment_size_for(expected, self.connections, self.params.get("http_chunk_size"))
+        prefix = os.path.getsize(tmpfilename) if os.path.isfile(tmpfilename) else 0
+        lead_index = prefix // fragment_size
+        lead_start = lead_index * fragment_size
+        probed = self._probe(info_dict, prefix, lead_start + fragment_size - 1)
+        if probed is None:
+            return None, None
+        response, size = probed
+        state = FragmentState.from_prefix(tmpfilename, size, fragment_size, prefix)
+        return state, (lead_index, response)
+
+    def real_download(self, filename: str, info_dict: Dict) -> bool:
+        tmpfilename = self.temp_name(filename)
+        state, lead = self._open_state(tmpfilename, info_dict)
+        if state is None:
+            return self._fallback(filename, info_dict)
+
+        self.report_destination(filename)
+        state.save()  # Before any data lands, so a kill always leaves a usable sidecar
+        fd = os.open(tmpfilename, os.O_RDWR | os.O_CREAT, 0o644)
+        self._progress = {"start": time.time(), "resumed": state.downloaded_bytes, "last": 0.0,
+                          "filename": filename}
+        try:
+            os.ftruncate(fd, state.size)
+            pending = [index for index in range(state.count) if not state.is_done(index)]
+            if pending:
+                with ThreadPoolExecutor(max_workers=min(self.connections, len(pending)),
+                                        thread_name_prefix="fragment") as pool:
+                    futures = [pool.submit(self._download_fragment, fd, info_dict, state, index,
+                                           lead[1] if lead and lead[0] == index else None)
+                               for index in pending]
+                    done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+                    failed = [future for future in done if future.exception() is not None]
+                    if failed:
+                        self._abort.set()  # Stop the other fragments; progress so far stays resumable
+                        for future in futures:
+                            future.cancel()
+                        raise failed[0].exception()
+            os.fsync(fd)
+        except Exception as e:
+            state.save()
+            if lead is not None:
+                lead[1].close()
+            self.report_error(f"fragment download failed: {e}")
+            return False
+        finally:
+            os.close(fd)
+
+        state.remove()
+        self.try_rename(tmpfilename, filename)
+        self._hook_progress({
+            "downloaded_bytes": state.size,
+            "total_bytes": state.size,
+            "filename": filename,
+            "status": "finished",
+            "elapsed": time.time() - self._progress["start"],
+        }, info_dict)
+        return True
+
+    def _download_fragment(self, fd: int, info_dict: Dict, state: FragmentState, index: int, response=None):
+        frag_start = state.span(index)[0]
+        lead_response = [response]  # The probe response serves the first attempt only
+
+        def fetch():
+            start, end = state.remaining(index)
+            response = lead_response.pop() if lead_response and lead_response[0] is not None else None
+            if response is None:
+                response = self._request(info_dict, start, end)
+                if response.status != 206:
+                    response.close()
+                    raise TransportError(f"server ignored the range request for fragment {index}")
+            offset = start
+            try:
+                while offset <= end:
+                    if self._abort.is_set():
+                        raise TransportError("download aborted")
+                    chunk = response.read(min(READ_SIZE, end - offset + 1))
+                    if not chunk:
+                        raise TransportError(f"fragment {index} ended {end - offset + 1} bytes early")
+                    os.pwrite(fd, chunk, offset)
+                    offset += len(chunk)
+                    state.record(index, offset - frag_start)
+                    self._report_progress(state, info_dict)
+            finally:
+                response.close()
+            state.record(index, offset - frag_start, force=True)
+
+        self._with_retries(self.fragment_retry, fetch, frag_index=index + 1)
+
+    def _report_progress(self, state: FragmentState, info_dict: Dict):
+        now = time.time()
+        with self._lock:
+            if now - self._progress["last"] < PROGRESS_INTERVAL:
+                return
+            self._progress["last"] = now
+        downloaded = state.downloaded_bytes
+        speed = self.calc_speed(self._progress["start"], now, downloaded - self._progress["resumed"])
+        self._hook_progress({
+            "status": "downloading",
+            "downloaded_bytes": downloaded,
+            "total_bytes": state.size,
+            "filename": self._progress["filename"],
+            "tmpfilename": state.part_path,
+            "elapsed": now - self._progress["start"],
+            "speed": speed,
+            "eta": self.calc_eta(speed, state.size - downloaded),
+            "fragment_index": sum(map(state.is_done, range(state.count))),  # Finished, as yt-dlp counts them
+            "fragment_count": state.count,
+            "contiguous_bytes": state.contiguous_bytes,  # For consumers reading the file in order
+        }, info_dict)
+
+
+class RangeYoutubeDL(YoutubeDL):
+    """
+    YoutubeDL that sends plain HTTP(S) downloads to `RangeFragmentFD`.
+
+    Everything else (extraction, format selection, other protocols,
+    post-processing, archive recording) is yt-dlp's own. `retries` counts
+    the retries made so far by any downloader (range fragments and probes,
+    yt-dlp's HTTP and fragment downloaders).
+
+    `limiters` are rate limiters (anything with `consume(nbytes)`, e.g.
+    `scheduler.TokenBucket`) charged for every byte read from any
+    response, so every downloader and the extractor are throttled alike.
+    """
+
+    def __init__(self, params: Optional[Dict] = None, connections: int = 1, limiters: Sequence = (), **kwargs):
+        super().__init__(params, **kwargs)
+        self.connections = connections
+        self.limiters = list(limiters)
+        self.retries = 0
+        self._retry_hooks = []
+        self._retry_lock = threading.Lock()
+
+    def urlopen(self, req):
+        response = super().urlopen(req)
+        if self.limiters:
+            read = response.read
+
+            def throttled_read(*args, **kwargs):
+                data = read(*args, **kwargs)
+                for limiter in self.limiters:
+                    limiter.consume(len(data))
+                return data
+
+            response.read = throttled_read
+        return response
+
+    def add_retry_hook(self, hook: Callable[[Dict], None]):
+        """
+        Call `hook` on every download retry, from any downloader.
+
+        It gets {"error", "attempt", "retries", "fragment_index",
+        "downloader", "info_dict"}; `retries` is None when unlimited.
+        """
+        self._retry_hooks.append(hook)
+
+    def _count_retries(self, fd: FileDownloader, info: Dict):
+        """Wrap a downloader's `report_retry`, which yt-dlp's downloaders and ours call before each retry"""
+        report_retry = fd.report_retry
+
+        def counted(err, count, retries, frag_index=NO_DEFAULT, fatal=True):
+            if count <= retries:  # Otherwise this reports giving up, not a retry
+                with self._retry_lock:
+                    self.retries += 1
+                for hook in self._retry_hooks:
+                    hook({
+                        "error": str(err),
+                        "attempt": count,
+                        "retries": None if retries == float("inf") else retries,
+                        "fragment_index": None if frag_index is NO_DEFAULT else frag_index,
+                        "downloader": fd.FD_NAME,
+                        "info_dict": info,
+                    })
+            return report_retry(err, count, retries, frag_index=frag_index, fatal=fatal)
+
+        fd.report_retry = counted
+
+    def dl(self, name, info, subtitle=False, test=False):
+        if test or subtitle or name == "-" or not info.get("url"):
+            return super().dl(name, info, subtitle, test)
+        fd_class = get_suitable_downloader(info, self.params)
+        if self.connections >= 2 and fd_class is HttpFD:
+            fd = RangeFragmentFD(self, self.params, self.connections)
+        else:
+            fd = fd_class(self, self.params)
+        self._count_retries(fd, info)
+        for hook in self._progress_hooks:
+            fd.add_progress_hook(hook)
+        self.write_debug(f'Invoking {fd.FD_NAME} downloader on "{info["url"]}"')
+        new_info = self._copy_infodict(info)
+        if new_info.get("http_headers") is None:
+            new_info["http_headers"] = self._calc_headers(new_info)
+        return fd.download(name, new_info, subtitle)
@@ -0,0 +1,236 @@
+"""
+Metadata cache for the Video Downloader Agent
+Keeps `extract_info` results in SQLite, keyed by canonical video ID, with a TTL
+
+Entries are keyed like the download archive ("<extractor> <video id>"),
+so `https://youtu.be/ID` and `https://www.youtube.com/watch?v=ID` share
+one row; every URL seen is also stored as an alias, so repeat lookups
+never touch yt-dlp. Info dicts are stored as zlib-compressed JSON.
+
+Within the TTL, titles, durations and format selection come from the
+cache without network access. Downloads also need live stream links:
+signed URLs carry an expiry (YouTube's `expire=` or `/expire/`, S3's
+`X-Amz-Expires`, Akamai's `exp=`), and a cached entry whose links have
+expired is re-extracted before downloading. Links can still die early
+or expire in a form not recognised here, so the agent also re-extracts
+once when a download from cached links fails.
+
+Usage:
+    cache = MetadataCache("downloads/.metadata.sqlite", ttl=24 * 3600)
+    entry = cache.get(url)  # None when missing or older than the TTL
+    cache.put(url, info)
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_TTL = 24 * 3600  # Seconds before cached metadata is extracted again
+EXPIRY_MARGIN = 10 * 60  # Treat stream links as expired this long before their deadline
+EXPIRY_PARAMS = ("expire", "expires", "Expires", "exp")  # Query parameters holding a Unix deadline
+_PATH_EXPIRY = re.compile(r"/expire/(\d+)(?:/|$)")  # YouTube HLS/DASH manifests
+_TOKEN_EXPIRY = re.compile(r"(?:^|[~!])exp=(\d+)")  # Akamai tokens (hdnts=exp=...~acl=...~hmac=...)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    key TEXT PRIMARY KEY,
+    title TEXT,
+    extracted_at REAL NOT NULL,
+    links_expire_at REAL,
+    downloadable INTEGER NOT NULL,
+    info BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS urls_by_key ON urls (key);
+"""
+
+
+def canonical_key(url: str) -> Optional[str]:
+    """
+    "<extractor> <video id>" for a URL, when the ID is in the URL itself.
+
+    Same check yt-dlp makes against its download archive before
+    extracting; None for URLs (e.g. direct media links) whose ID is only
+    known after extraction.
+    """
+    from yt_dlp.extractor import gen_extractor_classes
+    from yt_dlp.utils import make_archive_id
+
+    for ie in gen_extractor_classes():
+        if ie.suitable(url):
+            temp_id = ie.get_temp_id(url)
+            return make_archive_id(ie.ie_key(), temp_id) if temp_id else None
+    return None
+
+
+def info_key(info: Dict) -> Optional[str]:
+    """Canonical key of an extracted info dict"""
+    extractor = info.get("extractor_key") or info.get("ie_key")
+    if not extractor or not info.get("id"):
+        return None
+    return f"{extractor.lower()} {info['id']}"
+
+
+def url_expiry(url: str) -> List[float]:
+    """Unix deadlines a signed URL carries (empty if it has none we recognise)"""
+    parts = urlsplit(url)
+    query = parse_qs(parts.query)
+    deadlines = [float(match) for match in _PATH_EXPIRY.findall(parts.path)]
+    for param in EXPIRY_PARAMS:
+        value = (query.get(param) or [""])[0]
+        if value.isdigit():
+            deadlines.append(float(value))
+    for values in query.values():
+        deadlines.extend(float(match) for value in values for match in _TOKEN_EXPIRY.findall(value))
+    signed_at, lifetime = (query.get("X-Amz-Date") or [""])[0], (query.get("X-Amz-Expires") or [""])[0]
+    if signed_at and lifetime.isdigit():
+        try:
+            signed = datetime.strptime(signed_at, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+            deadlines.append(signed.timestamp() + int(lifetime))
+        except ValueError:
+            pass
+    return deadlines
+
+
+def links_expire_at(info: Dict) -> Optional[float]:
+    """Earliest expiry among the stream URLs of an info dict (None if none is signed)"""
+    deadlines = []
+    for entry in [info, *(info.get("formats") or [])]:
+        for key in ("url", "manifest_url"):
+            deadlines.extend(url_expiry(entry.get(key) or ""))
+    return min(deadlines) if deadlines else None
+
+
+@dataclass(frozen=True)
+class CachedInfo:
+    """One cache row: the info dict plus when it was extracted"""
+    key: str
+    info: Dict
+    extracted_at: float
+    links_expire_at: Optional[float]
+    downloadable: bool  # Info dict survived JSON intact (no extractor callbacks dropped)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.extracted_at
+
+    def links_valid(self) -> bool:
+        """Whether the stream links can still be downloaded from"""
+        if not self.downloadable:
+            return False
+        return self.links_expire_at is None or self.links_expire_at - EXPIRY_MARGIN > time.time()
+
+
+class MetadataCache:
+    """
+    Thread-safe SQLite cache of extracted info dicts.
+
+    One connection is shared by all threads behind a lock, so a batch
+    never contends with itself for SQLite's write lock. `hits` and
+    `misses` count `get()` outcomes.
+    """
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def _key_for(self, url: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT key FROM urls WHERE url = ?", (url,)).fetchone()
+        if row:
+            return row[0]
+        return canonical_key(url)  # First time this URL is seen: may still share a cached video ID
+
+    def get(self, url: str) -> Optional[CachedInfo]:
+        """Cached info for a URL, or None when missing or older than the TTL"""
+        key = self._key_for(url)
+        row = None
+        if key is not None:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT key, info, extracted_at, links_expire_at, downloadable FROM videos WHERE key = ?",
+                    (key,),
+                ).fetchone()
+        with self._lock:
+            if row is None or time.time() - row[2] > self.ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+        info = json.loads(zlib.decompress(row[1]))
+        return CachedInfo(row[0], info, row[2], row[3], bool(row[4]))
+
+    def put(self, url: str, info: Dict) -> Optional[str]:
+        """Store an info dict (as returned by `extract_info`) under its canonical key; returns the key"""
+        key = info_key(info) or canonical_key(url)
+        if key is None:
+            return None
+        try:
+            payload, downloadable = json.dumps(info), True
+        except (TypeError, ValueError):
+            from yt_dlp import YoutubeDL
+
+            payload, downloadable = json.dumps(YoutubeDL.sanitize_info(dict(info))), False
+        aliases = {url, info.get("webpage_url"), info.get("original_url")} - {None}
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO videos (key, title, extracted_at, links_expire_at, downloadable, info)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, info.get("title"), time.time(), links_expire_at(info), int(downloadable),
+                 zlib.compress(payload.encode("utf-8"))),
+            )
+            self._conn.executemany("INSERT OR REPLACE INTO urls (url, key) VALUES (?, ?)",
+                                   [(alias, key) for alias in aliases])
+        return key
+
+    def invalidate(self, url: str) -> bool:
+        """Drop the cached video behind a URL (and all its aliases); True if there was one"""
+        key = self._key_for(url)
+        if key is None:
+            return False
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM urls WHERE key = ?", (key,))
+            return self._conn.execute("DELETE FROM videos WHERE key = ?", (key,)).rowcount > 0
+
+    def invalidate_many(self, urls: Iterable[str]) -> int:
+        return sum(self.invalidate(url) for url in urls)
+
+    def purge_expired(self) -> int:
+        """Delete entries older than the TTL; returns how many"""
+        with self._lock, self._conn:
+            cutoff = time.time() - self.ttl
+            self._conn.execute("DELETE FROM urls WHERE key IN (SELECT key FROM videos WHERE extracted_at < ?)",
+                               (cutoff,))
+            return self._conn.execute("DELETE FROM videos WHERE extracted_at < ?", (cutoff,)).rowcount
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM urls")
+            self._conn.execute("DELETE FROM videos")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
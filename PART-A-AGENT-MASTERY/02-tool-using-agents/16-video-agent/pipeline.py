@@ -0,0 +1,353 @@
+"""
+Streaming post-download pipeline for the Video Downloader Agent
+Hashes, checks, remuxes and extracts audio while the file downloads
+
+A `StreamingPipeline` is a yt-dlp progress hook. As each hook reports
+more of the file on disk, a reader thread picks up the new bytes (just
+written, so still in the page cache) and feeds them to every stage. By
+the time the download finishes, the stages have seen almost all of it:
+nothing reads the file back from disk afterwards.
+
+Stages see bytes in file order. Range-fragment downloads report the
+contiguous prefix on disk (`contiguous_bytes`), so out-of-order
+fragments are consumed once the gap before them fills. What is left
+unread at the end is bounded by the downloader: one read block (up to
+4 MB) for yt-dlp's HTTP downloader, about connections x fragment size
+for range fragments.
+
+Results describe the files as downloaded. When yt-dlp builds the saved
+video from them, merging formats (`bestvideo+bestaudio`) or rewriting
+it in a post-processor (fixups, embedded metadata), they describe
+intermediate files instead, and are marked `"final": false`.
+
+Usage:
+    agent.download_video(url, pipeline=lambda: [Sha256Stage(), SizeCheckStage(), RemuxStage("mp4")])
+"""
+
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+READ_SIZE = 1024 * 1024
+POLL_INTERVAL = 0.05  # Seconds to wait for bytes still in the downloader's write buffer
+
+
+def _stat_identity(path: str) -> Optional[Tuple[int, int, int]]:
+    """(device, inode, size) of the file at `path`; a merge or a post-processor rewrite yields a new one"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_dev, stat.st_ino, stat.st_size
+
+
+class PipelineError(Exception):
+    """A stage could not process the stream (e.g. ffmpeg failed, size mismatch)"""
+
+
+class Stage:
+    """
+    One consumer of a downloaded file's bytes.
+
+    `open()` is called before the first chunk, `feed()` with each chunk in
+    file order, and `close()` once the whole file has been fed; it returns
+    the fields this stage adds to the download result. `abort()` cleans up
+    when the download fails.
+    """
+
+    name = "stage"
+
+    def open(self, filename: str, info: Dict):
+        pass
+
+    def feed(self, chunk: bytes):
+        raise NotImplementedError
+
+    def close(self, total_bytes: Optional[int]) -> Dict:
+        return {}
+
+    def abort(self):
+        pass
+
+
+class Sha256Stage(Stage):
+    """Rolling SHA-256 of the file"""
+
+    name = "sha256"
+
+    def open(self, filename: str, info: Dict):
+        self._hash = hashlib.sha256()
+
+    def feed(self, chunk: bytes):
+        self._hash.update(chunk)
+
+    def close(self, total_bytes: Optional[int]) -> Dict:
+        return {"sha256": self._hash.hexdigest()}
+
+
+class SizeCheckStage(Stage):
+    """Fails when the bytes received differ from the size the server or extractor announced"""
+
+    name = "size"
+
+    def open(self, filename: str, info: Dict):
+        self.size = 0
+        self.announced = info.get("filesize")
+
+    def feed(self, chunk: bytes):
+        self.size += len(chunk)
+
+    def close(self, total_bytes: Optional[int]) -> Dict:
+        for expected in (total_bytes, self.announced):
+            if expected and expected != self.size:
+                raise PipelineError(f"received {self.size} bytes, expected {expected}")
+        return {"size": self.size}
+
+
+class FFmpegStage(Stage):
+    """
+    Pipes the stream into `ffmpeg -i pipe:0 <args> <output>`.
+
+    The input must be demuxable from a pipe: WebM/Matroska, MPEG-TS and
+    fragmented or faststart MP4 work (YouTube's DASH formats are); an MP4
+    with its index at the end does not. ffmpeg's stderr goes to a temp
+    file so a chatty ffmpeg never blocks on a full pipe.
+    """
+
+    name = "ffmpeg"
+
+    def __init__(self, args: Sequence[str], suffix: str):
+        self.args = list(args)
+        self.suffix = suffix
+        self.output: Optional[str] = None
+        self._process: Optional[subprocess.Popen] = None
+
+    def _output_for(self, filename: str) -> str:
+        base, _ = os.path.splitext(filename)
+        output = base + self.suffix
+        return base + ".out" + self.suffix if output == filename else output
+
+    def open(self, filename: str, info: Dict):
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            raise PipelineError("ffmpeg not found on PATH")
+        self.output = self._output_for(filename)
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(
+            [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-i", "pipe:0", *self.args, self.output],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr,
+        )
+
+    def feed(self, chunk: bytes):
+        try:
+            self._process.stdin.write(chunk)
+        except BrokenPipeError:
+            self._process.wait()
+            raise PipelineError(f"ffmpeg exited early: {self._error_output()}")
+
+    def close(self, total_bytes: Optional[int]) -> Dict:
+        try:
+            self._process.stdin.close()
+        except BrokenPipeError:
+            pass
+        if self._process.wait() != 0:
+            raise PipelineError(f"ffmpeg failed ({self._process.returncode}): {self._error_output()}")
+        self._stderr.close()
+        return {self.name: self.output}
+
+    def abort(self):
+        if self._process is not None and self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+        if self.output and os.path.exists(self.output):
+            os.remove(self.output)
+
+    def _error_output(self) -> str:
+        self._stderr.seek(0)
+        return self._stderr.read().decode("utf-8", "replace").strip()[-500:]
+
+
+class RemuxStage(FFmpegStage):
+    """Copies the streams into another container (no re-encoding)"""
+
+    name = "remux"
+
+    def __init__(self, container: str = "mp4"):
+        args = ["-map", "0", "-c", "copy"]
+        if container in ("mp4", "m4a", "mov"):
+            args += ["-movflags", "+faststart"]
+        super().__init__(args, f".{container}")
+
+
+class AudioStage(FFmpegStage):
+    """Extracts the audio track; "copy" keeps the original codec (AAC in .m4a)"""
+
+    name = "audio"
+
+    def __init__(self, codec: str = "copy"):
+        if codec == "mp3":
+            args, suffix = ["-vn", "-c:a", "libmp3lame", "-q:a", "2"], ".mp3"
+        elif codec == "opus":
+            args, suffix = ["-vn", "-c:a", "copy"], ".opus"
+        else:
+            args, suffix = ["-vn", "-c:a", codec], ".m4a"
+        super().__init__(args, suffix)
+
+
+class _FileStream:
+    """Feeds one downloading file to its stages from a reader thread"""
+
+    def __init__(self, filename: str, stages: List[Stage], info: Dict):
+        self.filename = filename
+        self.stages = stages
+        self.info = info
+        self.errors: Dict[str, str] = {}
+        self.path: Optional[str] = None
+        self.position = 0
+        self.frontier = 0
+        self.total_bytes: Optional[int] = None
+        self.finished = False
+        self.bytes_after_download = 0  # Still unread when the download finished
+        self.identity: Optional[Tuple[int, int, int]] = None  # (device, inode, bytes read) of the file fed
+        self._fd: Optional[int] = None
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="pipeline", daemon=True)
+        for stage in stages:
+            self._call(stage, stage.open, filename, info)
+        self._thread.start()
+
+    def _call(self, stage: Stage, method: Callable, *args):
+        """Run a stage method; a failing stage is dropped without stopping the others or the download"""
+        if stage.name in self.errors:
+            return None
+        try:
+            return method(*args)
+        except Exception as e:
+            self.errors[stage.name] = str(e)
+            stage.abort()
+            return None
+
+    def advance(self, path: str, frontier: int, finished: bool = False, total_bytes: Optional[int] = None):
+        with self._cond:
+            if self.path is None:
+                self.path = path
+            self.frontier = max(self.frontier, frontier)
+            if finished:
+                self.finished = True
+                self.total_bytes = total_bytes
+                self.bytes_after_download = max(self.frontier - self.position, 0)
+            self._cond.notify()
+
+    def _run(self):
+        try:
+            while True:
+                with self._cond:
+                    while self.position >= self.frontier and not self.finished:
+                        self._cond.wait()
+                    if self.finished and self.position >= self.frontier:
+                        return
+                    target, finished = self.frontier, self.finished
+                if self._fd is None:
+                    self._fd = self._open()
+                chunk = os.pread(self._fd, min(READ_SIZE, target - self.position), self.position)
+                if not chunk:
+                    if finished:
+                        return  # File shorter than reported; the size check stage will say so
+                    time.sleep(POLL_INTERVAL)  # Counted, but still in the downloader's buffer
+                    continue
+                for stage in self.stages:
+                    self._call(stage, stage.feed, chunk)
+                with self._cond:
+                    self.position += len(chunk)
+        except OSError as e:
+            for stage in self.stages:
+                self.errors.setdefault(stage.name, f"reading {self.path}: {e}")
+                stage.abort()
+        finally:
+            if self._fd is not None:
+                stat = os.fstat(self._fd)
+                self.identity = (stat.st_dev, stat.st_ino, self.position)
+                os.close(self._fd)
+
+    def _open(self) -> int:
+        """Descriptor for the file being written (stays valid when the .part is renamed)"""
+        try:
+            return os.open(self.path, os.O_RDONLY)
+        except FileNotFoundError:
+            return os.open(self.filename, os.O_RDONLY)  # Renamed before the first read
+
+    def finish(self, final_paths: Sequence[str] = ()) -> Dict:
+        self._thread.join()
+        result = {"bytes_streamed": self.position, "bytes_after_download": self.bytes_after_download,
+                  "final": self.identity is not None and any(_stat_identity(path) == self.identity
+                                                             for path in final_paths)}
+        for stage in self.stages:
+            result.update(self._call(stage, stage.close, self.total_bytes) or {})
+        if self.errors:
+            result["errors"] = dict(self.errors)
+        return result
+
+    def abort(self):
+        with self._cond:
+            self.finished = True
+            self.frontier = self.position  # Stop after the chunk being fed
+            self._cond.notify()
+        for stage in self.stages:
+            stage.abort()  # Also unblocks a feed waiting on ffmpeg
+        self._thread.join()
+
+
+class StreamingPipeline:
+    """
+    yt-dlp progress hook running `stage_factory()` stages over each downloaded file.
+
+    Register `hook` with yt-dlp, then call `finish(final_paths)` after the
+    download for {filename: stage results} (plus `bytes_streamed`,
+    `bytes_after_download`, the tail that was still unread when the
+    download finished, and `final`: whether the stages saw exactly one of
+    `final_paths`, the files yt-dlp saved after post-processing), or
+    `abort()` if it failed. A file that already existed (nothing
+    downloaded) is read once from disk.
+    """
+
+    def __init__(self, stage_factory: Callable[[], Sequence[Stage]]):
+        self.stage_factory = stage_factory
+        self._streams: Dict[str, _FileStream] = {}
+        self._lock = threading.Lock()
+
+    def _stream(self, status: Dict) -> _FileStream:
+        filename = status["filename"]
+        with self._lock:
+            if filename not in self._streams:
+                self._streams[filename] = _FileStream(filename, list(self.stage_factory()),
+                                                      status.get("info_dict") or {})
+            return self._streams[filename]
+
+    def hook(self, status: Dict):
+        if status.get("status") not in ("downloading", "finished") or not status.get("filename"):
+            return
+        stream = self._stream(status)
+        path = status.get("tmpfilename") or status["filename"]
+        if status["status"] == "finished":
+            total = status.get("total_bytes") or status.get("downloaded_bytes")
+            if total is None and os.path.exists(status["filename"]):
+                total = os.path.getsize(status["filename"])
+            stream.advance(path, total or 0, finished=True, total_bytes=total)
+        else:
+            stream.advance(path, status.get("contiguous_bytes", status.get("downloaded_bytes") or 0))
+
+    def finish(self, final_paths: Sequence[str] = ()) -> Dict[str, Dict]:
+        with self._lock:
+            streams = list(self._streams.values())
+        return {stream.filename: stream.finish(final_paths) for stream in streams}
+
+    def abort(self):
+        with self._lock:
+            streams = list(self._streams.values())
+        for stream in streams:
+            stream.abort()
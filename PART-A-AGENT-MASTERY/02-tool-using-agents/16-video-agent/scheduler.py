@@ -0,0 +1,312 @@
+"""
+Bandwidth- and disk-aware scheduler for bulk downloads
+Runs a batch under a global bandwidth cap, per-job rate limits and a free-space guard
+
+Before downloading, every URL's size is resolved (from the metadata
+cache when possible) so the queue can be ordered smallest-first or by
+priority, and jobs that would not fit on disk are refused up front.
+With `adaptive=True` the worker count starts low and grows while each
+added worker still raises aggregate throughput, so a shared link is not
+saturated by more downloads than it can feed.
+
+Usage:
+    scheduler = BulkScheduler(agent, bandwidth=parse_rate("20M"), job_rate=parse_rate("5M"))
+    for result in scheduler.run(parse_jobs(read_urls("urls.txt"))):
+        print(result["status"], result["url"])
+"""
+
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import IO, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from batch import DEFAULT_PER_HOST, DEFAULT_WORKERS, BatchProgress, host_key
+
+DEFAULT_MIN_FREE = 1024 ** 3  # Bytes always left free on the output disk
+ADAPT_INTERVAL = 3.0  # Seconds of throughput measured at each worker count
+MIN_GAIN = 0.10  # An added worker stays only if throughput rose by at least this fraction
+RATE_WINDOW = 5.0  # Seconds of history behind the "now" throughput figure
+TICK = 0.5  # Seconds between scheduling decisions while downloads run
+ORDERS = ("size", "priority", "input")
+_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_rate(text: str) -> float:
+    """Bytes (per second) from "500K", "4.2M", "1G" or a plain number, like yt-dlp's --limit-rate"""
+    text = text.strip().upper().removesuffix("B").removesuffix("I")
+    unit = text[-1:] if text[-1:] in _UNITS else ""
+    return float(text[:len(text) - len(unit)]) * _UNITS[unit]
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting bytes per second.
+
+    `consume(n)` always succeeds but sleeps the caller long enough to keep
+    the long-run rate at `rate`, allowing bursts of up to `burst` bytes.
+    One bucket shared by many downloads caps their total.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate / 4, 64 * 1024)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, nbytes: int):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate) - nbytes
+            self._updated = now
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if delay > 0:
+            time.sleep(delay)
+
+
+@dataclass
+class Job:
+    """One URL in the bulk queue; `size` and `title` are filled in from its metadata"""
+    url: str
+    priority: int = 0  # Higher runs first with order="priority"
+    index: int = 0
+    size: Optional[int] = None
+    title: Optional[str] = None
+
+
+def parse_jobs(lines: Iterable[str]) -> List[Job]:
+    """Jobs from "URL [priority]" lines (e.g. from `read_urls`)"""
+    jobs = []
+    for index, line in enumerate(lines):
+        url, _, priority = line.partition(" ")
+        jobs.append(Job(url, int(priority) if priority.strip() else 0, index))
+    return jobs
+
+
+class ConcurrencyController:
+    """
+    Hill-climbs the worker count on measured throughput.
+
+    Starts at `minimum`. After `interval` seconds at a level with every
+    worker busy, it adds a worker if throughput rose by at least
+    `min_gain` over the level before; otherwise it drops back to that
+    level and holds there.
+    """
+
+    def __init__(self, minimum: int = 1, maximum: int = DEFAULT_WORKERS, interval: float = ADAPT_INTERVAL,
+                 min_gain: float = MIN_GAIN):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.interval = interval
+        self.min_gain = min_gain
+        self.target = minimum
+        self.settled = minimum >= maximum
+        self.history: List[Tuple[int, float]] = []  # (workers, bytes/s) per completed level
+        self._level_started = time.monotonic()
+
+    def observe(self, rate: float, busy: int) -> int:
+        """Feed the throughput of the last `interval` seconds; returns the worker count to aim for"""
+        now = time.monotonic()
+        if self.settled or now - self._level_started < self.interval:
+            return self.target
+        if busy < self.target:
+            self._level_started = now  # Too few jobs left to load this level: measure again later
+            return self.target
+        previous = self.history[-1][1] if self.history else None
+        self.history.append((self.target, rate))
+        if previous is None or rate >= previous * (1 + self.min_gain):
+            if self.target < self.maximum:
+                self.target += 1
+            else:
+                self.settled = True
+        else:
+            self.target -= 1  # The last worker added nothing worth its share of the link
+            self.settled = True
+        self._level_started = now
+        return self.target
+
+
+class ThroughputStats(BatchProgress):
+    """
+    `BatchProgress` plus live throughput: the recent aggregate rate and
+    the worker target, as one line or as a `snapshot()` dict.
+    """
+
+    def __init__(self, total: int, stream: Optional[IO[str]] = None):
+        super().__init__(total, stream)
+        self.target_workers = 0
+        self._samples: Deque[Tuple[float, int]] = deque([(time.monotonic(), 0)])
+
+    def bytes_for(self, url: str) -> int:
+        with self._lock:
+            return sum(downloaded for (job_url, _), downloaded in self._bytes.items() if job_url == url)
+
+    def sample(self):
+        now = time.monotonic()
+        self._samples.append((now, self.downloaded_bytes))
+        while len(self._samples) > 2 and now - self._samples[1][0] > RATE_WINDOW:
+            self._samples.popleft()
+
+    def rate(self, window: float = RATE_WINDOW) -> float:
+        """Aggregate bytes/s over the last `window` seconds"""
+        samples = list(self._samples)  # Progress hooks render from other threads while we sample
+        now, latest = samples[-1]
+        start_time, start_bytes = samples[0]
+        for sample_time, sample_bytes in samples:
+            if now - sample_time <= window:
+                start_time, start_bytes = sample_time, sample_bytes
+                break
+        return (latest - start_bytes) / (now - start_time) if now > start_time else 0.0
+
+    def reject(self, result: Dict):
+        """Count a job refused before it started (e.g. no disk space)"""
+        with self._lock:
+            self.failed += 1
+        self.maybe_print(force=True)
+
+    def snapshot(self) -> Dict:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "done": self.done, "total": self.total, "failed": self.failed, "skipped": self.skipped,
+            "active": self.active, "target_workers": self.target_workers,
+            "downloaded_bytes": self.downloaded_bytes,
+            "bytes_per_second": round(self.rate()),
+            "average_bytes_per_second": round(self.downloaded_bytes / elapsed),
+        }
+
+    def render(self) -> str:
+        return f"{super().render()} (now {self.rate() / 1e6:.1f} MB/s), {self.target_workers} workers"
+
+
+class BulkScheduler:
+    """
+    Runs `agent.download_video` over many jobs with bandwidth, disk and concurrency control.
+
+    - `bandwidth`: bytes/s shared by all downloads; `job_rate`: bytes/s per download
+    - `order`: "size" (smallest first, unknown last), "priority" (highest first) or "input"
+    - `min_free`: bytes to leave free; a job whose size estimate does not fit
+      (counting what running jobs still have to write) is refused up front
+    - `adaptive`: grow from `min_workers` towards `max_workers` while throughput gains
+
+    `run()` yields results in completion order like `BatchDownloader`, plus
+    `size_estimate`. `stats` holds live `ThroughputStats` while it runs.
+    Give the agent a metadata cache so downloads reuse the extraction done
+    for size estimates instead of repeating it.
+    """
+
+    def __init__(self, agent, quality: str = "best", output_dir: str = "./downloads",
+                 max_workers: int = DEFAULT_WORKERS, min_workers: int = 1, per_host: int = DEFAULT_PER_HOST,
+                 bandwidth: Optional[float] = None, job_rate: Optional[float] = None, order: str = "size",
+                 min_free: int = DEFAULT_MIN_FREE, adaptive: bool = True,
+                 progress_stream: Optional[IO[str]] = None, pipeline: Optional[Callable[[], Sequence]] = None):
+        if order not in ORDERS:
+            raise ValueError(f"order must be one of {ORDERS}")
+        if max_workers < 1 or min_workers < 1 or per_host < 1:
+            raise ValueError("max_workers, min_workers and per_host must be at least 1")
+        self.agent = agent
+        self.quality = quality
+        self.output_dir = output_dir
+        self.max_workers = max_workers
+        self.min_workers = min(min_workers, max_workers)
+        self.per_host = per_host
+        self.bandwidth = TokenBucket(bandwidth) if bandwidth else None
+        self.job_rate = job_rate
+        self.order = order
+        self.min_free = min_free
+        self.adaptive = adaptive
+        self.progress_stream = progress_stream
+        self.pipeline = pipeline
+        self.stats: Optional[ThroughputStats] = None
+        self.controller: Optional[ConcurrencyController] = None
+
+    def _resolve_sizes(self, jobs: List[Job]):
+        """Fill in size estimates from metadata (cache hits need no network)"""
+        urls = list(dict.fromkeys(job.url for job in jobs))
+        metadata = {result["url"]: result for result in self.agent.resolve_many(
+            urls, self.quality, workers=self.max_workers, per_host=self.per_host, probe_size=True)}
+        for job in jobs:
+            job.size = metadata[job.url].get("filesize")
+            job.title = metadata[job.url].get("title")
+
+    def _sort_key(self, job: Job):
+        if self.order == "size":
+            return job.size is None, job.size or 0, job.index
+        if self.order == "priority":
+            return -job.priority, job.index
+        return (job.index,)
+
+    def _disk_shortfall(self, job: Job, running: Iterable[Job]) -> Optional[str]:
+        """Why `job` does not fit on disk, or None if it does (or its size is unknown)"""
+        if not job.size:
+            return None
+        pending = sum(max(other.size - self.stats.bytes_for(other.url), 0) for other in running if other.size)
+        available = shutil.disk_usage(self.output_dir).free - pending - self.min_free
+        if job.size <= available:
+            return None
+        return (f"not enough disk space: needs {job.size / 1e6:.1f} MB, {max(available, 0) / 1e6:.1f} MB "
+                f"available after running downloads and the {self.min_free / 1e6:.0f} MB reserve")
+
+    def _run_one(self, job: Job) -> Dict:
+        self.stats.start_job()
+        start = time.monotonic()
+        limiters = [limiter for limiter in (self.bandwidth, TokenBucket(self.job_rate) if self.job_rate else None)
+                    if limiter is not None]
+        try:
+            result = self.agent.download_video(job.url, self.quality, self.output_dir, verbose=False,
+                                               progress_hook=self.stats.hook_for(job.url),
+                                               pipeline=self.pipeline, limiters=limiters)
+        except Exception as e:
+            result = {"status": "error", "error": str(e), "url": job.url}
+        result = {**result, "index": job.index, "size_estimate": job.size,
+                  "elapsed": round(time.monotonic() - start, 3)}
+        self.stats.finish_job(result)
+        return result
+
+    def _next_job(self, queue: List[Job], active_per_host: Dict[str, int]) -> Optional[Job]:
+        for job in queue:
+            if active_per_host.get(host_key(job.url), 0) < self.per_host:
+                queue.remove(job)
+                return job
+        return None
+
+    def run(self, jobs: Iterable[Union[Job, str]]) -> Iterator[Dict]:
+        jobs = [job if isinstance(job, Job) else Job(job, index=index) for index, job in enumerate(jobs)]
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._resolve_sizes(jobs)
+        queue = sorted(jobs, key=self._sort_key)
+        self.stats = ThroughputStats(len(jobs), self.progress_stream)
+        self.controller = ConcurrencyController(self.min_workers if self.adaptive else self.max_workers,
+                                                self.max_workers)
+
+        running: Dict[Future, Job] = {}
+        active_per_host: Dict[str, int] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="download") as executor:
+            while queue or running:
+                self.stats.sample()
+                target = self.controller.observe(self.stats.rate(self.controller.interval), len(running))
+                self.stats.target_workers = target
+                while len(running) < target:
+                    job = self._next_job(queue, active_per_host)
+                    if job is None:
+                        break
+                    shortfall = self._disk_shortfall(job, running.values())
+                    if shortfall is not None:
+                        result = {"status": "error", "error": shortfall, "url": job.url, "index": job.index,
+                                  "size_estimate": job.size, "elapsed": 0.0}
+                        self.stats.reject(result)
+                        yield result
+                        continue
+                    host = host_key(job.url)
+                    active_per_host[host] = active_per_host.get(host, 0) + 1
+                    running[executor.submit(self._run_one, job)] = job
+
+                if not running:
+                    continue  # Every job picked this round was refused for disk space
+                for future in wait(running, timeout=TICK, return_when=FIRST_COMPLETED).done:
+                    job = running.pop(future)
+                    active_per_host[host_key(job.url)] -= 1
+                    yield future.result()
@@ -0,0 +1,468 @@
+"""
+Unit tests for the Video Downloader Agent
+Downloads run against a local fixture media server (no network access)
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+sys.path.append('.')
+
+from batch import BatchDownloader, host_key, read_urls
+from events import DownloadCompleted, DownloadProgress, DownloadStarted, PrometheusExporter
+from fixture_server import FixtureMediaServer, make_media
+from fragments import DEFAULT_FRAGMENT_SIZE, FragmentState
+from metadata_cache import MetadataCache, links_expire_at
+from pipeline import AudioStage, RemuxStage, Sha256Stage, SizeCheckStage, Stage, StreamingPipeline
+from scheduler import BulkScheduler, ConcurrencyController, Job, parse_jobs, parse_rate
+from video_downloader_agent import VideoDownloaderAgent
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CLIP_SIZE = 200_000
+LARGE_SIZE = 4 * 1024 * 1024  # Four default-size fragments
+
+
+class ConcurrencyTrackingAgent(VideoDownloaderAgent):
+    """Records the most downloads that were ever running at once, overall and per host"""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self.active = {}
+        self.max_active = 0
+        self.max_active_per_host = {}
+
+    def download_video(self, url, *args, **kwargs):
+        host = host_key(url)
+        with self._lock:
+            self.active[host] = self.active.get(host, 0) + 1
+            self.max_active = max(self.max_active, sum(self.active.values()))
+            self.max_active_per_host[host] = max(self.max_active_per_host.get(host, 0), self.active[host])
+        try:
+            return super().download_video(url, *args, **kwargs)
+        finally:
+            with self._lock:
+                self.active[host] -= 1
+
+
+class FailingStage(Stage):
+    name = "failing"
+
+    def feed(self, chunk):
+        raise ValueError("stage broke")
+
+
+class TestVideoDownloaderAgent(unittest.TestCase):
+
+    def setUp(self):
+        self.files = {f"clip{i}.mp4": make_media(CLIP_SIZE, seed=i) for i in range(6)}
+        self.server = FixtureMediaServer(self.files, rate=1_000_000).start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.tmp.name, "downloads")
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def test_read_urls_and_host_key(self):
+        source = io.StringIO("# batch\nhttps://www.youtube.com/watch?v=a\n\n  https://youtu.be/b  \n")
+        self.assertEqual(list(read_urls(source)), ["https://www.youtube.com/watch?v=a", "https://youtu.be/b"])
+        self.assertEqual(host_key("https://www.youtube.com/watch?v=a"), "youtube.com")
+        self.assertEqual(host_key("https://m.youtube.com/watch?v=a"), "youtube.com")
+        self.assertEqual(host_key("http://127.0.0.1:8080/clip.mp4"), "127.0.0.1")
+
+    def test_download_single_fixture(self):
+        result = VideoDownloaderAgent().download_video(self.server.url("clip0.mp4"), output_dir=self.output,
+                                                       verbose=False)
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["filepath"], os.path.join(self.output, "clip0.mp4"))  # Reported by yt-dlp
+        with open(result["filepath"], "rb") as f:
+            self.assertEqual(f.read(), self.files["clip0.mp4"])
+        self.assertEqual(len(self.server.requests_for("clip0.mp4")), 2)  # One extraction, one download
+
+    def test_batch_respects_worker_and_per_host_limits(self):
+        # Two host names for the same server: three clips each
+        urls = [self.server.url(f"clip{i}.mp4", host="127.0.0.1" if i % 2 else "localhost") for i in range(6)]
+        agent = ConcurrencyTrackingAgent()
+        progress = io.StringIO()
+        results = list(agent.download_many(urls, output_dir=self.output, workers=4, per_host=1,
+                                           progress_stream=progress))
+
+        self.assertEqual(sorted(result["index"] for result in results), list(range(6)))
+        self.assertTrue(all(result["status"] == "success" for result in results), results)
+        self.assertEqual(agent.max_active_per_host, {"127.0.0.1": 1, "localhost": 1})
+        self.assertEqual(agent.max_active, 2)  # Workers to spare, but only two hosts
+        for name, data in self.files.items():
+            with open(os.path.join(self.output, name), "rb") as f:
+                self.assertEqual(f.read(), data)
+        self.assertIn("6/6 done (0 failed)", progress.getvalue())
+
+    def test_batch_yields_results_as_they_complete(self):
+        release = threading.Event()
+
+        def download(url, hook):
+            if url == "slow":
+                release.wait(5)
+            return {"status": "success", "url": url}
+
+        results = BatchDownloader(download, workers=2, per_host=2).run(["slow", "fast"])
+        first = next(results)
+        self.assertEqual(first["url"], "fast")  # Not held back behind the slower first URL
+        release.set()
+        self.assertEqual(next(results)["url"], "slow")
+
+    def test_batch_cli_writes_json_lines(self):
+        url_file = os.path.join(self.tmp.name, "urls.txt")
+        results_file = os.path.join(self.tmp.name, "results.jsonl")
+        with open(url_file, "w", encoding="utf-8") as f:
+            f.write("\n".join([self.server.url("clip1.mp4"), self.server.url("missing.mp4"),
+                               self.server.url("clip2.mp4")]))
+
+        completed = subprocess.run(
+            [sys.executable, "video_downloader_agent.py", "--batch", url_file, "--output", self.output,
+             "--workers", "2", "--results", results_file],
+            cwd=HERE, capture_output=True, text=True, timeout=60,
+        )
+        self.assertEqual(completed.returncode, 1)  # One URL failed
+        with open(results_file, encoding="utf-8") as f:
+            results = {result["index"]: result for result in map(json.loads, f)}
+        self.assertEqual([results[i]["status"] for i in range(3)], ["success", "error", "success"])
+        self.assertIn("3/3 done (1 failed)", completed.stderr)
+
+    def test_archive_skips_finished_videos(self):
+        archive = os.path.join(self.tmp.name, "archive.txt")
+        urls = [self.server.url("clip0.mp4"), self.server.url("clip1.mp4")]
+        first = list(VideoDownloaderAgent(archive_path=archive).download_many(urls, output_dir=self.output))
+        self.assertEqual([result["status"] for result in first], ["success", "success"])
+        with open(archive, encoding="utf-8") as f:
+            self.assertEqual(sorted(f.read().split("\n")), ["", "generic clip0", "generic clip1"])
+
+        progress = io.StringIO()
+        second = list(VideoDownloaderAgent(archive_path=archive).download_many(urls, output_dir=self.output,
+                                                                               progress_stream=progress))
+        self.assertEqual([result["status"] for result in second], ["skipped", "skipped"])
+        self.assertEqual(len(self.server.requests_for("clip0.mp4")), 3)  # Second run: extraction only, no download
+        self.assertIn("2/2 done (0 failed, 2 skipped)", progress.getvalue())
+
+    def test_killed_download_resumes_missing_ranges(self):
+        data = make_media(LARGE_SIZE, seed=42)
+        self.server.files["large.mp4"] = data
+        for connections in (4, 1):  # Range fragments, and yt-dlp's sequential .part resume
+            with self.subTest(connections=connections):
+                self.server.rate = 1_000_000
+                self.server.requests.clear()
+                output = os.path.join(self.tmp.name, f"resume{connections}")
+                part = os.path.join(output, "large.mp4.part")
+                process = subprocess.Popen(
+                    [sys.executable, "video_downloader_agent.py", "--url", self.server.url("large.mp4"),
+                     "--output", output, "--connections", str(connections)],
+                    cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                )
+                deadline = time.monotonic() + 30
+                while _bytes_on_disk(part) < LARGE_SIZE // 4 and time.monotonic() < deadline:
+                    time.sleep(0.05)
+                process.kill()  # SIGKILL mid-transfer: no cleanup runs
+                process.wait()
+                resumed_from = _bytes_on_disk(part)
+                self.assertGreater(resumed_from, 0)
+
+                self.server.rate = None
+                self.server.requests.clear()
+                result = VideoDownloaderAgent(connections=connections).download_video(
+                    self.server.url("large.mp4"), output_dir=output, verbose=False)
+                self.assertEqual(result["status"], "success")
+                with open(result["filepath"], "rb") as f:
+                    self.assertEqual(f.read(), data)
+                self.assertEqual([name for name in os.listdir(output) if ".part" in name], [])  # Sidecar too
+
+                ranges = [_parse_range(request["range"], LARGE_SIZE) for request in self.server.requests_for("large.mp4")
+                          if request["range"]]
+                fetched = sum(end - start + 1 for start, end in ranges)
+                self.assertLessEqual(fetched, LARGE_SIZE - resumed_from)  # Nothing on disk was fetched again
+
+    def test_stale_fragment_sidecar_is_discarded(self):
+        data = make_media(LARGE_SIZE, seed=42)
+        self.server.files["large.mp4"] = data
+        self.server.rate = None
+        os.makedirs(self.output)
+        part = os.path.join(self.output, "large.mp4.part")
+        agent = VideoDownloaderAgent(connections=4)
+
+        # Sidecar left behind, .part deleted: not a zero-filled "success"
+        FragmentState(part, LARGE_SIZE, DEFAULT_FRAGMENT_SIZE, {0: DEFAULT_FRAGMENT_SIZE}).save()
+        result = agent.download_video(self.server.url("large.mp4"), output_dir=self.output, verbose=False)
+        with open(result["filepath"], "rb") as f:
+            self.assertEqual(f.read(), data)
+        os.remove(result["filepath"])
+
+        # Same-size .part, but the remote file changed size since
+        changed = make_media(LARGE_SIZE + 1000, seed=7)
+        self.server.files["large.mp4"] = changed
+        with open(part, "wb") as f:
+            f.truncate(LARGE_SIZE)
+        FragmentState(part, LARGE_SIZE, DEFAULT_FRAGMENT_SIZE, {0: DEFAULT_FRAGMENT_SIZE}).save()
+        result = agent.download_video(self.server.url("large.mp4"), output_dir=self.output, verbose=False)
+        with open(result["filepath"], "rb") as f:
+            self.assertEqual(f.read(), changed)
+        self.assertEqual([name for name in os.listdir(self.output) if ".part" in name], [])
+
+    def test_metadata_cache_serves_reports_offline(self):
+        cache_path = os.path.join(self.tmp.name, "metadata.sqlite")
+        url_file = os.path.join(self.tmp.name, "urls.txt")
+        with FixtureMediaServer({"talk.mp4": make_media(CLIP_SIZE)}) as server:
+            url = server.url("talk.mp4")
+            agent = VideoDownloaderAgent(cache_path=cache_path)
+            self.assertFalse(agent.resolve_metadata(url)["metadata_cached"])
+            result = agent.download_video(url, output_dir=self.output, verbose=False)
+            self.assertTrue(result["metadata_cached"])
+            self.assertEqual(len(server.requests_for("talk.mp4")), 2)  # One extraction for both; one download
+        with open(url_file, "w", encoding="utf-8") as f:
+            f.write(url + "\n")
+
+        # Server gone: dry runs and reports still work, from the CLI too
+        completed = subprocess.run(
+            [sys.executable, "video_downloader_agent.py", "--batch", url_file, "--metadata-only",
+             "--metadata-cache", cache_path],
+            cwd=HERE, capture_output=True, text=True, timeout=60,
+        )
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        report = json.loads(completed.stdout)
+        self.assertEqual((report["title"], report["ext"], report["metadata_cached"]), ("talk", "mp4", True))
+
+        cache = MetadataCache(cache_path, ttl=0)
+        self.assertIsNone(cache.get(url))  # Past the TTL
+        cache.ttl = 3600
+        self.assertIsNotNone(cache.get(url))
+        self.assertTrue(cache.invalidate(url))
+        self.assertIsNone(cache.get(url))
+
+    def test_metadata_cache_keys_and_link_expiry(self):
+        cache = MetadataCache(os.path.join(self.tmp.name, "metadata.sqlite"))
+        info = {"id": "dQw4w9WgXcQ", "extractor_key": "Youtube", "title": "Video",
+                "formats": [{"url": f"https://rr1.googlevideo.com/videoplayback?expire={int(time.time()) + 60}"}]}
+        self.assertEqual(cache.put("https://www.youtube.com/watch?v=dQw4w9WgXcQ", info), "youtube dQw4w9WgXcQ")
+
+        entry = cache.get("https://youtu.be/dQw4w9WgXcQ")  # Another URL for the same video ID
+        self.assertEqual(entry.info["title"], "Video")
+        self.assertFalse(entry.links_valid())  # Fine for reports, re-extracted before downloading
+        info["formats"][0]["url"] = "https://rr1.googlevideo.com/videoplayback?expire=9999999999"
+        cache.put("https://youtu.be/dQw4w9WgXcQ", info)
+        self.assertTrue(cache.get("https://www.youtube.com/watch?v=dQw4w9WgXcQ").links_valid())
+        self.assertEqual(len(cache), 1)
+
+        # Expiries outside an `expire=` query parameter
+        for signed in ("https://manifest.googlevideo.com/api/manifest/hls_playlist/expire/1700000000/ei/x/index.m3u8",
+                       "https://bucket.s3.amazonaws.com/v.mp4?X-Amz-Date=20231114T221320Z&X-Amz-Expires=0",
+                       "https://cdn.example.com/v.mp4?hdnts=exp=1700000000~acl=/*~hmac=ab"):
+            self.assertEqual(links_expire_at({"formats": [{"url": signed}]}), 1700000000)
+
+        # Cached links that fail anyway are dropped and extracted once more
+        url = self.server.url("clip0.mp4")
+        agent = VideoDownloaderAgent(cache_path=os.path.join(self.tmp.name, "links.sqlite"))
+        agent.resolve_metadata(url)
+        info = dict(agent.metadata.get(url).info)
+        info["formats"] = [dict(info["formats"][0], url=self.server.url("gone.mp4"))]
+        agent.metadata.put(url, info)
+        kinds = []
+        agent.events.subscribe(lambda event: kinds.append(event.kind))
+        metrics = agent.events.subscribe(PrometheusExporter(os.path.join(self.tmp.name, "video_agent.prom")))
+        result = agent.download_video(url, output_dir=self.output, verbose=False)
+        self.assertEqual((result["status"], result["metadata_cached"]), ("success", False))
+        self.assertEqual((kinds.count("download_started"), kinds.count("extract_started")), (1, 2))
+        with open(metrics.path, encoding="utf-8") as f:
+            self.assertIn("video_agent_active_downloads 0\n", f.read())  # One download, extracted twice
+        self.assertTrue(self.server.requests_for("gone.mp4"))
+        with open(result["filepath"], "rb") as f:
+            self.assertEqual(f.read(), self.files["clip0.mp4"])
+
+    def test_pipeline_stages_consume_the_download_as_it_lands(self):
+        data = make_media(LARGE_SIZE, seed=7)
+        self.server.files["large.mp4"] = data
+        self.server.rate = 4_000_000
+        for connections in (4, 1):
+            with self.subTest(connections=connections):
+                output = os.path.join(self.tmp.name, f"pipeline{connections}")
+                result = VideoDownloaderAgent(connections=connections).download_video(
+                    self.server.url("large.mp4"), output_dir=output, verbose=False,
+                    pipeline=lambda: [Sha256Stage(), SizeCheckStage(), FailingStage()])
+                self.assertEqual(result["status"], "success")  # A broken stage does not fail the download
+                outputs = result["pipeline"][result["filepath"]]
+                self.assertEqual(outputs["sha256"], hashlib.sha256(data).hexdigest())
+                self.assertEqual((outputs["size"], outputs["bytes_streamed"]), (LARGE_SIZE, LARGE_SIZE))
+                self.assertLess(outputs["bytes_after_download"], LARGE_SIZE)  # Consumed while still downloading
+                self.assertEqual(outputs["errors"], {"failing": "stage broke"})
+                self.assertTrue(outputs["final"])
+
+        # Results for files yt-dlp then merges (bestvideo+bestaudio) or rewrites (fixups) are not final
+        video, merged = os.path.join(self.tmp.name, "clip.f137.mp4"), os.path.join(self.tmp.name, "clip.mp4")
+        for final_path, rewrite in ((merged, False), (video, True)):
+            with open(video, "wb") as f:
+                f.write(data[:1000])
+            streaming = StreamingPipeline(lambda: [SizeCheckStage()])
+            streaming.hook({"status": "finished", "filename": video, "total_bytes": 1000})
+            with open(video + ".tmp" if rewrite else merged, "wb") as f:
+                f.write(data[:2000])
+            if rewrite:
+                os.replace(video + ".tmp", video)
+            outputs = streaming.finish([final_path])[video]
+            self.assertEqual((outputs["size"], outputs["final"]), (1000, False))
+
+    @unittest.skipUnless(shutil.which("ffmpeg"), "ffmpeg not installed")
+    def test_pipeline_remuxes_and_extracts_audio_while_downloading(self):
+        media = subprocess.run(
+            ["ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", "testsrc=duration=2:size=160x120:rate=10",
+             "-f", "lavfi", "-i", "sine=duration=2", "-c:v", "mpeg4", "-c:a", "aac", "-f", "matroska", "pipe:1"],
+            capture_output=True, check=True,
+        ).stdout
+        self.server.files["clip.mkv"] = media
+        result = VideoDownloaderAgent().download_video(
+            self.server.url("clip.mkv"), output_dir=self.output, verbose=False,
+            pipeline=lambda: [RemuxStage("mp4"), AudioStage()])
+        outputs = result["pipeline"][result["filepath"]]
+        self.assertNotIn("errors", outputs)
+        for output in (outputs["remux"], outputs["audio"]):
+            self.assertGreater(os.path.getsize(output), 0)
+
+    def test_scheduler_caps_bandwidth_and_runs_smallest_first(self):
+        sizes = {"big.mp4": 600_000, "small.mp4": 200_000, "medium.mp4": 400_000}
+        self.server.files.update({name: make_media(size) for name, size in sizes.items()})
+        self.server.rate = None
+        agent = VideoDownloaderAgent(cache_path=os.path.join(self.tmp.name, "metadata.sqlite"))
+        scheduler = BulkScheduler(agent, output_dir=self.output, max_workers=1, adaptive=False,
+                                  bandwidth=1_000_000, job_rate=2_000_000, order="size")
+        start = time.monotonic()
+        results = list(scheduler.run([self.server.url(name) for name in sizes]))
+        elapsed = time.monotonic() - start
+
+        self.assertEqual([result["size_estimate"] for result in results], [200_000, 400_000, 600_000])
+        self.assertTrue(all(result["status"] == "success" for result in results), results)
+        burst = scheduler.bandwidth.burst
+        self.assertGreaterEqual(elapsed, (sum(sizes.values()) - burst) / 1_000_000)  # Held to the cap
+        self.assertEqual(scheduler.stats.snapshot()["downloaded_bytes"], sum(sizes.values()))
+
+    def test_scheduler_refuses_jobs_that_would_fill_the_disk(self):
+        self.server.files.update({"fits.mp4": make_media(100_000), "too-big.mp4": make_media(5_000_000)})
+        os.makedirs(self.output)
+        free = shutil.disk_usage(self.output).free
+        scheduler = BulkScheduler(VideoDownloaderAgent(), output_dir=self.output, max_workers=2,
+                                  min_free=free - 2_000_000, order="input")
+        results = {result["url"].rsplit("/", 1)[1]: result
+                   for result in scheduler.run([self.server.url("too-big.mp4"), self.server.url("fits.mp4")])}
+        self.assertEqual(results["fits.mp4"]["status"], "success")
+        self.assertEqual(results["too-big.mp4"]["status"], "error")
+        self.assertIn("not enough disk space", results["too-big.mp4"]["error"])
+        self.assertFalse(os.path.exists(os.path.join(self.output, "too-big.mp4")))
+
+    def test_concurrency_controller_stops_adding_workers_when_gain_drops(self):
+        controller = ConcurrencyController(minimum=1, maximum=8, interval=0)
+        for rate in (1.0, 1.9, 2.6):  # Each added worker still adds > 10%
+            controller.observe(rate, busy=controller.target)
+        self.assertEqual(controller.target, 4)
+        controller.observe(2.7, busy=4)  # The fourth added under 10%: back to three, and stay
+        self.assertEqual((controller.target, controller.settled), (3, True))
+        self.assertEqual(controller.observe(10.0, busy=3), 3)
+
+    def test_parse_rate_and_jobs(self):
+        self.assertEqual(parse_rate("500K"), 500 * 1024)
+        self.assertEqual(parse_rate("4.5M"), 4.5 * 1024 ** 2)
+        self.assertEqual(parse_rate("1GiB"), 1024 ** 3)
+        self.assertEqual(parse_jobs(["https://a/x 5", "https://a/y"]),
+                         [Job("https://a/x", 5, 0), Job("https://a/y", 0, 1)])
+
+    def test_events_report_progress_retries_and_timings(self):
+        self.server.files["large.mp4"] = make_media(LARGE_SIZE)
+        self.server.rate = 4_000_000
+        self.server.failures["large.mp4"] = 2  # The range probe fails twice, then succeeds
+        agent = VideoDownloaderAgent()
+        events = []
+        agent.events.subscribe(events.append)
+        metrics = PrometheusExporter(os.path.join(self.tmp.name, "metrics", "video_agent.prom"))
+        agent.events.subscribe(metrics)
+        result = agent.download_video(self.server.url("large.mp4"), output_dir=self.output, verbose=False)
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual((result["downloaded_bytes"], result["retries"]), (LARGE_SIZE, 2))
+        self.assertEqual(set(result["timings"]), {"extract", "download", "postprocess"})
+        self.assertLessEqual(sum(result["timings"].values()), result["elapsed"])
+        kinds = [event.kind for event in events if not isinstance(event, DownloadProgress)]
+        self.assertEqual(kinds, ["download_started", "extract_started", "extract_finished", "retry", "retry",
+                                 "postprocess_started", "postprocess_finished", "download_completed"])
+        progress = [event for event in events if isinstance(event, DownloadProgress)]
+        self.assertTrue(progress and all(event.fragment_count == 4 for event in progress))
+        self.assertEqual(events[-1].to_dict()["event"], "download_completed")
+        with open(metrics.path, encoding="utf-8") as f:
+            text = f.read()
+        self.assertIn('video_agent_downloads_total{status="success"} 1', text)
+        self.assertIn(f"video_agent_downloaded_bytes_total {LARGE_SIZE}", text)
+        self.assertIn("video_agent_retries_total 2", text)
+
+        # A subscriber that raises (exporter on a full disk) drops its events, not the download
+        def full_disk(event):
+            raise OSError(28, "No space left on device")
+
+        events.clear()
+        agent.events.subscribe(full_disk)
+        with self.assertLogs("events", "ERROR") as logs:
+            result = agent.download_video(self.server.url("clip0.mp4"), output_dir=self.output, verbose=False)
+        self.assertEqual(result["status"], "success")
+        self.assertEqual([event.kind for event in events].count("download_completed"), 1)
+        self.assertEqual(agent.events.dropped, len(events))
+        self.assertEqual(len(logs.records), 1)  # Logged once, not per event
+
+    def test_events_as_async_iterator_and_quiet_cli(self):
+        agent = VideoDownloaderAgent()
+
+        async def watch():
+            async with agent.events.stream() as stream:
+                download = asyncio.ensure_future(asyncio.to_thread(
+                    agent.download_video, self.server.url("clip3.mp4"), output_dir=self.output, verbose=False))
+                events = []
+                async for event in stream:
+                    events.append(event)
+                    if isinstance(event, DownloadCompleted):
+                        break
+                return events, await download
+
+        events, result = asyncio.run(watch())
+        self.assertIsInstance(events[0], DownloadStarted)
+        self.assertEqual((events[-1].status, events[-1].downloaded_bytes), ("success", CLIP_SIZE))
+        self.assertEqual(result["timings"], events[-1].timings)
+
+        events_file = os.path.join(self.tmp.name, "events.jsonl")
+        completed = subprocess.run(
+            [sys.executable, "video_downloader_agent.py", "--url", self.server.url("clip4.mp4"), "--quiet",
+             "--output", self.output, "--events", events_file],
+            cwd=HERE, capture_output=True, text=True, timeout=60,
+        )
+        self.assertEqual((completed.returncode, completed.stdout, completed.stderr), (0, "", ""))
+        with open(events_file, encoding="utf-8") as f:
+            logged = [json.loads(line) for line in f]
+        self.assertEqual(logged[-1]["event"], "download_completed")
+        self.assertEqual(logged[-1]["downloaded_bytes"], CLIP_SIZE)
+
+
+def _bytes_on_disk(part_path):
+    """Bytes a resumed download can keep: per the fragment sidecar, else the sequential .part size"""
+    try:
+        with open(part_path + ".fragments", encoding="utf-8") as f:
+            return sum(json.load(f)["written"].values())
+    except (OSError, ValueError):
+        return os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+
+def _parse_range(header, size):
+    start, _, end = header.removeprefix("bytes=").partition("-")
+    return int(start), int(end) if end else size - 1
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -9,131 +9,515 @@ Supports public, unlisted, and private videos (with authentication).
 Usage:
     python video_downloader_agent.py --url "https://www.youtube.com/watch?v=VIDEO_ID"
     python video_downloader_agent.py --url "https://www.youtube.com/watch?v=VIDEO_ID" --quality "720p"
+    python video_downloader_agent.py --batch urls.txt --workers 8 --per-host 2 --results results.jsonl
+    python video_downloader_agent.py --batch urls.txt --archive downloads/archive.txt --connections 8
+    python video_downloader_agent.py --batch urls.txt --metadata-only --quality "best[height<=720]"
+    python video_downloader_agent.py --url "https://www.youtube.com/watch?v=VIDEO_ID" --sha256 --extract-audio
+    python video_downloader_agent.py --batch urls.txt --bandwidth 20M --job-rate 5M --order size --adaptive
+    python video_downloader_agent.py --batch urls.txt --quiet --events events.jsonl --metrics video_agent.prom
     
 Features:
     - Works with unlisted videos using Android API client
     - Automatic retry on failures
     - Custom output directory support
+    - Concurrent batch mode with a per-host limit and JSON-lines results
+    - Resumable range-parallel downloads and a download archive that skips finished videos
+    - SQLite metadata cache: reports and format selection without re-extracting
+    - Streaming post-download stages (SHA-256, size check, ffmpeg remux/audio) fed as bytes land
+    - Bulk scheduler: bandwidth cap, per-job rate limit, disk-space guard, adaptive concurrency
+    - Typed progress events (callbacks, async iterator) with JSON-lines and Prometheus exporters
 """
 
 import argparse
-from yt_dlp import YoutubeDL
+import json
+import os
+import sys
+import threading
+from typing import Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+from archive import DownloadArchive
+from batch import DEFAULT_PER_HOST, DEFAULT_WORKERS, BatchDownloader, read_urls, write_jsonl
+from events import DownloadMonitor, EventBus, JsonLinesExporter, PrometheusExporter
+from metadata_cache import DEFAULT_TTL, MetadataCache
+from pipeline import AudioStage, RemuxStage, Sha256Stage, SizeCheckStage, Stage, StreamingPipeline
+from scheduler import DEFAULT_MIN_FREE, ORDERS, BulkScheduler, TokenBucket, parse_jobs, parse_rate
+
+DEFAULT_CONNECTIONS = 4  # Parallel range requests per file (plain HTTP formats)
 
 
 class VideoDownloaderAgent:
     """Simplest possible YouTube video downloader agent"""
     
-    def __init__(self):
+    def __init__(self, archive_path: Optional[str] = None, connections: int = DEFAULT_CONNECTIONS,
+                 cache_path: Optional[str] = None, cache_ttl: float = DEFAULT_TTL,
+                 events: Optional[EventBus] = None):
+        """
+        Args:
+            archive_path: Download archive file; videos recorded there are skipped
+            connections: Range requests per file (1 = sequential, yt-dlp's own downloader)
+            cache_path: SQLite metadata cache; extraction results are reused for `cache_ttl` seconds
+            events: Bus receiving every download's progress events (default: a new one, `self.events`)
+        """
         self.name = "YouTube Video Downloader Agent"
+        self.archive = DownloadArchive(archive_path) if archive_path else None
+        self.connections = connections
+        self.metadata = MetadataCache(cache_path, ttl=cache_ttl) if cache_path else None
+        self.events = events if events is not None else EventBus()
+        self._resolvers = threading.local()  # Per-thread YoutubeDL for metadata-only lookups
+    
+    @staticmethod
+    def ytdlp_options(quality: str = "best", output_dir: str = "./downloads", verbose: bool = True) -> dict:
+        """yt-dlp options for one download, with the YouTube API workarounds"""
+        opts = {
+            'format': quality,
+            'outtmpl': f'{output_dir}/%(title)s.%(ext)s',  # Save to specific directory
+            'noplaylist': True,  # Only download single video, not playlist
+            # Workarounds for YouTube API changes (2024-2025)
+            'http_headers': {
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+            },
+            'extractor_retries': 3,  # Retry on extraction failures
+            'fragment_retries': 3,   # Retry on download failures
+            # Use Android client to fix unlisted videos and signature extraction issues
+            'extractor_args': {
+                'youtube': {
+                    'player_client': ['android', 'web'],  # Try Android API first, then web
+                }
+            },
+        }
+        if not verbose:
+            opts.update({'quiet': True, 'noprogress': True, 'no_warnings': True})
+        return opts
     
-    def download_video(self, url: str, quality: str = "best", output_dir: str = "./downloads") -> dict:
+    def download_video(self, url: str, quality: str = "best", output_dir: str = "./downloads",
+                       verbose: bool = True, progress_hook: Optional[Callable[[Dict], None]] = None,
+                       pipeline: Optional[Callable[[], Sequence[Stage]]] = None,
+                       limiters: Sequence[TokenBucket] = ()) -> dict:
         """
         Download MP4 video from YouTube URL
         
         Args:
             url: YouTube video URL
             quality: Video quality (best, worst, 720p, 480p, etc.)
+            verbose: Print status and yt-dlp progress (off in batch mode)
+            progress_hook: Optional yt-dlp progress hook, called with each status dict
+            pipeline: Returns fresh pipeline stages for each downloaded file; they are
+                fed while it downloads, and their results land in result["pipeline"]
+                (`final` is False for files yt-dlp then merged or rewrote)
+            limiters: Rate limiters charged for every byte received (e.g. a shared bandwidth cap)
         
         Returns:
-            dict: Download result with status and info
+            dict: Download result with status and info, plus `downloaded_bytes`, `speed`,
+                `elapsed`, `retries` and `timings` (seconds spent extracting, downloading
+                and post-processing)
         """
-        print(f"🎬 {self.name}")
-        print(f"📹 URL: {url}")
-        print(f"🎯 Quality: {quality}")
-        print()
+        say = print if verbose else _silent
+        say(f"🎬 {self.name}")
+        say(f"📹 URL: {url}")
+        say(f"🎯 Quality: {quality}")
+        say()
         
+        monitor = DownloadMonitor(self.events, url)  # Progress events and timings
+        streaming = StreamingPipeline(pipeline) if pipeline is not None else None
         try:
+            # yt-dlp is imported on first download so --help starts instantly
+            from yt_dlp.utils import DownloadError
+            
+            from fragments import RangeYoutubeDL
+            
             # Create output directory if it doesn't exist
-            import os
             os.makedirs(output_dir, exist_ok=True)
             
-            # Configure download options with YouTube API workarounds
-            opts = {
-                'format': quality,
-                'outtmpl': f'{output_dir}/%(title)s.%(ext)s',  # Save to specific directory
-                'noplaylist': True,  # Only download single video, not playlist
-                # Workarounds for YouTube API changes (2024-2025)
-                'http_headers': {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                },
-                'extractor_retries': 3,  # Retry on extraction failures
-                'fragment_retries': 3,   # Retry on download failures
-                # Use Android client to fix unlisted videos and signature extraction issues
-                'extractor_args': {
-                    'youtube': {
-                        'player_client': ['android', 'web'],  # Try Android API first, then web
-                    }
-                },
-            }
+            opts = self.ytdlp_options(quality, output_dir, verbose)
+            opts['progress_hooks'] = [monitor.progress_hook]
+            opts['postprocessor_hooks'] = [monitor.postprocessor_hook]
+            if progress_hook is not None:
+                opts['progress_hooks'].append(progress_hook)
+            if streaming is not None:
+                opts['progress_hooks'].append(streaming.hook)  # Stages read each chunk as it lands
+            output_paths = []
+            opts['post_hooks'] = [output_paths.append]  # Final path of each file, after any merge/remux
+            if self.archive is not None:
+                opts['download_archive'] = self.archive  # Shared set; yt-dlp records each finished video
             
-            print("⏳ Downloading video...")
+            say("⏳ Downloading video...")
             
             # Download the video
-            with YoutubeDL(opts) as yt:
-                # Get video info first
-                info = yt.extract_info(url, download=False)
+            with RangeYoutubeDL(opts, connections=self.connections, limiters=limiters) as yt:
+                yt.add_retry_hook(monitor.retry_hook)
+                # Extract once (network round trips, player parsing); the same info dict drives the download
+                monitor.extract_started()
+                with monitor.phase("extract"):
+                    info, cached = self._extract(yt, url, for_download=True)
+                monitor.extract_finished(info, cached)
+                if info is None or yt.in_download_archive(info):
+                    # None: yt-dlp matched the URL against the archive before extracting
+                    say("⏭️  Already in the download archive, skipping")
+                    return monitor.complete({
+                        "status": "skipped",
+                        "reason": "already in download archive",
+                        "title": (info or {}).get('title'),
+                        "url": url
+                    })
                 video_title = info.get('title', 'Unknown')
-                duration = info.get('duration', 0)
+                duration = int(info.get('duration') or 0)  # None for direct media links
                 
-                print(f"📺 Title: {video_title}")
-                print(f"⏱️  Duration: {duration // 60}:{duration % 60:02d}")
-                print()
+                say(f"📺 Title: {video_title}{' (cached metadata)' if cached else ''}")
+                say(f"⏱️  Duration: {duration // 60}:{duration % 60:02d}")
+                say()
                 
-                # Actually download
-                yt.download([url])
+                # Format selection and download from the extracted info, without extracting again
+                try:
+                    with monitor.phase("download"):
+                        info = yt.process_ie_result(info, download=True)
+                except DownloadError:
+                    if not cached:
+                        raise
+                    # Cached links can die before any expiry we could see: extract once more and retry
+                    say("🔄 Cached stream links failed, extracting again")
+                    self.metadata.invalidate(url)
+                    monitor.extract_started()
+                    with monitor.phase("extract"):
+                        info, cached = self._extract(yt, url, for_download=True)
+                    monitor.extract_finished(info, cached)
+                    with monitor.phase("download"):
+                        info = yt.process_ie_result(info, download=True)
+                video_title = info.get('title', video_title)
+                filepath = output_paths[-1] if output_paths else _requested_filepath(info)
                 
-                print("✅ Download completed successfully!")
+                say("✅ Download completed successfully!")
                 
-                return {
+                result = {
                     "status": "success",
                     "title": video_title,
                     "duration": f"{duration // 60}:{duration % 60:02d}",
-                    "filename": f"{video_title}.mp4",
+                    "filename": os.path.basename(filepath) if filepath else None,
+                    "filepath": filepath,
+                    "retries": yt.retries,
+                    "metadata_cached": cached,
                     "url": url
                 }
+                if streaming is not None:
+                    with monitor.postprocessing("pipeline"):
+                        # Stages already have (nearly) every byte; "final" is False for pre-merge/fixup files
+                        result["pipeline"] = streaming.finish(output_paths or ([filepath] if filepath else []))
+                    for stage_errors in filter(None, (run.get("errors") for run in result["pipeline"].values())):
+                        say(f"⚠️  Pipeline: {stage_errors}")
+                return monitor.complete(result)
                 
         except Exception as e:
-            print(f"❌ Error: {str(e)}")
+            if streaming is not None:
+                streaming.abort()
+            say(f"❌ Error: {str(e)}")
+            return monitor.complete({
+                "status": "error",
+                "error": str(e),
+                "url": url
+            })
+    
+    def _extract(self, yt, url: str, for_download: bool) -> Tuple[Optional[dict], bool]:
+        """
+        Unprocessed info dict for a URL, and whether it came from the metadata cache
+        
+        Cached entries within the TTL serve reports and format selection; downloads
+        also need their stream links unexpired, otherwise the URL is extracted again.
+        `download_video` re-extracts once more if a download from cached links fails.
+        """
+        if self.metadata is not None:
+            entry = self.metadata.get(url)
+            if entry is not None and (not for_download or entry.links_valid()):
+                return entry.info, True
+        info = yt.extract_info(url, download=False, process=False)
+        if info is not None and self.metadata is not None:
+            self.metadata.put(url, info)
+        return info, False
+    
+    def _resolver(self, quality: str):
+        """This thread's YoutubeDL for format selection without downloading (building one takes ~80 ms)"""
+        from yt_dlp import YoutubeDL
+        
+        resolvers = self._resolvers.__dict__
+        if quality not in resolvers:
+            opts = self.ytdlp_options(quality, verbose=False)
+            opts['check_formats'] = False  # Selection from metadata only, no probe requests
+            resolvers[quality] = YoutubeDL(opts)
+        return resolvers[quality]
+    
+    def resolve_metadata(self, url: str, quality: str = "best", probe_size: bool = False) -> dict:
+        """
+        Title, duration and the format `quality` selects, without downloading
+        
+        Served from the metadata cache when possible (no network access);
+        otherwise extracted once and cached for later runs. With `probe_size`,
+        formats the extractor gave no size for (e.g. direct media links) are
+        sized from a HEAD request's Content-Length.
+        """
+        try:
+            yt = self._resolver(quality)
+            info, cached = self._extract(yt, url, for_download=False)
+            selected = yt.process_ie_result(dict(info), download=False)
+            duration = int(selected.get('duration') or 0)
+            formats = selected.get('requested_formats') or [selected]
+            sizes = [f.get('filesize') or f.get('filesize_approx') for f in formats]
+            if probe_size and not all(sizes):
+                sizes = [size or _content_length(yt, f) for size, f in zip(sizes, formats)]
+            return {
+                "status": "success",
+                "title": selected.get('title'),
+                "id": selected.get('id'),
+                "duration": f"{duration // 60}:{duration % 60:02d}",
+                "format": selected.get('format'),
+                "ext": selected.get('ext'),
+                "filesize": sum(sizes) if all(sizes) else None,
+                "metadata_cached": cached,
+                "url": url
+            }
+        except Exception as e:
             return {
                 "status": "error",
                 "error": str(e),
                 "url": url
             }
+    
+    def resolve_many(self, urls: Iterable[str], quality: str = "best", workers: int = DEFAULT_WORKERS,
+                     per_host: int = DEFAULT_PER_HOST, progress_stream=None,
+                     probe_size: bool = False) -> Iterator[dict]:
+        """`resolve_metadata` for many URLs concurrently; cache misses respect the per-host limit"""
+        batch = BatchDownloader(lambda url, hook: self.resolve_metadata(url, quality, probe_size),
+                                workers=workers, per_host=per_host, progress_stream=progress_stream)
+        return batch.run(urls)
+    
+    def download_many(self, urls: Iterable[str], quality: str = "best", output_dir: str = "./downloads",
+                      workers: int = DEFAULT_WORKERS, per_host: int = DEFAULT_PER_HOST,
+                      progress_stream=None,
+                      pipeline: Optional[Callable[[], Sequence[Stage]]] = None) -> Iterator[dict]:
+        """
+        Download many URLs concurrently, yielding each result as it completes
+        
+        Args:
+            urls: Video URLs (e.g. from `read_urls`)
+            workers: Downloads running at once
+            per_host: Downloads running at once against any one host
+            progress_stream: Where to draw the aggregate progress line (e.g. sys.stderr)
+            pipeline: Pipeline stage factory, as for `download_video`
+        
+        Returns:
+            Iterator of `download_video` result dicts plus `index` (input position) and `elapsed`
+        """
+        batch = BatchDownloader(
+            lambda url, hook: self.download_video(url, quality, output_dir, verbose=False, progress_hook=hook,
+                                                  pipeline=pipeline),
+            workers=workers, per_host=per_host, progress_stream=progress_stream,
+        )
+        return batch.run(urls)
+
+
+def _silent(*args, **kwargs):
+    """Stands in for print() when output is off"""
+
+
+def _content_length(yt, fmt: dict) -> Optional[int]:
+    """Size of a format from a HEAD request (None when the server does not say)"""
+    from yt_dlp.networking import HEADRequest
+    
+    if not str(fmt.get('protocol') or 'http').startswith('http') or not fmt.get('url'):
+        return None
+    with yt.urlopen(HEADRequest(fmt['url'], headers=fmt.get('http_headers') or {})) as response:
+        length = response.headers.get('Content-Length')
+    return int(length) if length and length.isdigit() else None
+
+
+def _requested_filepath(info: dict) -> Optional[str]:
+    """Output path yt-dlp recorded for a processed info dict (when no post hook fired)"""
+    downloads = info.get('requested_downloads') or [{}]
+    return downloads[-1].get('filepath')
 
 
 def main():
     """Command line interface"""
     parser = argparse.ArgumentParser(description="Download YouTube videos as MP4")
-    parser.add_argument("--url", required=True, help="YouTube video URL")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--url", help="YouTube video URL")
+    source.add_argument("--batch", metavar="FILE",
+                        help="Download every URL in FILE (one per line, '-' for stdin) concurrently")
     parser.add_argument("--quality", default="best", 
                        help="Video quality: best, worst, 720p, 480p, etc.")
     parser.add_argument("--output", default="./downloads",
                        help="Output directory for downloaded videos")
     parser.add_argument("--clear-cache", action="store_true",
                        help="Clear yt-dlp cache before downloading (fixes many YouTube errors)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                       help="Batch mode: downloads running at once")
+    parser.add_argument("--per-host", type=int, default=DEFAULT_PER_HOST,
+                       help="Batch mode: downloads running at once per host")
+    parser.add_argument("--results", metavar="FILE",
+                       help="Batch mode: write one JSON line per URL to FILE (default: stdout)")
+    parser.add_argument("--archive", metavar="FILE",
+                       help="Download archive: skip videos recorded in FILE and record new ones")
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS,
+                       help="Parallel range requests per file (1 disables fragmenting)")
+    parser.add_argument("--metadata-only", action="store_true",
+                       help="Report title, duration and selected format without downloading")
+    parser.add_argument("--metadata-cache", metavar="FILE",
+                       help="SQLite metadata cache (default: OUTPUT/.metadata.sqlite)")
+    parser.add_argument("--no-metadata-cache", action="store_true",
+                       help="Always extract metadata from the site")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL,
+                       help="Seconds before cached metadata is extracted again")
+    parser.add_argument("--refresh-metadata", action="store_true",
+                       help="Drop cached metadata for these URLs before running")
+    parser.add_argument("--sha256", action="store_true",
+                       help="Hash and size-check each file while it downloads")
+    parser.add_argument("--remux", metavar="CONTAINER",
+                       help="Also write a copy remuxed to CONTAINER (mp4, mkv, ...) while downloading; needs ffmpeg")
+    parser.add_argument("--extract-audio", nargs="?", const="copy", metavar="CODEC",
+                       help="Also write the audio track (copy, mp3, opus) while downloading; needs ffmpeg")
+    parser.add_argument("--bandwidth", type=parse_rate, metavar="RATE",
+                       help="Batch mode: total download rate cap, e.g. 20M (bytes/s)")
+    parser.add_argument("--job-rate", type=parse_rate, metavar="RATE",
+                       help="Batch mode: rate cap per download, e.g. 5M (bytes/s)")
+    parser.add_argument("--order", choices=ORDERS,
+                       help="Batch mode: queue order; 'priority' reads 'URL PRIORITY' lines (higher first)")
+    parser.add_argument("--min-free", type=parse_rate, default=DEFAULT_MIN_FREE, metavar="SIZE",
+                       help="Batch mode with scheduling: refuse downloads that would leave less free disk, e.g. 5G")
+    parser.add_argument("--adaptive", action="store_true",
+                       help="Batch mode: start with one worker and add more up to --workers while throughput gains")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                       help="Print only errors (batch mode: no progress line; results are still written)")
+    parser.add_argument("--events", metavar="FILE",
+                       help="Append every progress event to FILE as JSON lines")
+    parser.add_argument("--metrics", metavar="FILE",
+                       help="Keep download metrics in FILE in Prometheus text format (node_exporter textfile)")
     
     args = parser.parse_args()
+    say = _silent if args.quiet else print
     
     # Clear cache if requested (fixes many YouTube errors)
     if args.clear_cache:
-        print("🧹 Clearing yt-dlp cache...")
+        say("🧹 Clearing yt-dlp cache...")
         import subprocess
         try:
             subprocess.run(["yt-dlp", "--rm-cache-dir"], check=True, capture_output=True)
-            print("✅ Cache cleared successfully!")
+            say("✅ Cache cleared successfully!")
         except:
-            print("⚠️  Cache clearing failed, but continuing...")
-        print()
+            say("⚠️  Cache clearing failed, but continuing...")
+        say()
     
     # Create and run agent
-    agent = VideoDownloaderAgent()
-    result = agent.download_video(args.url, args.quality, args.output)
+    cache_path = None
+    if not args.no_metadata_cache:
+        cache_path = args.metadata_cache or os.path.join(args.output, ".metadata.sqlite")
+    agent = VideoDownloaderAgent(archive_path=args.archive, connections=args.connections,
+                                 cache_path=cache_path, cache_ttl=args.cache_ttl)
+    exporters = exporters_from_args(agent, args)
+    try:
+        run_cli(agent, args)
+    finally:
+        for exporter in exporters:
+            exporter.close()
+
+
+def run_cli(agent: VideoDownloaderAgent, args: argparse.Namespace):
+    """Run the downloads or reports the command line asks for"""
+    urls = list(read_urls(args.batch)) if args.batch else [args.url]
+    scheduled = args.batch and any([args.bandwidth, args.job_rate, args.order, args.adaptive])
+    jobs = parse_jobs(urls) if scheduled else None
+    if jobs is not None:
+        urls = [job.url for job in jobs]  # Without the priority column
+    if args.refresh_metadata and agent.metadata is not None:
+        agent.metadata.invalidate_many(urls)
+    if jobs is not None and not args.metadata_only:
+        run_batch(agent, jobs, args, scheduled=True)
+        return
+    if args.batch:
+        run_batch(agent, urls, args)
+        return
+    if args.metadata_only:
+        report_metadata(agent.resolve_metadata(args.url, args.quality))
+        return
+    result = agent.download_video(args.url, args.quality, args.output, verbose=not args.quiet,
+                                  pipeline=pipeline_from_args(args))
     
-    if result["status"] == "success":
-        print(f"\n🎉 Video saved as: {result['filename']}")
+    if args.quiet:
+        if result["status"] == "error":
+            print(f"❌ Error: {result['error']}", file=sys.stderr)
+            sys.exit(1)
+    elif result["status"] == "success":
+        print(f"\n🎉 Video saved as: {result['filepath']}")
+        for filename, outputs in result.get("pipeline", {}).items():
+            note = "" if outputs.get("final") else " (intermediate file, changed by merging/post-processing)"
+            print(f"🔗 {os.path.basename(filename)}{note}: {json.dumps(outputs)}")
+    elif result["status"] == "skipped":
+        print(f"\n📚 Already downloaded (recorded in {args.archive})")
     else:
         print(f"\n💡 Tip: Check if the video is available and URL is correct")
 
 
+def exporters_from_args(agent: VideoDownloaderAgent, args: argparse.Namespace) -> list:
+    """Subscribe the --events/--metrics file exporters to the agent's events"""
+    exporters = []
+    if args.events:
+        exporters.append(agent.events.subscribe(JsonLinesExporter(args.events)))
+    if args.metrics:
+        exporters.append(agent.events.subscribe(PrometheusExporter(args.metrics)))
+    return exporters
+
+
+def pipeline_from_args(args: argparse.Namespace) -> Optional[Callable[[], Sequence[Stage]]]:
+    """Stage factory for --sha256/--remux/--extract-audio (None when none is set)"""
+    if not (args.sha256 or args.remux or args.extract_audio):
+        return None
+    
+    def stages():
+        chosen = [Sha256Stage(), SizeCheckStage()] if args.sha256 else []
+        if args.remux:
+            chosen.append(RemuxStage(args.remux))
+        if args.extract_audio:
+            chosen.append(AudioStage(args.extract_audio))
+        return chosen
+    
+    return stages
+
+
+def report_metadata(result: dict):
+    """Print a --metadata-only result for one URL"""
+    if result["status"] != "success":
+        print(f"❌ Error: {result['error']}")
+        return
+    size = f"{result['filesize'] / 1e6:.1f} MB" if result["filesize"] else "unknown size"
+    print(f"📺 Title: {result['title']}")
+    print(f"⏱️  Duration: {result['duration']}")
+    print(f"🎯 Format: {result['format']} ({result['ext']}, {size})")
+    print(f"📦 Metadata: {'cache' if result['metadata_cached'] else 'extracted'}")
+
+
+def run_batch(agent: VideoDownloaderAgent, urls: Iterable, args: argparse.Namespace, scheduled: bool = False):
+    """Batch mode: progress on stderr, one JSON result per line on stdout or --results"""
+    results_file = open(args.results, "w", encoding="utf-8") if args.results else sys.stdout
+    progress_stream = None if args.quiet else sys.stderr
+    try:
+        if scheduled:
+            scheduler = BulkScheduler(agent, args.quality, args.output, max_workers=args.workers,
+                                      per_host=args.per_host, bandwidth=args.bandwidth, job_rate=args.job_rate,
+                                      order=args.order or "input", min_free=int(args.min_free),
+                                      adaptive=args.adaptive, progress_stream=progress_stream,
+                                      pipeline=pipeline_from_args(args))
+            results = scheduler.run(urls)
+        elif args.metadata_only:
+            results = agent.resolve_many(urls, args.quality, workers=args.workers, per_host=args.per_host,
+                                         progress_stream=progress_stream)
+        else:
+            results = agent.download_many(urls, args.quality, args.output,
+                                          workers=args.workers, per_host=args.per_host,
+                                          progress_stream=progress_stream, pipeline=pipeline_from_args(args))
+        failed = sum(result["status"] == "error" for result in write_jsonl(results, results_file))
+    finally:
+        if results_file is not sys.stdout:
+            results_file.close()
+    if failed:
+        print(f"💡 {failed} download(s) failed; see the error field in the results", file=sys.stderr)
+        sys.exit(1)
+
+
 if __name__ == "__main__":
     main()
@@ -11,11 +11,10 @@ Usage:
     agent.analyze_video("https://www.youtube.com/watch?v=VIDEO_ID")
 """
 
-try:
-    from agno import Agent
-    AGNO_AVAILABLE = True
-except ImportError:
-    AGNO_AVAILABLE = False
+import importlib.util
+
+# Checked without importing: Agno itself is only loaded when an agent is created
+AGNO_AVAILABLE = importlib.util.find_spec("agno") is not None
 
 
 class AgnoYouTubeAgent:
@@ -32,6 +31,7 @@ class AgnoYouTubeAgent:
         """Initialize Agno-based YouTube agent"""
         if not AGNO_AVAILABLE:
             raise ImportError("Agno framework not available. Install with: pip install agno")
+        from agno import Agent
         
         # Create Agno agent with YouTube capabilities
         self.agent = Agent(
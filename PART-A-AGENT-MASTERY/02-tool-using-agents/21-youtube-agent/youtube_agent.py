@@ -12,15 +12,16 @@ Usage:
 """
 
 import argparse
-from agno.agent import Agent
-from agno.tools.youtube import YouTubeTools
-from dotenv import load_dotenv
-
-load_dotenv()
 
 
 def create_youtube_agent():
-    """Create and configure the YouTube agent"""
+    """Create and configure the YouTube agent (Agno is imported here so --help and --demo start instantly)"""
+    from agno.agent import Agent
+    from agno.tools.youtube import YouTubeTools
+    from dotenv import load_dotenv
+    
+    load_dotenv()
+    
     return Agent(
         tools=[YouTubeTools()],
         description="You are a YouTube agent. Obtain the captions of a YouTube video and answer questions.",